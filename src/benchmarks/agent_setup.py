@@ -0,0 +1,82 @@
+"""
+Measures the per-request setup overhead of the agents with a fake LLM: building
+a ShoppingAgent (and compiling its graph) for every request versus reusing the
+process-wide one, and copying/binding the LLM on every node call versus once.
+
+Usage (from `src/`):
+  python -m benchmarks.agent_setup --requests 200
+"""
+import argparse
+import asyncio
+import os
+from time import perf_counter
+
+from langchain_openai import ChatOpenAI
+
+from benchmarks.fakes import FakeChatModel, make_ai_message
+from scrapping_agent.tools import make_scrapper_tools
+from shopping_agent.agent import ShoppingAgent
+from utils.logger import LOG_WRITER, LOGS_DIR, Logger, get_index_path
+
+def mean_ms(total: float, n: int) -> float:
+  return total / n * 1000
+
+async def bench_shopping_agent(requests: int, logger: Logger) -> tuple[float, float]:
+  def make_llm():
+    return FakeChatModel(responses=[make_ai_message("ok")])
+
+  start = perf_counter()
+  for _ in range(requests):
+    agent = ShoppingAgent(make_llm(), logger)
+    await agent.run("teclado mecânico", specifications="sem fio", logger=logger)
+  per_request = perf_counter() - start
+
+  shared_agent = ShoppingAgent(make_llm(), logger)
+  start = perf_counter()
+  for _ in range(requests):
+    await shared_agent.run("teclado mecânico", specifications="sem fio", logger=logger)
+  shared = perf_counter() - start
+
+  return mean_ms(per_request, requests), mean_ms(shared, requests)
+
+def bench_llm_setup(calls: int) -> tuple[float, float]:
+  tools = make_scrapper_tools()
+
+  start = perf_counter()
+  for _ in range(calls):
+    ChatOpenAI(model="o4-mini", api_key="benchmark")
+  construct = perf_counter() - start
+
+  llm = ChatOpenAI(model="o4-mini", api_key="benchmark")
+  start = perf_counter()
+  for _ in range(calls):
+    llm.model_copy().bind_tools(tools)
+  copy_and_bind = perf_counter() - start
+
+  return mean_ms(construct, calls), mean_ms(copy_and_bind, calls)
+
+async def main(requests: int):
+  logger = Logger(logger_id="benchmark-agent-setup")
+
+  try:
+    per_request, shared = await bench_shopping_agent(requests, logger)
+    construct, copy_and_bind = bench_llm_setup(requests)
+  finally:
+    LOG_WRITER.flush()
+    for path in (os.path.join(LOGS_DIR, logger.get_log_file()), get_index_path(os.path.join(LOGS_DIR, logger.get_log_file()))):
+      if os.path.exists(path):
+        os.remove(path)
+
+  print(f"ShoppingAgent run with a fake LLM ({requests} requests)")
+  print(f"  new agent + graph compile per request: {per_request:8.3f}ms")
+  print(f"  shared agent, graph compiled once:     {shared:8.3f}ms")
+  print(f"Per call LLM setup removed from the request path ({requests} calls)")
+  print(f"  ChatOpenAI(...) per request:           {construct:8.3f}ms")
+  print(f"  model_copy() + bind_tools() per node:  {copy_and_bind:8.3f}ms")
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--requests", type=int, default=200)
+  args = parser.parse_args()
+
+  asyncio.run(main(args.requests))
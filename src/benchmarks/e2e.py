@@ -0,0 +1,260 @@
+"""
+Offline end-to-end benchmark: full ShoppingAgent.run and ScrappingAgent.run
+flows against the fixture shop served over HTTP, with a transcript replaying
+fake LLM and a stub search provider. Reports wall time, per node and per tool
+latency, scrapper time, token counts and peak RSS of the process tree
+(Chromium included), and compares them with a stored baseline.
+
+Usage (from `src/`):
+  python -m benchmarks.e2e --repeat 5
+  python -m benchmarks.e2e --repeat 5 --save-baseline
+  python -m benchmarks.e2e --check --tolerance 0.25   # exits 1 on regressions
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+from contextvars import ContextVar
+from time import perf_counter
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tracers.context import register_configure_hook
+
+from benchmarks.fakes import TranscriptChatModel, load_transcripts
+from benchmarks.fixture_server import process_tree_rss, serve_fixture_shop
+from scrapping_agent.agent import make_scrapping_agent
+from scrapping_agent.browser_pool import close_browser_pools
+from scrapping_agent.checkpoints import close_checkpointer
+from shopping_agent.agent import ShoppingAgent
+from shopping_agent.search_providers import StubSearchProvider, set_search_provider
+from utils.cache import CACHES
+from utils.http import close_http_client
+from utils.llm import register_llm
+from utils.logger import LOG_WRITER, LOGS_DIR, Logger, get_index_path
+from utils.scheduler import SCHEDULER
+
+BENCHMARKS_DIR = os.path.dirname(__file__)
+TRANSCRIPTS_PATH = os.path.join(BENCHMARKS_DIR, "transcripts", "fixture_shop.json")
+BASELINE_PATH = os.path.join(BENCHMARKS_DIR, "baselines", "e2e.json")
+
+QUERY = "mouse redragon"
+SPECIFICATIONS = "sem fio"
+
+# Changes below these floors are noise, whatever their percentage. Times are in seconds.
+NOISE_FLOORS = {"peak_rss_mb": 5.0, "llm_calls": 0, "input_tokens": 0, "output_tokens": 0, "browser_sessions": 0}
+TIME_NOISE_FLOOR = 0.02
+
+# Graphs are named after their entry node.
+GRAPH_BY_ENTRY_NODE = {"receptionist": "shopping", "navigator": "scrapping"}
+
+class NodeTimer(BaseCallbackHandler):
+  """Times every LangGraph node and tool run, keyed as `graph.node` and `graph.tool:name`."""
+  run_inline = True
+
+  def __init__(self):
+    self.durations: dict[str, list[float]] = {}
+    self._started: dict = {}
+    self._graph_of: dict = {}
+    self._graph_names: dict = {}
+
+  def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+    name = kwargs.get("name")
+    if name == "LangGraph":
+      self._graph_of[run_id] = run_id
+      return
+
+    graph = self._graph_of.get(parent_run_id)
+    self._graph_of[run_id] = graph
+    is_node = graph is not None and parent_run_id == graph and name == (metadata or {}).get("langgraph_node")
+    if is_node:
+      graph_name = self._graph_names.setdefault(graph, GRAPH_BY_ENTRY_NODE.get(name, name))
+      self._started[run_id] = (f"{graph_name}.{name}", perf_counter())
+
+  def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+    graph = self._graph_of.get(parent_run_id)
+    self._graph_of[run_id] = graph
+    graph_name = self._graph_names.get(graph, "unknown")
+    self._started[run_id] = (f"{graph_name}.tool:{kwargs.get('name') or serialized.get('name')}", perf_counter())
+
+  def _finish(self, run_id):
+    self._graph_of.pop(run_id, None)
+    started = self._started.pop(run_id, None)
+    if started:
+      key, start = started
+      self.durations.setdefault(key, []).append(perf_counter() - start)
+
+  def on_chain_end(self, outputs, *, run_id, **kwargs):
+    self._finish(run_id)
+
+  def on_chain_error(self, error, *, run_id, **kwargs):
+    self._finish(run_id)
+
+  def on_tool_end(self, output, *, run_id, **kwargs):
+    self._finish(run_id)
+
+  def on_tool_error(self, error, *, run_id, **kwargs):
+    self._finish(run_id)
+
+node_timer_var: ContextVar[NodeTimer | None] = ContextVar("benchmark_node_timer", default=None)
+register_configure_hook(node_timer_var, inheritable=True)
+
+async def sample_rss(stop: asyncio.Event, samples: list[int], interval: float = 0.02):
+  while not stop.is_set():
+    samples.append(process_tree_rss())
+    await asyncio.sleep(interval)
+
+async def measure(run, llms: list[TranscriptChatModel]) -> dict:
+  """Runs `run()` once, collecting its timings, tokens and memory."""
+  # Caches with a SQLite tier are left alone, they may hold real data.
+  for cache in CACHES.values():
+    if not cache.db_path:
+      cache.clear()
+  for llm in llms:
+    llm.calls = llm.input_tokens = llm.output_tokens = 0
+
+  timer = NodeTimer()
+  token = node_timer_var.set(timer)
+  browser_sessions = SCHEDULER.limiters["browser"].acquired
+
+  stop = asyncio.Event()
+  rss_samples = [process_tree_rss()]
+  sampler = asyncio.create_task(sample_rss(stop, rss_samples))
+
+  start = perf_counter()
+  try:
+    await run()
+  finally:
+    wall_time = perf_counter() - start
+    stop.set()
+    await sampler
+    node_timer_var.reset(token)
+
+  return {
+    "wall_time": wall_time,
+    "llm_calls": sum(llm.calls for llm in llms),
+    "input_tokens": sum(llm.input_tokens for llm in llms),
+    "output_tokens": sum(llm.output_tokens for llm in llms),
+    "scrapper_time": sum(
+      sum(durations) for key, durations in timer.durations.items() if key.startswith("scrapping.tool:")
+    ),
+    "browser_sessions": SCHEDULER.limiters["browser"].acquired - browser_sessions,
+    "peak_rss_mb": (max(rss_samples) - rss_samples[0]) / 2**20,
+    "nodes": {key: sum(durations) for key, durations in timer.durations.items()}
+  }
+
+def median_metrics(runs: list[dict]) -> dict:
+  metrics = {
+    key: round(statistics.median(run[key] for run in runs), 4) for key in runs[0] if key != "nodes"
+  }
+  node_keys = sorted({key for run in runs for key in run["nodes"]})
+  metrics["nodes"] = {
+    key: round(statistics.median(run["nodes"].get(key, 0.0) for run in runs), 4) for key in node_keys
+  }
+  return metrics
+
+def print_comparison(name: str, current: dict, baseline: dict | None, tolerance: float) -> list[str]:
+  """Prints the metrics of a scenario next to the baseline. Returns the regressed metrics."""
+  regressions = []
+  rows = [(key, value, (baseline or {}).get(key)) for key, value in current.items() if key != "nodes"]
+  rows += [
+    (f"  {key}", value, ((baseline or {}).get("nodes") or {}).get(key))
+    for key, value in current["nodes"].items()
+  ]
+
+  print(f"\n{name}")
+  print(f"  {'metric':<40} {'current':>10} {'baseline':>10} {'change':>8}")
+  for key, value, base in rows:
+    if base is None:
+      print(f"  {key:<40} {value:>10.3f} {'-':>10} {'':>8}")
+      continue
+
+    change = (value - base) / base if base else 0.0
+    regressed = change > tolerance and value - base > NOISE_FLOORS.get(key, TIME_NOISE_FLOOR)
+    if regressed:
+      regressions.append(f"{name}.{key.strip()}")
+    print(f"  {key:<40} {value:>10.3f} {base:>10.3f} {change:>+7.0%}{' !' if regressed else ''}")
+
+  return regressions
+
+async def main(repeat: int, llm_latency: float, save_baseline: bool, check: bool, tolerance: float):
+  logger = Logger(logger_id="benchmark-e2e")
+
+  persistent_caches = [cache.name for cache in CACHES.values() if cache.db_path]
+  if persistent_caches:
+    print(f"Warning: persistent caches ({', '.join(persistent_caches)}) are not cleared between runs")
+
+  with serve_fixture_shop(200) as base_url:
+    transcripts = load_transcripts(TRANSCRIPTS_PATH, base_url=base_url)
+    shopping_llm = TranscriptChatModel(transcripts=transcripts, latency=llm_latency)
+    scrapping_llm = TranscriptChatModel(transcripts=transcripts, latency=llm_latency)
+    llms = [shopping_llm, scrapping_llm]
+
+    # Every ScrappingAgent, including the ones web_search builds, gets the fake models.
+    register_llm("o4-mini", scrapping_llm)
+    register_llm("gpt-4o", scrapping_llm)
+    set_search_provider(StubSearchProvider([
+      {"title": "Loja Fixture - Catálogo", "link": f"{base_url}/", "snippet": "Catálogo de periféricos"},
+      {"title": "Mouse Redragon Modelo 0001", "link": f"{base_url}/produto/produto-1", "snippet": "Mouse Redragon"}
+    ]))
+
+    shopping_agent = ShoppingAgent(shopping_llm, logger)
+
+    async def scrapping_run():
+      agent = make_scrapping_agent(logger=logger)
+      try:
+        await agent.initialize(f"{base_url}/")
+        await agent.run(QUERY, all_results=True)
+      finally:
+        await agent.close()
+
+    async def shopping_run():
+      await shopping_agent.run(QUERY, specifications=SPECIFICATIONS, logger=logger)
+
+    scenarios = {"scrapping_agent": scrapping_run, "shopping_agent": shopping_run}
+    results = {}
+
+    try:
+      for name, run in scenarios.items():
+        await measure(run, llms)
+        results[name] = median_metrics([await measure(run, llms) for _ in range(repeat)])
+    finally:
+      set_search_provider(None)
+      await close_browser_pools()
+      await close_checkpointer()
+      await close_http_client()
+      LOG_WRITER.flush()
+      for path in (os.path.join(LOGS_DIR, logger.get_log_file()), get_index_path(os.path.join(LOGS_DIR, logger.get_log_file()))):
+        if os.path.exists(path):
+          os.remove(path)
+
+  baseline = None
+  if os.path.exists(BASELINE_PATH):
+    with open(BASELINE_PATH, encoding="utf-8") as file:
+      baseline = json.load(file)
+
+  print(f"Medians of {repeat} runs after a warm-up run, fake LLM latency {llm_latency * 1000:.0f}ms")
+  regressions = []
+  for name, metrics in results.items():
+    regressions += print_comparison(name, metrics, (baseline or {}).get(name), tolerance)
+
+  if save_baseline:
+    os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+    with open(BASELINE_PATH, "w", encoding="utf-8") as file:
+      json.dump(results, file, indent=2)
+    print(f"\nBaseline saved to {BASELINE_PATH}")
+  elif regressions:
+    print(f"\nRegressions over {tolerance:.0%}: {', '.join(regressions)}")
+    if check:
+      raise SystemExit(1)
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--repeat", type=int, default=5)
+  parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds each fake LLM call takes")
+  parser.add_argument("--save-baseline", action="store_true")
+  parser.add_argument("--check", action="store_true", help="Exit with 1 when a metric regresses")
+  parser.add_argument("--tolerance", type=float, default=0.25)
+  args = parser.parse_args()
+
+  asyncio.run(main(args.repeat, args.llm_latency, args.save_baseline, args.check, args.tolerance))
@@ -0,0 +1,54 @@
+"""
+Compares the per-element and the bulk (single `evaluate`) serialization paths of
+`Scrapper.extract_elements` against a large local catalog page.
+
+Usage (from `src/`):
+  python -m benchmarks.extract_elements --products 2000 --repeat 3
+"""
+import argparse
+import asyncio
+from time import perf_counter
+
+from benchmarks.fixture_shop import catalog_page
+from scrapping_agent.browser_pool import close_browser_pools
+from scrapping_agent.scrapper import Scrapper, TEXT_ELEMENTS_SELECTOR, INTERACTION_ELEMENTS_SELECTOR
+
+async def time_extraction(scrapper: Scrapper, selector: str, bulk: bool, repeat: int):
+  timings = []
+  output = None
+
+  for _ in range(repeat):
+    start = perf_counter()
+    output = await scrapper.extract_elements(selector, True, 3000, True, bulk=bulk)
+    timings.append(perf_counter() - start)
+
+  return min(timings), output
+
+async def main(n_products: int, repeat: int):
+  scrapper = Scrapper()
+  await scrapper.initialize("about:blank")
+  await scrapper.page.set_content(catalog_page(n_products))
+
+  print(f"Catalog with {n_products} products, best of {repeat} runs")
+  print(f"{'selector':<40} {'per element':>12} {'bulk':>10} {'speedup':>9}  same output")
+
+  try:
+    for selector in (TEXT_ELEMENTS_SELECTOR, INTERACTION_ELEMENTS_SELECTOR):
+      legacy_time, legacy_output = await time_extraction(scrapper, selector, False, repeat)
+      bulk_time, bulk_output = await time_extraction(scrapper, selector, True, repeat)
+
+      print(
+        f"{selector:<40} {legacy_time:>11.3f}s {bulk_time:>9.3f}s "
+        f"{legacy_time / bulk_time:>8.1f}x  {legacy_output == bulk_output}"
+      )
+  finally:
+    await scrapper.close()
+    await close_browser_pools()
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--products", type=int, default=1000)
+  parser.add_argument("--repeat", type=int, default=3)
+  args = parser.parse_args()
+
+  asyncio.run(main(args.products, args.repeat))
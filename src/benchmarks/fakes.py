@@ -0,0 +1,123 @@
+import asyncio
+import json
+import time
+from uuid import uuid4
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from utils.utils import estimate_tokens
+
+class FakeChatModel(BaseChatModel):
+  """Chat model that answers instantly, cycling through `responses`."""
+  responses: list[AIMessage]
+  model_name: str = "fake"
+  calls: int = 0
+
+  @property
+  def _llm_type(self) -> str:
+    return "fake"
+
+  def bind_tools(self, tools, **kwargs):
+    return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+  def _next_message(self) -> AIMessage:
+    message = self.responses[self.calls % len(self.responses)]
+    self.calls += 1
+    return message.model_copy()
+
+  def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+    return ChatResult(generations=[ChatGeneration(message=self._next_message())])
+
+  async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+    return ChatResult(generations=[ChatGeneration(message=self._next_message())])
+
+def make_ai_message(content: str, tool_calls: list = None, tokens: int = 100) -> AIMessage:
+  return AIMessage(
+    content=content,
+    tool_calls=tool_calls or [],
+    usage_metadata={"input_tokens": tokens, "output_tokens": 0, "total_tokens": tokens}
+  )
+
+class TranscriptChatModel(BaseChatModel):
+  """
+    Replays recorded tool-calling transcripts. A conversation gets the
+    transcript whose key is found in its first human message, and the step
+    given by the number of AI messages it already has, so concurrent
+    conversations replay independently. Token usage is estimated from the real
+    prompt, so prompt and page size changes show up in the counts.
+  """
+  transcripts: dict[str, list[dict]]
+  latency: float = 0.0
+  model_name: str = "transcript"
+  calls: int = 0
+  input_tokens: int = 0
+  output_tokens: int = 0
+
+  @property
+  def _llm_type(self) -> str:
+    return "transcript"
+
+  def bind_tools(self, tools, **kwargs):
+    return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+  def _next_message(self, messages: list[BaseMessage]) -> AIMessage:
+    first_human = next((m.content for m in messages if isinstance(m, HumanMessage)), "")
+    key = next((key for key in self.transcripts if key in first_human), None)
+    if key is None:
+      raise ValueError(f"No transcript for the conversation: {first_human[:200]!r}")
+
+    step = sum(isinstance(m, AIMessage) for m in messages)
+    recorded = self.transcripts[key][min(step, len(self.transcripts[key]) - 1)]
+
+    tool_calls = [
+      {"id": f"call_{uuid4().hex[:12]}", "name": tool_call["name"], "args": tool_call.get("args", {})}
+      for tool_call in recorded.get("tool_calls", [])
+    ]
+    input_tokens = sum(estimate_tokens(str(m.content)) for m in messages)
+    output_tokens = estimate_tokens(recorded.get("content", "") + json.dumps([tc["args"] for tc in tool_calls]))
+
+    self.calls += 1
+    self.input_tokens += input_tokens
+    self.output_tokens += output_tokens
+
+    return AIMessage(
+      content=recorded.get("content", ""),
+      tool_calls=tool_calls,
+      usage_metadata={
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "total_tokens": input_tokens + output_tokens
+      }
+    )
+
+  def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+    time.sleep(self.latency)
+    return ChatResult(generations=[ChatGeneration(message=self._next_message(messages))])
+
+  async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+    await asyncio.sleep(self.latency)
+    return ChatResult(generations=[ChatGeneration(message=self._next_message(messages))])
+
+def load_transcripts(path: str, **values) -> dict[str, list[dict]]:
+  """
+    Reads transcripts ({key: [{"content": ..., "tool_calls": [{"name": ..., "args": ...}]}]})
+    from a JSON file, filling `{placeholders}` in every string with `values`.
+  """
+  with open(path, encoding="utf-8") as file:
+    transcripts = json.load(file)
+
+  def fill(value):
+    if isinstance(value, str):
+      for name, replacement in values.items():
+        value = value.replace("{" + name + "}", str(replacement))
+      return value
+    if isinstance(value, list):
+      return [fill(item) for item in value]
+    if isinstance(value, dict):
+      return {fill(key): fill(item) for key, item in value.items()}
+    return value
+
+  return fill(transcripts)
@@ -0,0 +1,76 @@
+import os
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+from benchmarks.fixture_shop import catalog_page, make_products, product_page
+
+def make_handler(pages: dict[str, str]):
+  class FixtureHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+      page = pages.get(self.path.split("?")[0])
+      if page is None:
+        self.send_error(404)
+        return
+
+      body = page.encode("utf-8")
+      self.send_response(200)
+      self.send_header("Content-Type", "text/html; charset=utf-8")
+      self.send_header("Content-Length", str(len(body)))
+      self.end_headers()
+      self.wfile.write(body)
+
+    def log_message(self, format, *args):
+      pass
+
+  return FixtureHandler
+
+@contextmanager
+def serve_pages(pages: dict[str, str]):
+  """Serves `pages` ({path: html}) on a free localhost port. Yields the base url."""
+  server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(pages))
+  thread = Thread(target=server.serve_forever, daemon=True)
+  thread.start()
+
+  try:
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+  finally:
+    server.shutdown()
+    server.server_close()
+
+@contextmanager
+def serve_fixture_shop(n_products: int = 200):
+  """Serves the catalog at `/` and a page per product at `/produto/{slug}`."""
+  pages = {"/": catalog_page(n_products)}
+  for product in make_products(n_products):
+    pages[f"/produto/{product['slug']}"] = product_page(product)
+
+  with serve_pages(pages) as base_url:
+    yield base_url
+
+def process_tree_rss(pid: int = None) -> int:
+  """RSS in bytes of a process and all its descendants (Chromium included). Linux only."""
+  pid = pid or os.getpid()
+  children: dict[int, list[int]] = {}
+  rss = {}
+  page_size = os.sysconf("SC_PAGE_SIZE")
+
+  for entry in os.listdir("/proc"):
+    if not entry.isdigit():
+      continue
+    try:
+      with open(f"/proc/{entry}/stat") as stat_file:
+        fields = stat_file.read().rsplit(")", 1)[1].split()
+    except OSError:
+      continue
+    children.setdefault(int(fields[1]), []).append(int(entry))
+    rss[int(entry)] = int(fields[21]) * page_size
+
+  total = 0
+  stack = [pid]
+  while stack:
+    current = stack.pop()
+    total += rss.get(current, 0)
+    stack.extend(children.get(current, []))
+
+  return total
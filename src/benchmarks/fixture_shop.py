@@ -0,0 +1,142 @@
+import json
+import random
+
+CATEGORIES = ["Teclados", "Mouses", "Monitores", "Headsets", "Notebooks", "Cadeiras"]
+BRANDS = ["Logitech", "Redragon", "HyperX", "Razer", "Corsair", "Dell", "Samsung"]
+
+def make_products(n_products: int, seed: int = 42) -> list[dict]:
+  rng = random.Random(seed)
+  products = []
+
+  for i in range(n_products):
+    category = CATEGORIES[i % len(CATEGORIES)]
+    brand = rng.choice(BRANDS)
+    price = rng.randint(5000, 500000) / 100
+    products.append({
+      "id": i,
+      "slug": f"produto-{i}",
+      "name": f"{category[:-1]} {brand} Modelo {i:04d} com acabamento premium e garantia estendida",
+      "brand": brand,
+      "category": category,
+      "price": price,
+      "old_price": round(price * 1.2, 2),
+      "rating": round(rng.uniform(3, 5), 1),
+      "reviews": rng.randint(0, 5000),
+      "in_stock": rng.random() > 0.2
+    })
+
+  return products
+
+def format_price(price: float) -> str:
+  return f"R$ {price:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+def page_header() -> str:
+  nav_links = "\n".join(
+    f'<li class="nav-item"><a class="nav-link" href="/categoria/{c.lower()}">{c}</a></li>'
+    for c in CATEGORIES
+  )
+  return f"""
+  <header class="site-header">
+    <a class="logo" href="/">Loja Fixture</a>
+    <form class="search" action="/busca">
+      <label for="q">Buscar</label>
+      <input id="q" name="q" placeholder="O que você procura?">
+      <button class="search-button" type="submit">Buscar</button>
+    </form>
+    <nav><ul class="nav">{nav_links}</ul></nav>
+  </header>
+  """
+
+def product_card(product: dict) -> str:
+  stock = "Em estoque" if product["in_stock"] else "Indisponível"
+  return f"""
+  <li class="product-card" data-product-id="{product['id']}">
+    <a class="product-link" href="/produto/{product['slug']}">
+      <img class="product-image" src="/static/{product['slug']}.jpg" alt="{product['name']}">
+      <h3 class="product-name">{product['name']}</h3>
+    </a>
+    <p class="product-price">{format_price(product['price'])}</p>
+    <p class="product-old-price">{format_price(product['old_price'])}</p>
+    <p class="product-rating">{product['rating']} ({product['reviews']} avaliações)</p>
+    <p class="product-stock">{stock}</p>
+    <button class="add-to-cart" data-sku="{product['slug']}">Adicionar ao carrinho</button>
+  </li>
+  """
+
+def catalog_page(n_products: int = 1000, seed: int = 42) -> str:
+  """Return a large, server-rendered catalog page with `n_products` product cards."""
+  cards = "\n".join(product_card(p) for p in make_products(n_products, seed))
+  return f"""<!DOCTYPE html>
+<html lang="pt-BR">
+<head>
+  <meta charset="utf-8">
+  <title>Loja Fixture - Catálogo</title>
+  <meta name="description" content="Catálogo de periféricos e eletrônicos">
+</head>
+<body>
+  {page_header()}
+  <main>
+    <h1 class="catalog-title">Catálogo</h1>
+    <p class="catalog-count">{n_products} produtos encontrados</p>
+    <ul class="product-list">{cards}</ul>
+  </main>
+  <footer><p class="copyright">Loja Fixture</p></footer>
+</body>
+</html>"""
+
+def product_json_ld(product: dict) -> str:
+  return json.dumps({
+    "@context": "https://schema.org",
+    "@type": "Product",
+    "name": product["name"],
+    "brand": {"@type": "Brand", "name": product["brand"]},
+    "sku": product["slug"],
+    "image": f"/static/{product['slug']}.jpg",
+    "aggregateRating": {"@type": "AggregateRating", "ratingValue": product["rating"], "reviewCount": product["reviews"]},
+    "offers": {
+      "@type": "Offer",
+      "url": f"/produto/{product['slug']}",
+      "price": f"{product['price']:.2f}",
+      "priceCurrency": "BRL",
+      "availability": "https://schema.org/" + ("InStock" if product["in_stock"] else "OutOfStock")
+    }
+  }, ensure_ascii=False)
+
+def product_page(product: dict) -> str:
+  """Return a server-rendered product page with JSON-LD, microdata and OpenGraph product data."""
+  stock = "Em estoque" if product["in_stock"] else "Indisponível"
+  return f"""<!DOCTYPE html>
+<html lang="pt-BR">
+<head>
+  <meta charset="utf-8">
+  <title>{product['name']} - Loja Fixture</title>
+  <meta name="description" content="Compre {product['name']} na Loja Fixture">
+  <meta property="og:type" content="product">
+  <meta property="og:title" content="{product['name']}">
+  <meta property="og:image" content="/static/{product['slug']}.jpg">
+  <meta property="product:price:amount" content="{product['price']:.2f}">
+  <meta property="product:price:currency" content="BRL">
+  <script type="application/ld+json">{product_json_ld(product)}</script>
+</head>
+<body>
+  {page_header()}
+  <main itemscope itemtype="https://schema.org/Product">
+    <h1 class="product-title" itemprop="name">{product['name']}</h1>
+    <p class="product-brand" itemprop="brand">{product['brand']}</p>
+    <div itemprop="offers" itemscope itemtype="https://schema.org/Offer">
+      <p class="product-price"><span itemprop="price" content="{product['price']:.2f}">{format_price(product['price'])}</span></p>
+      <meta itemprop="priceCurrency" content="BRL">
+      <p class="product-stock">{stock}</p>
+    </div>
+    <p class="product-old-price">De {format_price(product['old_price'])}</p>
+    <p class="product-rating">{product['rating']} ({product['reviews']} avaliações)</p>
+    <ul class="product-specs">
+      <li class="spec">Categoria: {product['category']}</li>
+      <li class="spec">Marca: {product['brand']}</li>
+      <li class="spec">Garantia: 12 meses</li>
+    </ul>
+    <button class="add-to-cart" data-sku="{product['slug']}">Adicionar ao carrinho</button>
+  </main>
+  <footer><p class="copyright">Loja Fixture</p></footer>
+</body>
+</html>"""
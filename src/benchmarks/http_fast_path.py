@@ -0,0 +1,64 @@
+"""
+Compares the HTTP fast path (HttpScrapper) with the browser Scrapper on a
+server-rendered catalog served over HTTP: latency of initialize + page_summary
+and memory of the process tree (Chromium included).
+
+Usage (from `src/`):
+  python -m benchmarks.http_fast_path --products 200 --repeat 5
+"""
+import argparse
+import asyncio
+from time import perf_counter
+
+from benchmarks.fixture_server import process_tree_rss, serve_fixture_shop
+from scrapping_agent.browser_pool import close_browser_pools
+from scrapping_agent.http_scrapper import HttpScrapper
+from scrapping_agent.scrapper import Scrapper
+from utils.http import close_http_client
+
+async def time_scrapes(make_scrapper, url: str, repeat: int):
+  timings = []
+  peak_rss = 0
+  summary = None
+
+  for _ in range(repeat):
+    scrapper = make_scrapper()
+    start = perf_counter()
+    await scrapper.initialize(url)
+    summary = await scrapper.page_summary(full=True)
+    timings.append(perf_counter() - start)
+    peak_rss = max(peak_rss, process_tree_rss())
+    await scrapper.close()
+
+  return timings, peak_rss, summary
+
+async def main(n_products: int, repeat: int):
+  with serve_fixture_shop(n_products) as base_url:
+    baseline_rss = process_tree_rss()
+    print(f"Catalog with {n_products} products at {base_url}, {repeat} scrapes each")
+    print(f"{'fetcher':<10} {'first':>8} {'warm avg':>9} {'peak RSS':>10}")
+
+    try:
+      results = {}
+      for name, make_scrapper in (("http", HttpScrapper), ("browser", Scrapper)):
+        timings, peak_rss, summary = await time_scrapes(make_scrapper, base_url + "/", repeat)
+        results[name] = summary
+        warm = timings[1:] or timings
+
+        print(
+          f"{name:<10} {timings[0]:>7.3f}s {sum(warm) / len(warm):>8.3f}s "
+          f"{(peak_rss - baseline_rss) / 2**20:>8.0f}MB"
+        )
+
+      print(f"Same page_summary: {results['http'] == results['browser']}")
+    finally:
+      await close_browser_pools()
+      await close_http_client()
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--products", type=int, default=200)
+  parser.add_argument("--repeat", type=int, default=5)
+  args = parser.parse_args()
+
+  asyncio.run(main(args.products, args.repeat))
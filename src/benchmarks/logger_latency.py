@@ -0,0 +1,98 @@
+"""
+Measures event loop latency while many concurrent chats log large DEBUG
+records, with the synchronous file append and with the buffered LogWriter.
+The cost of the disk shows with `--fsync` (LOG_FSYNC) or with
+`--disk-latency-ms`, which makes every append take that long as a slow disk would.
+
+Usage (from `src/`):
+  python -m benchmarks.logger_latency --chats 200 --records 50 --disk-latency-ms 2
+"""
+import argparse
+import asyncio
+import os
+import statistics
+from time import perf_counter, sleep
+from uuid import uuid4
+
+import utils.logger
+from utils.logger import LOG_WRITER, LOGS_DIR, Logger, get_index_path
+
+def simulate_slow_disk(latency: float) -> None:
+  """Makes every log append block for `latency` seconds, on whichever thread runs it."""
+  append_records = utils.logger.append_records
+
+  def slow_append_records(path, records):
+    sleep(latency)
+    append_records(path, records)
+
+  utils.logger.append_records = slow_append_records
+
+async def measure_loop_lag(stop: asyncio.Event, interval: float = 0.005) -> list[float]:
+  lags = []
+  while not stop.is_set():
+    start = perf_counter()
+    await asyncio.sleep(interval)
+    lags.append(perf_counter() - start - interval)
+  return lags
+
+async def fake_chat(logger: Logger, records: int, payload: str):
+  for i in range(records):
+    logger.info({"type": "AGENT", "content": f"message {i}"})
+    logger.debug(f"TOOLS 🛠️ -> {payload}")
+    await asyncio.sleep(0)
+
+async def run(buffered: bool, chats: int, records: int, payload_size: int) -> dict:
+  loggers = [Logger(logger_id=f"bench-{uuid4()}", buffered=buffered) for _ in range(chats)]
+  payload = "x" * payload_size
+
+  stop = asyncio.Event()
+  lag_task = asyncio.create_task(measure_loop_lag(stop))
+
+  start = perf_counter()
+  await asyncio.gather(*[fake_chat(logger, records, payload) for logger in loggers])
+  elapsed = perf_counter() - start
+
+  stop.set()
+  lags = await lag_task
+  LOG_WRITER.flush()
+
+  for logger in loggers:
+    log_path = os.path.join(LOGS_DIR, logger.get_log_file())
+    for path in (log_path, get_index_path(log_path)):
+      if os.path.exists(path):
+        os.remove(path)
+
+  lags_ms = sorted(lag * 1000 for lag in lags) or [0.0]
+  return {
+    "elapsed": elapsed,
+    "lag_p50": statistics.median(lags_ms),
+    "lag_p99": lags_ms[int(len(lags_ms) * 0.99) - 1] if len(lags_ms) > 1 else lags_ms[0],
+    "lag_max": lags_ms[-1]
+  }
+
+async def main(chats: int, records: int, payload_size: int, fsync: bool, disk_latency_ms: float):
+  utils.logger.LOG_FSYNC = fsync
+  if disk_latency_ms > 0:
+    simulate_slow_disk(disk_latency_ms / 1000)
+
+  print(f"{chats} chats x {records} INFO+DEBUG records, {payload_size} bytes per DEBUG record")
+  print(f"fsync {'on' if fsync else 'off'}, {disk_latency_ms}ms per append")
+  print(f"{'backend':<10} {'elapsed':>9} {'lag p50':>10} {'lag p99':>10} {'lag max':>10}")
+
+  for buffered in (False, True):
+    result = await run(buffered, chats, records, payload_size)
+    print(
+      f"{'buffered' if buffered else 'sync':<10} {result['elapsed']:>8.3f}s "
+      f"{result['lag_p50']:>8.2f}ms {result['lag_p99']:>8.2f}ms {result['lag_max']:>8.2f}ms"
+    )
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--chats", type=int, default=200)
+  parser.add_argument("--records", type=int, default=50)
+  parser.add_argument("--payload-size", type=int, default=20000)
+  parser.add_argument("--fsync", action="store_true")
+  parser.add_argument("--disk-latency-ms", type=float, default=0)
+  args = parser.parse_args()
+
+  asyncio.run(main(args.chats, args.records, args.payload_size, args.fsync, args.disk_latency_ms))
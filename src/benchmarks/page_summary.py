@@ -0,0 +1,71 @@
+"""
+Measures how much of the page the navigator receives when `page_summary` is
+called again after the page changes: the full summary vs the incremental diff.
+
+Usage (from `src/`):
+  python -m benchmarks.page_summary --products 200
+"""
+import argparse
+import asyncio
+
+from benchmarks.fixture_shop import catalog_page
+from scrapping_agent.browser_pool import close_browser_pools
+from scrapping_agent.scrapper import Scrapper
+from utils.utils import estimate_tokens
+
+UPDATE_CART_JS = """
+() => {
+  document.querySelector('.catalog-count').textContent = '1 item no carrinho';
+  document.querySelector('.product-stock').textContent = 'Últimas unidades';
+}
+"""
+
+FILTER_JS = """
+() => document.querySelectorAll('.product-card').forEach((card, i) => { if (i % 4 !== 0) card.remove(); })
+"""
+
+async def next_page(scrapper: Scrapper, n_products: int):
+  await scrapper.page.set_content(catalog_page(n_products, seed=7))
+
+SCENARIOS = {
+  "unchanged": None,
+  "cart update": UPDATE_CART_JS,
+  "filter 3/4 out": FILTER_JS,
+  "next page": next_page,
+}
+
+async def main(n_products: int):
+  scrapper = Scrapper()
+  await scrapper.initialize("about:blank")
+
+  print(f"Catalog with {n_products} products, budget of {scrapper.summary_token_budget} tokens")
+  print(f"{'scenario':<16} {'full chars':>11} {'full tokens':>12} {'diff chars':>11} {'diff tokens':>12} {'saved':>7}")
+
+  try:
+    for name, change in SCENARIOS.items():
+      await scrapper.page.set_content(catalog_page(n_products))
+      await scrapper.page_summary(full=True)
+
+      if isinstance(change, str):
+        await scrapper.page.evaluate(change)
+      elif change is not None:
+        await change(scrapper, n_products)
+
+      diff_output = await scrapper.page_summary()
+      full_output = await scrapper.page_summary(full=True)
+
+      print(
+        f"{name:<16} {len(full_output):>11} {estimate_tokens(full_output):>12} "
+        f"{len(diff_output):>11} {estimate_tokens(diff_output):>12} "
+        f"{1 - len(diff_output) / len(full_output):>6.0%}"
+      )
+  finally:
+    await scrapper.close()
+    await close_browser_pools()
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--products", type=int, default=200)
+  args = parser.parse_args()
+
+  asyncio.run(main(args.products))
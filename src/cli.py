@@ -4,6 +4,8 @@ from uuid import uuid4
 from langchain_openai import ChatOpenAI
 
 from scrapping_agent.agent import ScrappingAgent
+from scrapping_agent.browser_pool import close_browser_pools
+from scrapping_agent.checkpoints import close_checkpointer
 from shopping_agent.agent import ShoppingAgent
 from utils.logger import Logger
 
@@ -14,7 +16,7 @@ async def run_shopping_agent_cli():
   start_time = time.time()
   llm = ChatOpenAI(model="gpt-4.1-mini")
   logger = Logger(show_debug_logs=True, logger_id=str(uuid4()))
-  logger.LOGS_QUEUE.put = log_listener
+  logger.LOGS_QUEUE.put_nowait = log_listener
   agent = ShoppingAgent(llm, logger)
 
   user_input = input("O que deseja comprar? ")
@@ -31,12 +33,14 @@ async def run_shopping_agent_cli():
   logger.info(res)
   end_time = time.time()
   logger.info({"type": "END_TIME", "content": f"{end_time - start_time:.2f}s"})
+  await close_browser_pools()
+  await close_checkpointer()
 
 async def run_scrapping_agent():
   """Main function to execute the web navigation agent."""
   llm = ChatOpenAI(model="o4-mini")
   logger = Logger(file_name="ml",show_debug_logs=True)
-  logger.LOGS_QUEUE.put = log_listener
+  logger.LOGS_QUEUE.put_nowait = log_listener
 
   agent = ScrappingAgent(llm, debug=True, logger=logger)
   await agent.initialize("https://books.toscrape.com", headless=False)
@@ -44,4 +48,6 @@ async def run_scrapping_agent():
   result = await agent.run("Quero comprar: todos os livros de ficção cientifica", all_results=True)
 
   await agent.close()
+  await close_browser_pools()
+  await close_checkpointer()
   print(result)
\ No newline at end of file
@@ -1,4 +1,5 @@
 import asyncio
+import os
 import sys
 
 import uvicorn
@@ -17,4 +18,7 @@ if __name__ == "__main__":
     asyncio.run(run_scrapping_agent())
     sys.exit(0)
 
-  uvicorn.run(app, host="0.0.0.0", port=3000)
\ No newline at end of file
+  workers = int(os.getenv("SERVER_WORKERS", "1"))
+  if workers > 1 and os.getenv("CHAT_STORE", "memory") != "sqlite":
+    sys.exit("SERVER_WORKERS > 1 requires CHAT_STORE=sqlite: the memory chat store is not shared between workers.")
+  uvicorn.run(app if workers == 1 else "server:app", host="0.0.0.0", port=3000, workers=workers)
\ No newline at end of file
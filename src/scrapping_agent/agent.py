@@ -3,45 +3,63 @@ from urllib.parse import urlparse
 from uuid import uuid4
 from typing import Annotated, TypedDict
 
+from scrapping_agent.checkpoints import get_checkpointer, is_resumable, resume_thread_id
 from scrapping_agent.scrap import ScrapScriptsManager
+from scrapping_agent.http_scrapper import HTTP_FAST_PATH, TieredScrapper
 from scrapping_agent.scrapper import Scrapper
+from scrapping_agent.script_runner import ScrapScriptRunner, is_replayable
+from scrapping_agent.structured_data import (
+  STRUCTURED_DATA_SHORTCUT, answering_products, extract_structured_products, format_products
+)
 from scrapping_agent.tools import make_scrapper_tools
+from utils.compaction import make_compaction_node, tokens_saved
+from utils.llm import get_llm
+from utils.llm_cache import cached_tokens, invoke_llm
 from utils.logger import Logger
-from utils.utils import get_prompt
+from utils.prompts import make_prompt_registry
+from utils.tracing import Span
+from utils.utils import get_run_context
 
 from langchain_core.language_models import BaseChatModel
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langgraph.checkpoint.memory import MemorySaver
-from langgraph.graph import StateGraph, END
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableConfig
+from langgraph.errors import GraphRecursionError
+from langgraph.graph import StateGraph
 from langgraph.graph.message import add_messages
 from langgraph.prebuilt import ToolNode, tools_condition
-from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
 import time
 
 class State(TypedDict):
   messages: Annotated[list, add_messages]
   should_end: bool
+  # Page the navigator was on at its last step, where a resumed run picks up.
+  page_url: str
+
+PROMPTS = make_prompt_registry(os.path.join(os.path.dirname(__file__), "prompts"))
+
+# Threads with a run in this process; a second run of the same scrape must not share its checkpoints.
+_running_threads: set[str] = set()
 
 class ScrappingAgent:
   def __init__(
     self,
     llm: BaseChatModel,
     debug: bool = True,
-    vision_model = ChatOpenAI(model="gpt-4o"),
-    logger: Logger = None
+    vision_model: BaseChatModel = None,
+    logger: Logger = None,
+    graph = None
   ):
     self.debug = debug
     self.logger = logger
 
-    self.scrapper = Scrapper()
+    self.scrapper = TieredScrapper() if HTTP_FAST_PATH else Scrapper()
     self.llm = llm
     self.vision_model = vision_model
 
-    self.graph = None
-    self.scrapping_tools = None
-    self.tools_by_name = None
-    self.current_node = None
+    self.graph = graph
+    self.scrapping_tools = make_scrapper_tools()
+    self.tools_by_name = {tool.name: tool for tool in self.scrapping_tools}
 
   async def initialize(self, url:str, headless: bool = True):
     self.url = url
@@ -54,17 +72,15 @@ class ScrappingAgent:
 
     await self.scrapper.initialize(url, headless=headless)
 
-    self.scrapping_tools = make_scrapper_tools(
-      self.scrapper,
-      vision_model=self.vision_model
-    )
-    self.tools_by_name = {tool.name: tool for tool in self.scrapping_tools}
-
   async def close(self):
     if self.scrapper:
       await self.scrapper.close()
 
   async def run(self, query: str, all_results: bool = True, recursion_limit: int = 100):
+    with Span("ScrappingAgent.run", "run", self.logger, site=self.url):
+      return await self.__run(query, all_results, recursion_limit)
+
+  async def __run(self, query: str, all_results: bool, recursion_limit: int):
     start_time = time.time()
 
     site_data = await self.scrapper.getSiteData()
@@ -82,30 +98,96 @@ class ScrappingAgent:
     if not self.graph:
       self.graph = self._build_graph()
 
+    if STRUCTURED_DATA_SHORTCUT:
+      products = await self._get_structured_answer(query, all_results)
+
+      if products:
+        self.logger.debug(f"Structured data answered the query for {self.url} with {len(products)} products in {time.time() - start_time:.2f}s")
+        self._log_resource_stats()
+        scraping_context["content"]["end_time"] = time.time()
+        self.logger.info(scraping_context)
+
+        return { "type": "RESPONSE", "content": format_products(products, self.url) }
+
     ssm = ScrapScriptsManager()
 
     scrap_script_exists = ssm.exists(urlparse(self.url).netloc)
     scrap_script = ssm.get(urlparse(self.url).netloc) if scrap_script_exists else "None"
+    script_failure = None
+
+    if scrap_script_exists and is_replayable(scrap_script):
+      try:
+        extracted = await ScrapScriptRunner(self.scrapper).run(scrap_script, query)
+
+        self.logger.debug(f"Script replayed for {self.url} in {time.time() - start_time:.2f}s")
+        self._log_resource_stats()
+        scraping_context["content"]["end_time"] = time.time()
+        self.logger.info(scraping_context)
+
+        return { "type": "RESPONSE", "content": "\n\n".join(extracted) }
+      except Exception as e:
+        script_failure = str(e)
+        self.logger.debug(f"Script replay failed, falling back to the navigator. {script_failure}")
+        await self.scrapper.navigate(self.url)
 
     initial_message = f"Site: {self.url}\n" \
       + f"Query: {query}\n"\
       + f"All: {all_results}\n"\
       + f"Script: {scrap_script}"
 
+    if script_failure:
+      initial_message += f"\nScript failure: {script_failure}"
+
     initial_state = State(
       messages=[HumanMessage(initial_message)],
-      should_end=False
+      should_end=False,
+      page_url=""
     )
 
-    config = {"configurable": {"thread_id": "1"}, "recursion_limit": recursion_limit}
+    run_context = {
+      "logger": self.logger,
+      "scrapper": self.scrapper,
+      "vision_model": self.vision_model or get_llm("gpt-4o")
+    }
+    # The compiled graph may be shared with other agents, so every run needs its own thread.
+    # Resumable scrapes get the same one for the same site and query, unless it is already running.
+    checkpointer = self.graph.checkpointer
+    resumable = is_resumable(checkpointer)
+    thread_id = resume_thread_id(self.url, query, all_results) if resumable else str(uuid4())
+    if thread_id in _running_threads:
+      thread_id = str(uuid4())
+    config = {"configurable": {"thread_id": thread_id, "run": run_context}, "recursion_limit": recursion_limit}
 
     self.logger.debug(initial_message)
 
-    result = await self.graph.ainvoke(initial_state, config)
+    _running_threads.add(thread_id)
+    finished = False
+    try:
+      graph_input = initial_state
+      if resumable:
+        await checkpointer.prune_threads()
+        graph_input = await self._resume_input(config, initial_state)
+
+      # In memory, only the final checkpoint is written: nothing could resume from the others.
+      result = await self.graph.ainvoke(graph_input, config, durability="async" if resumable else "exit")
+      finished = True
+    except GraphRecursionError:
+      # Resuming would only hit the limit again.
+      finished = True
+      raise
+    finally:
+      _running_threads.discard(thread_id)
+      # A crashed or cancelled resumable run keeps its thread for the next run of the same scrape.
+      if finished or not resumable:
+        await checkpointer.adelete_thread(thread_id)
 
     ai_messages = [msg for msg in result["messages"] if isinstance(msg, AIMessage)]
     total_tokens = sum(msg.usage_metadata.get("total_tokens", 0) for msg in ai_messages)
-    self.logger.debug(f"Total tokens: {total_tokens}")
+    self.logger.debug(
+      f"Total tokens: {total_tokens} (~{tokens_saved(config)} saved by compaction, "
+      f"{cached_tokens(ai_messages)} by the LLM cache)"
+    )
+    self._log_resource_stats()
 
     scraping_context["content"]["end_time"] = time.time()
     self.logger.info(scraping_context)
@@ -113,46 +195,119 @@ class ScrappingAgent:
     return { "type": "RESPONSE", "content": result["messages"][-1].content }
 
 
+  async def _resume_input(self, config: RunnableConfig, initial_state: State) -> State | None:
+    """
+      The input of a run on the thread of `config`: `initial_state` for a new
+      scrape, or None when a previous run stopped midway, after putting the
+      browser back on its page and telling the navigator what happened.
+    """
+    snapshot = await self.graph.aget_state(config)
+    if not snapshot.next:
+      if snapshot.values:
+        await self.graph.checkpointer.adelete_thread(config["configurable"]["thread_id"])
+      return initial_state
+
+    messages = snapshot.values["messages"]
+    page_url = snapshot.values.get("page_url") or self.url
+    if page_url != self.scrapper.page_url():
+      await self.scrapper.navigate(page_url)
+    self.logger.debug(f"Resuming the scrape after {len(messages)} messages on {page_url}")
+
+    note = f"The scrape was interrupted and resumed in a new browser session on {page_url}. " \
+      + "Check the page again before interacting with it."
+    last_message = messages[-1]
+    if isinstance(last_message, AIMessage) and last_message.tool_calls:
+      # The tool calls didn't finish, each needs an answer before the navigator goes on.
+      tool_messages = [ToolMessage(note, tool_call_id=tc["id"]) for tc in last_message.tool_calls]
+      await self.graph.aupdate_state(config, {"messages": tool_messages}, as_node="tools")
+    else:
+      await self.graph.aupdate_state(config, {"messages": [HumanMessage(note)]}, as_node="compaction")
+
+    return None
+
+  async def _get_structured_answer(self, query: str, all_results: bool) -> list[dict]:
+    """Products from the page's schema.org data that answer the query, if any."""
+    try:
+      html = await self.scrapper.page_html()
+      products = answering_products(extract_structured_products(html, self.url), query)
+    except Exception as e:
+      self.logger.debug(f"Structured data extraction failed for {self.url}. {str(e)}")
+      return []
+
+    return products if all_results else products[:1]
+
+  def _log_resource_stats(self):
+    if getattr(self.scrapper, "escalation_reason", None):
+      self.logger.debug(f"Escalated from HTTP to the browser: {self.scrapper.escalation_reason}")
+
+    for stats in self.scrapper.resource_stats():
+      self.logger.debug(
+        f"Page {stats['url']} ({stats['fetcher']}): loaded in {stats['load_time'] or 0:.2f}s, "
+        + f"{stats['requests']} requests, {stats['blocked']} blocked {stats['blocked_by_type']}, "
+        + f"{stats['bytes_loaded'] / 1024:.0f} KB loaded, ~{stats['estimated_bytes_saved'] / 1024:.0f} KB saved"
+      )
+
   def _build_graph(self) -> StateGraph:
     graph_builder = StateGraph(State)
 
     navigator_node = self.make_default_node("navigator", tools=self.scrapping_tools)
     tools_node = ToolNode(self.scrapping_tools)
+    compaction_node = make_compaction_node()
 
     graph_builder.add_node("navigator", navigator_node)
     graph_builder.add_node("tools", tools_node)
+    graph_builder.add_node("compaction", compaction_node)
 
     graph_builder.set_entry_point("navigator")
     graph_builder.add_conditional_edges("navigator", tools_condition)
-    graph_builder.add_edge("tools", "navigator")
+    graph_builder.add_edge("tools", "compaction")
+    graph_builder.add_edge("compaction", "navigator")
 
-    memory = MemorySaver()
-    return graph_builder.compile(checkpointer=memory)
+    return graph_builder.compile(checkpointer=get_checkpointer())
 
   def make_default_node(self, name: str, tools: list = []):
-    async def node(state: State):
-      self.current_node = name.upper()
+    llm = self.llm if len(tools) == 0 else self.llm.bind_tools(tools)
+
+    async def node(state: State, config: RunnableConfig):
+      run = get_run_context(config)
+      logger = run["logger"]
       prompt = self._get_prompt_template(name)
-      llm = self.llm.model_copy()
-      llm = llm if len(tools) == 0 else llm.bind_tools(tools)
 
-      message = await (prompt | llm).ainvoke(state["messages"])
+      with Span(name, "node", logger):
+        message = await invoke_llm(name, prompt, llm, state["messages"])
       tool_calls = [
         f"{tc['name']}(" + ", ".join(f"{k}={v!r}" for k, v in tc['args'].items()) + ")"
         for tc in message.tool_calls
       ]
-      self.logger.debug(f"\n{name.upper()} 🤖")
-      self.logger.debug(f"message: {message.content}")
-      self.logger.debug(f"tool_calls: {tool_calls}")
-      self.logger.debug(f"tokens: {message.usage_metadata['total_tokens']}")
+      logger.debug(f"\n{name.upper()} 🤖 (prompt {PROMPTS.version(name)})")
+      logger.debug(f"message: {message.content}")
+      logger.debug(f"tool_calls: {tool_calls}")
+      logger.debug(f"tokens: {message.usage_metadata['total_tokens']}")
 
-      return {"messages": [message]}
+      return {"messages": [message], "page_url": run["scrapper"].page_url() or ""}
 
     return node
 
   def _get_prompt_template(self, role) -> ChatPromptTemplate:
-    prompt_path = os.path.join(os.path.dirname(__file__), "prompts", f"{role}.md")
-    return ChatPromptTemplate.from_messages([
-      ("system", get_prompt(prompt_path)),
-      MessagesPlaceholder("messages")
-    ])
\ No newline at end of file
+    return PROMPTS.get(role)
+
+_scrapping_graphs: dict[str, object] = {}
+
+def make_scrapping_agent(
+  model: str = "o4-mini",
+  vision_model: str = "gpt-4o",
+  debug: bool = False,
+  logger: Logger = None
+) -> ScrappingAgent:
+  """Build a ScrappingAgent on the shared LLM clients and a graph compiled once per model."""
+  llm = get_llm(model)
+  if model not in _scrapping_graphs:
+    _scrapping_graphs[model] = ScrappingAgent(llm)._build_graph()
+
+  return ScrappingAgent(
+    llm,
+    debug=debug,
+    vision_model=get_llm(vision_model),
+    logger=logger,
+    graph=_scrapping_graphs[model]
+  )
@@ -0,0 +1,209 @@
+import asyncio
+from os import getenv
+from time import time
+
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page
+
+class PooledBrowser:
+  def __init__(self, browser: Browser):
+    self.browser = browser
+    self.uses = 0
+    self.active = 0
+    self.launched_at = time()
+
+  def is_healthy(self) -> bool:
+    return self.browser.is_connected()
+
+class BrowserLease:
+  """
+    An isolated BrowserContext (and its first page) leased from a BrowserPool.
+    Must be returned with `release` once the scrape is done.
+  """
+  def __init__(self, pool: "BrowserPool", pooled_browser: PooledBrowser, context: BrowserContext, page: Page):
+    self.pool = pool
+    self.pooled_browser = pooled_browser
+    self.context = context
+    self.page = page
+    self.released = False
+
+  async def release(self) -> None:
+    await self.pool.release(self)
+
+class BrowserPool:
+  """
+    Keeps a bounded number of warm Chromium processes and hands out isolated
+    contexts on them. Browsers are recycled after `max_uses` leases and replaced
+    when they are found disconnected.
+  """
+  def __init__(
+    self,
+    size: int = 2,
+    contexts_per_browser: int = 3,
+    max_uses: int = 30,
+    headless: bool = True
+  ):
+    self.size = size
+    self.contexts_per_browser = contexts_per_browser
+    self.max_uses = max_uses
+    self.headless = headless
+
+    self.playwright = None
+    self.browsers: list[PooledBrowser] = []
+    self.retiring: list[PooledBrowser] = []
+
+    self._slots = asyncio.Semaphore(size * contexts_per_browser)
+    self._lock = asyncio.Lock()
+
+    self.launches = 0
+    self.recycled = 0
+    self.unhealthy = 0
+    self.leases = 0
+    self.failed_leases = 0
+    self.waiting = 0
+    self.total_wait_time = 0.0
+
+  async def acquire(self) -> BrowserLease:
+    wait_start = time()
+    self.waiting += 1
+    try:
+      await self._slots.acquire()
+    finally:
+      self.waiting -= 1
+    self.total_wait_time += time() - wait_start
+
+    pooled_browser = None
+    try:
+      async with self._lock:
+        pooled_browser = await self._pick_browser()
+        pooled_browser.active += 1
+        pooled_browser.uses += 1
+
+      context = await pooled_browser.browser.new_context()
+      page = await context.new_page()
+    except Exception:
+      self.failed_leases += 1
+      if pooled_browser:
+        pooled_browser.active -= 1
+        await self._retire_if_done(pooled_browser)
+      self._slots.release()
+      raise
+
+    self.leases += 1
+    return BrowserLease(self, pooled_browser, context, page)
+
+  async def release(self, lease: BrowserLease) -> None:
+    if lease.released:
+      return
+    lease.released = True
+
+    try:
+      await lease.context.close()
+    except Exception:
+      pass
+
+    pooled_browser = lease.pooled_browser
+    pooled_browser.active -= 1
+
+    async with self._lock:
+      if not pooled_browser.is_healthy() and pooled_browser in self.browsers:
+        self.unhealthy += 1
+        self.browsers.remove(pooled_browser)
+        self.retiring.append(pooled_browser)
+      await self._retire_if_done(pooled_browser)
+
+    self._slots.release()
+
+  async def close(self) -> None:
+    async with self._lock:
+      for pooled_browser in self.browsers + self.retiring:
+        await self._close_browser(pooled_browser)
+      self.browsers = []
+      self.retiring = []
+
+      if self.playwright:
+        await self.playwright.stop()
+        self.playwright = None
+
+  def metrics(self) -> dict:
+    return {
+      "headless": self.headless,
+      "size": self.size,
+      "contexts_per_browser": self.contexts_per_browser,
+      "max_uses": self.max_uses,
+      "browsers": len(self.browsers),
+      "retiring_browsers": len(self.retiring),
+      "active_leases": sum(b.active for b in self.browsers + self.retiring),
+      "waiting": self.waiting,
+      "leases": self.leases,
+      "failed_leases": self.failed_leases,
+      "launches": self.launches,
+      "recycled": self.recycled,
+      "unhealthy": self.unhealthy,
+      "avg_wait_time": self.total_wait_time / self.leases if self.leases else 0.0
+    }
+
+  async def _pick_browser(self) -> PooledBrowser:
+    for pooled_browser in list(self.browsers):
+      if not pooled_browser.is_healthy():
+        self.unhealthy += 1
+        self.browsers.remove(pooled_browser)
+        self.retiring.append(pooled_browser)
+        await self._retire_if_done(pooled_browser)
+      elif pooled_browser.uses >= self.max_uses:
+        self.recycled += 1
+        self.browsers.remove(pooled_browser)
+        self.retiring.append(pooled_browser)
+        await self._retire_if_done(pooled_browser)
+
+    available = [b for b in self.browsers if b.active < self.contexts_per_browser]
+    if available:
+      return min(available, key=lambda b: b.active)
+
+    if len(self.browsers) < self.size:
+      pooled_browser = await self._launch()
+      self.browsers.append(pooled_browser)
+      return pooled_browser
+
+    # Slots are guarded by the semaphore, so this only happens while a retiring
+    # browser still holds leases. Use the least loaded browser meanwhile.
+    return min(self.browsers, key=lambda b: b.active)
+
+  async def _launch(self) -> PooledBrowser:
+    if not self.playwright:
+      self.playwright = await async_playwright().start()
+
+    browser = await self.playwright.chromium.launch(headless=self.headless)
+    self.launches += 1
+    return PooledBrowser(browser)
+
+  async def _retire_if_done(self, pooled_browser: PooledBrowser) -> None:
+    if pooled_browser in self.retiring and pooled_browser.active <= 0:
+      self.retiring.remove(pooled_browser)
+      await self._close_browser(pooled_browser)
+
+  async def _close_browser(self, pooled_browser: PooledBrowser) -> None:
+    try:
+      await pooled_browser.browser.close()
+    except Exception:
+      pass
+
+_pools: dict[bool, BrowserPool] = {}
+
+def get_browser_pool(headless: bool = True) -> BrowserPool:
+  """Return the process-wide pool for the given headless mode, creating it on first use."""
+  if headless not in _pools:
+    _pools[headless] = BrowserPool(
+      size=int(getenv("BROWSER_POOL_SIZE", "2")),
+      contexts_per_browser=int(getenv("BROWSER_POOL_CONTEXTS_PER_BROWSER", "3")),
+      max_uses=int(getenv("BROWSER_POOL_MAX_USES", "30")),
+      headless=headless
+    )
+  return _pools[headless]
+
+async def close_browser_pools() -> None:
+  for pool in list(_pools.values()):
+    await pool.close()
+  _pools.clear()
+
+def browser_pools_metrics() -> list[dict]:
+  return [pool.metrics() for pool in _pools.values()]
@@ -0,0 +1,110 @@
+import os
+import time
+from os import getenv
+
+import aiosqlite
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from utils.cache import make_cache_key
+
+# With a database, scrapes that crash or are cancelled resume from their last step on the next run.
+CHECKPOINT_DB = getenv("SCRAPPING_CHECKPOINT_DB") or None
+# Checkpoints kept per thread (resuming only needs the last one) and seconds an unfinished thread is kept.
+CHECKPOINT_KEEP = max(1, int(getenv("SCRAPPING_CHECKPOINT_KEEP", "2")))
+CHECKPOINT_TTL = float(getenv("SCRAPPING_CHECKPOINT_TTL", str(24 * 60 * 60)))
+
+class PrunedSqliteSaver(AsyncSqliteSaver):
+  """
+    SQLite checkpointer that keeps only the last `keep` checkpoints of each
+    thread, so a long run doesn't store its whole conversation once per step,
+    and records when each thread was last written so threads left behind by
+    crashed runs can be pruned.
+  """
+  def __init__(self, conn: aiosqlite.Connection, keep: int = CHECKPOINT_KEEP):
+    super().__init__(conn)
+    self.keep = keep
+
+  async def setup(self) -> None:
+    if self.is_setup:
+      return
+    await super().setup()
+    async with self.lock:
+      await self.conn.execute(
+        "CREATE TABLE IF NOT EXISTS thread_activity (thread_id TEXT PRIMARY KEY, updated_at REAL NOT NULL)"
+      )
+      await self.conn.commit()
+
+  async def aput(self, config, checkpoint, metadata, new_versions):
+    next_config = await super().aput(config, checkpoint, metadata, new_versions)
+    thread_id = str(config["configurable"]["thread_id"])
+    checkpoint_ns = config["configurable"]["checkpoint_ns"]
+
+    kept = "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT ?"
+    params = (thread_id, checkpoint_ns, thread_id, checkpoint_ns, self.keep)
+    async with self.lock:
+      await self.conn.execute(
+        f"DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN ({kept})", params
+      )
+      await self.conn.execute(
+        f"DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN ({kept})", params
+      )
+      await self.conn.execute(
+        "INSERT OR REPLACE INTO thread_activity (thread_id, updated_at) VALUES (?, ?)", (thread_id, time.time())
+      )
+      await self.conn.commit()
+
+    return next_config
+
+  async def adelete_thread(self, thread_id: str) -> None:
+    await self.setup()
+    await super().adelete_thread(thread_id)
+    async with self.lock:
+      await self.conn.execute("DELETE FROM thread_activity WHERE thread_id = ?", (str(thread_id),))
+      await self.conn.commit()
+
+  async def prune_threads(self, max_age: float = CHECKPOINT_TTL) -> int:
+    """Deletes the threads not written for `max_age` seconds. Returns how many were deleted."""
+    await self.setup()
+    async with self.lock, self.conn.execute(
+      "SELECT thread_id FROM thread_activity WHERE updated_at < ?", (time.time() - max_age,)
+    ) as cursor:
+      thread_ids = [row[0] for row in await cursor.fetchall()]
+
+    for thread_id in thread_ids:
+      await self.adelete_thread(thread_id)
+    return len(thread_ids)
+
+_checkpointer: BaseCheckpointSaver | None = None
+
+def get_checkpointer() -> BaseCheckpointSaver:
+  """
+    Process-wide checkpointer of the scrapping graphs: SQLite when
+    SCRAPPING_CHECKPOINT_DB is set, in memory otherwise. Must be called with a
+    running event loop.
+  """
+  global _checkpointer
+  if _checkpointer is None:
+    if CHECKPOINT_DB:
+      os.makedirs(os.path.dirname(os.path.abspath(CHECKPOINT_DB)), exist_ok=True)
+      conn = aiosqlite.connect(CHECKPOINT_DB)
+      # The connection runs in its own thread, which must not keep a crashed process alive.
+      conn.daemon = True
+      _checkpointer = PrunedSqliteSaver(conn)
+    else:
+      _checkpointer = MemorySaver()
+  return _checkpointer
+
+def is_resumable(checkpointer: BaseCheckpointSaver) -> bool:
+  return isinstance(checkpointer, PrunedSqliteSaver)
+
+def resume_thread_id(url: str, query: str, all_results: bool) -> str:
+  """The same scrape gets the same thread, so a new run finds where the crashed one stopped."""
+  return "scrape-" + make_cache_key(url, query, all_results)[:32]
+
+async def close_checkpointer() -> None:
+  global _checkpointer
+  if isinstance(_checkpointer, PrunedSqliteSaver):
+    await _checkpointer.conn.close()
+  _checkpointer = None
@@ -0,0 +1,369 @@
+import re
+from os import getenv
+from urllib.parse import urljoin, urlparse
+
+from selectolax.lexbor import LexborHTMLParser, LexborNode
+
+from scrapping_agent.resource_policy import PageLoadStats
+from scrapping_agent.scrapper import Scrapper, TEXT_ELEMENTS_SELECTOR
+from utils.http import get_http_client, response_validators
+from utils.tracing import Span, traced
+
+HTTP_FAST_PATH = getenv("SCRAPPER_HTTP_FAST_PATH", "1") == "1"
+# Pages with fewer text elements than this are assumed to be rendered by JavaScript.
+HTTP_FAST_PATH_MIN_TEXT_ELEMENTS = int(getenv("SCRAPPER_HTTP_MIN_TEXT_ELEMENTS", "10"))
+
+class HttpScrapper(Scrapper):
+  """
+    Scrapper for server-rendered pages: fetches the HTML with the shared HTTP
+    client and serializes elements with selectolax, exactly like the in-page
+    serializer does, so `extract_elements` and `page_summary` give the same output
+    without a browser. It can't interact with the page.
+  """
+  def __init__(self, *args, **kwargs):
+    super().__init__(*args, **kwargs)
+    self.tree: LexborHTMLParser = None
+    self.html = None
+    self.current_url = None
+    self.escalation_reason = None
+    self.tabs_needing_browser: list[str] = []
+
+  @traced("scrapper")
+  async def initialize(self, url: str, headless: bool = True) -> None:
+    self.url = url
+    response = await self.__load(url)
+    if response.status_code < 400:
+      self.validators = response_validators(response.headers, response.text)
+
+  async def close(self) -> None:
+    self.tree = None
+    self.html = None
+
+  async def __load(self, url: str):
+    """Fetches the page and sets `escalation_reason` when it needs a browser. Returns the response."""
+    response, tree = await self.__fetch(url)
+
+    self.current_url = str(response.url)
+    self.html = response.text
+    self.tree = tree
+    self.escalation_reason = self.__needs_browser(response, tree)
+    return response
+
+  async def __fetch(self, url: str):
+    stats = PageLoadStats(url, fetcher="http")
+    self.page_loads.append(stats)
+    stats.record_request()
+
+    with Span("HttpScrapper.fetch", "scrapper", url=url) as fetch_span:
+      response = await get_http_client().get(url)
+      stats.record_response(str(len(response.content)))
+      stats.finish()
+      fetch_span.set(status_code=response.status_code, bytes_loaded=stats.bytes_loaded)
+
+    return response, LexborHTMLParser(response.text)
+
+  def __needs_browser(self, response, tree: LexborHTMLParser) -> str | None:
+    # Missing pages are missing in the browser too, other errors may be bot protection.
+    if response.status_code in (404, 410):
+      return None
+    if response.status_code >= 400:
+      return f"HTTP {response.status_code}"
+
+    if "html" not in response.headers.get("content-type", "text/html"):
+      return f"Not an HTML page ({response.headers.get('content-type')})"
+
+    text_elements = sum(1 for node in tree.css(TEXT_ELEMENTS_SELECTOR) if node.text(deep=True).strip())
+    if text_elements < HTTP_FAST_PATH_MIN_TEXT_ELEMENTS:
+      return f"Only {text_elements} text elements in the HTML, the page is probably rendered by JavaScript"
+
+    return None
+
+  async def getSiteData(self):
+    _, title, _ = await self.page_info()
+
+    return {
+      "site": self.url,
+      "icon": "https://www.google.com/s2/favicons?domain=" + urlparse(self.url).netloc,
+      "title": title
+    }
+
+  def supports_selector(self, el_selector: str) -> bool:
+    """Whether selectolax understands the selector (Playwright's xpath=, text=, :has-text()... it doesn't)."""
+    try:
+      self.tree.css_first(el_selector)
+      return True
+    except Exception:
+      return False
+
+  async def extract_elements(self, el_selector: str, trunc: bool = True, limit: int = 50, compact: bool = False, bulk: bool = True):
+    return await super().extract_elements(el_selector, trunc, limit, compact, bulk=True)
+
+  @traced("scrapper")
+  async def serialize_elements(self, el_selector: str, trunc: bool, limit: int, compact: bool) -> list[str]:
+    return serialize_tree(self.tree, el_selector, trunc, limit, compact)
+
+  @traced("scrapper")
+  async def page_html(self) -> str:
+    return self.html
+
+  async def page_info(self) -> tuple[str, str, str]:
+    title_node = self.tree.css_first("title")
+    description_node = self.tree.css_first('meta[name="description"]')
+
+    title = title_node.text(deep=True) if title_node else ""
+    description = description_node.attributes.get("content") if description_node else None
+
+    return self.current_url, title, description or "No description available"
+
+  async def open_tabs(self, urls: list[str]) -> str:
+    self.tabs_needing_browser = []
+    return await super().open_tabs(urls)
+
+  def _current_url(self) -> str:
+    return self.current_url or ""
+
+  async def _open_tab(self, url: str):
+    response, tree = await self.__fetch(url)
+
+    reason = self.__needs_browser(response, tree)
+    if reason:
+      self.tabs_needing_browser.append(url)
+      raise Exception(f"The page needs a browser. {reason}")
+    if response.status_code >= 400:
+      raise Exception(f"HTTP {response.status_code}")
+
+    return tree
+
+  async def _serialize_tab(self, tab, el_selector: str, trunc: bool, limit: int, compact: bool) -> list[str]:
+    return serialize_tree(tab, el_selector, trunc, limit, compact)
+
+  async def _close_tab(self, tab) -> None:
+    pass
+
+  @traced("scrapper")
+  async def navigate(self, url: str):
+    try:
+      await self.__load(url)
+      return f"Navigated to {url}"
+    except Exception as e:
+      self.escalation_reason = f"HTTP fetch failed: {str(e)}"
+      return f"Error running 'navigate'. Error: {str(e)}"
+
+def serialize_tree(tree: LexborHTMLParser, el_selector: str, trunc: bool, limit: int, compact: bool) -> list[str]:
+  """Mirrors SERIALIZE_ELEMENTS_JS over parsed HTML."""
+  formatted_elements = []
+  last_element = None
+  last_count = 0
+
+  for node in select_in_document_order(tree, el_selector):
+    element = serialize_node(node, trunc)
+
+    if compact and last_element is not None \
+      and last_element["Element"] == element["Element"] \
+      and last_element.get("Classes") == element.get("Classes"):
+      last_count += 1
+      formatted_elements[-1] = stringify_element({**last_element, "Count": last_count})
+    else:
+      if compact:
+        last_element = element
+        last_count = 1
+      formatted_elements.append(stringify_element(element))
+
+    if len(formatted_elements) >= limit:
+      break
+
+  return formatted_elements
+
+def select_in_document_order(tree: LexborHTMLParser, el_selector: str):
+  """
+    Nodes matching the selector in document order, once each, like the browser's
+    querySelectorAll. `tree.css` groups the matches of a selector list by selector.
+  """
+  matched = {node.mem_id for node in tree.css(el_selector)}
+  if not matched:
+    return
+
+  for node in tree.root.traverse(include_text=False):
+    if node.mem_id in matched:
+      yield node
+
+def serialize_node(node: LexborNode, trunc: bool) -> dict:
+  tag_name = node.tag.lower()
+  element = {"Element": tag_name}
+
+  class_name = (node.attributes.get("class") or "").strip()
+  if class_name:
+    element["Classes"] = class_name
+
+  text = re.sub(r"\s+", " ", node.text(deep=True).strip())
+  if text:
+    element["Text"] = text[:50] + "..." if trunc and len(text) > 50 else text
+
+  if tag_name == "a":
+    element["Href"] = node.attributes.get("href")
+
+  if tag_name == "input":
+    element["Placeholder"] = node.attributes.get("placeholder") or "no placeholder"
+    element["Name"] = node.attributes.get("name") or "no name"
+
+  return element
+
+def stringify_element(element: dict) -> str:
+  return " ".join(f"{key}: {value}" for key, value in element.items())
+
+class TieredScrapper:
+  """
+    Starts every scrape with an HttpScrapper and escalates to a browser Scrapper,
+    on the same URL, when the page needs JavaScript, a selector needs Playwright
+    or an interaction tool is called. Once escalated it stays in the browser.
+  """
+  def __init__(self, *args, **kwargs):
+    self.scrapper_args = args
+    self.scrapper_kwargs = kwargs
+    self.active: Scrapper = HttpScrapper(*args, **kwargs)
+    self.headless = True
+    self.escalation_reason = None
+    self.validators: dict | None = None
+
+  @property
+  def page(self):
+    return self.active.page
+
+  @property
+  def url(self):
+    return self.active.url
+
+  @property
+  def escalated(self) -> bool:
+    return not isinstance(self.active, HttpScrapper)
+
+  async def initialize(self, url: str, headless: bool = True) -> None:
+    self.headless = headless
+
+    try:
+      await self.active.initialize(url, headless=headless)
+      reason = self.active.escalation_reason
+    except Exception as e:
+      reason = f"HTTP fetch failed: {str(e)}"
+
+    if reason:
+      await self.escalate(reason, url)
+    # Kept across later escalations, whose browser starts on another page.
+    self.validators = self.active.page_validators()
+
+  async def escalate(self, reason: str, url: str = None) -> None:
+    if self.escalated:
+      return
+
+    http_scrapper = self.active
+    browser_scrapper = Scrapper(*self.scrapper_args, **self.scrapper_kwargs)
+    browser_scrapper.page_loads = http_scrapper.page_loads
+
+    try:
+      with Span("TieredScrapper.escalate", "scrapper", reason=reason):
+        await browser_scrapper.initialize(url or http_scrapper.current_url, headless=self.headless)
+    except Exception:
+      await browser_scrapper.close()
+      raise
+    await http_scrapper.close()
+
+    self.active = browser_scrapper
+    self.escalation_reason = reason
+
+  async def close(self) -> None:
+    await self.active.close()
+
+  async def getSiteData(self):
+    return await self.active.getSiteData()
+
+  def resource_stats(self) -> list[dict]:
+    return self.active.resource_stats()
+
+  def page_url(self) -> str:
+    return self.active.page_url()
+
+  def page_validators(self) -> dict | None:
+    return self.validators
+
+  async def extract_elements(self, el_selector: str, trunc: bool = True, limit: int = 50, compact: bool = False, bulk: bool = True):
+    try:
+      if not self.escalated and not self.active.supports_selector(el_selector):
+        await self.escalate(f"Selector '{el_selector}' needs the browser")
+    except Exception as e:
+      return f"Error running 'extract_elements'. Error: {str(e)}"
+
+    return await self.active.extract_elements(el_selector, trunc, limit, compact, bulk=bulk)
+
+  async def interact_with_element(self, el_selector: str, interaction: str, text: str):
+    try:
+      await self.escalate(f"'{interaction}' interaction on '{el_selector}'")
+    except Exception as e:
+      return f"Error running 'interact_with_element'. Error: {str(e)}"
+
+    return await self.active.interact_with_element(el_selector, interaction, text)
+
+  async def print_page(self, full_rendering: bool = False):
+    try:
+      await self.escalate("print_page")
+    except Exception as e:
+      return f"Error running 'print_page'. Error: {str(e)}"
+
+    return await self.active.print_page(full_rendering)
+
+  async def page_summary(self, full: bool = False):
+    return await self.active.page_summary(full)
+
+  def forget_summary(self) -> None:
+    self.active.forget_summary()
+
+  async def page_html(self) -> str:
+    return await self.active.page_html()
+
+  async def open_tabs(self, urls: list[str]) -> str:
+    result = await self.active.open_tabs(urls)
+    if self.escalated or not self.active.tabs_needing_browser:
+      return result
+
+    try:
+      await self.escalate(f"Tabs need the browser: {', '.join(self.active.tabs_needing_browser)}")
+    except Exception as e:
+      return result + f"\nError opening the browser for the remaining tabs. Error: {str(e)}"
+
+    return await self.active.open_tabs(urls)
+
+  async def extract_from_tabs(self, el_selector: str, trunc: bool = True, limit: int = 50, compact: bool = False) -> str:
+    try:
+      if not self.escalated and not self.active.supports_selector(el_selector):
+        urls = list(self.active.tabs)
+        await self.escalate(f"Selector '{el_selector}' needs the browser")
+        await self.active.open_tabs(urls)
+    except Exception as e:
+      return f"Error running 'extract_from_tabs'. Error: {str(e)}"
+
+    return await self.active.extract_from_tabs(el_selector, trunc, limit, compact)
+
+  async def close_tabs(self) -> str:
+    return await self.active.close_tabs()
+
+  async def extract_from_urls(self, urls: list[str], el_selector: str, trunc: bool = True, limit: int = 50, compact: bool = False) -> str:
+    await self.open_tabs(urls)
+
+    try:
+      return await self.extract_from_tabs(el_selector, trunc, limit, compact)
+    finally:
+      await self.close_tabs()
+
+  async def navigate(self, url: str):
+    if self.escalated:
+      return await self.active.navigate(url)
+
+    url = urljoin(self.active.current_url or "", url)
+    result = await self.active.navigate(url)
+    if not self.active.escalation_reason:
+      return result
+
+    try:
+      await self.escalate(self.active.escalation_reason, url)
+      return f"Navigated to {url}"
+    except Exception as e:
+      return f"Error running 'navigate'. Error: {str(e)}"
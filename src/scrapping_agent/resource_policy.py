@@ -0,0 +1,123 @@
+from os import getenv
+from time import time
+from urllib.parse import urlparse
+
+# The text tools never look at these, but they are most of the bytes of a page.
+DEFAULT_BLOCKED_RESOURCE_TYPES = "image,media,font"
+DEFAULT_BLOCKED_DOMAINS = ",".join([
+  "google-analytics.com", "googletagmanager.com", "googleadservices.com", "googlesyndication.com",
+  "doubleclick.net", "facebook.net", "hotjar.com", "clarity.ms", "criteo.com", "criteo.net",
+  "taboola.com", "outbrain.com", "analytics.tiktok.com", "bat.bing.com", "nr-data.net",
+  "rtbhouse.com", "dynamicyield.com"
+])
+
+# Blocked requests are never downloaded, so their size is unknown. Bytes saved
+# are estimated from typical transfer sizes of each resource type.
+ESTIMATED_RESOURCE_BYTES = {
+  "image": 35_000,
+  "media": 500_000,
+  "font": 30_000,
+  "stylesheet": 20_000,
+  "script": 25_000
+}
+DEFAULT_ESTIMATED_BYTES = 5_000
+
+def parse_list(value: str) -> set[str]:
+  return {item.strip().lower() for item in value.split(",") if item.strip()}
+
+class ResourcePolicy:
+  """Decides which requests a Scrapper page aborts, by resource type and by domain."""
+  def __init__(self, blocked_types: set[str], blocked_domains: set[str], enabled: bool = True):
+    self.blocked_types = blocked_types
+    self.blocked_domains = blocked_domains
+    self.enabled = enabled
+
+  @classmethod
+  def from_env(cls) -> "ResourcePolicy":
+    return cls(
+      blocked_types=parse_list(getenv("SCRAPPER_BLOCKED_RESOURCE_TYPES", DEFAULT_BLOCKED_RESOURCE_TYPES)),
+      blocked_domains=parse_list(getenv("SCRAPPER_BLOCKED_DOMAINS", DEFAULT_BLOCKED_DOMAINS)),
+      enabled=getenv("SCRAPPER_BLOCK_RESOURCES", "1") == "1"
+    )
+
+  def blocks(self, resource_type: str, url: str) -> bool:
+    if not self.enabled:
+      return False
+    if resource_type in self.blocked_types:
+      return True
+
+    host = (urlparse(url).hostname or "").lower()
+    return any(host == domain or host.endswith("." + domain) for domain in self.blocked_domains)
+
+class PageLoadStats:
+  """Requests of one page load: what was fetched, what was blocked and how long it took."""
+  def __init__(self, url: str, fetcher: str = "browser"):
+    self.url = url
+    self.fetcher = fetcher
+    self.started_at = time()
+    self.load_time = None
+    self.requests = 0
+    self.blocked = 0
+    self.blocked_by_type: dict[str, int] = {}
+    self.bytes_loaded = 0
+    self.estimated_bytes_saved = 0
+
+  def record_request(self) -> None:
+    self.requests += 1
+
+  def record_blocked(self, resource_type: str) -> None:
+    self.blocked += 1
+    self.blocked_by_type[resource_type] = self.blocked_by_type.get(resource_type, 0) + 1
+    self.estimated_bytes_saved += ESTIMATED_RESOURCE_BYTES.get(resource_type, DEFAULT_ESTIMATED_BYTES)
+
+  def record_response(self, content_length: str | None) -> None:
+    if content_length and content_length.isdigit():
+      self.bytes_loaded += int(content_length)
+
+  def finish(self) -> None:
+    self.load_time = time() - self.started_at
+    RESOURCE_TOTALS.add(self)
+
+  def to_dict(self) -> dict:
+    return {
+      "url": self.url,
+      "fetcher": self.fetcher,
+      "load_time": self.load_time,
+      "requests": self.requests,
+      "blocked": self.blocked,
+      "blocked_by_type": self.blocked_by_type,
+      "bytes_loaded": self.bytes_loaded,
+      "estimated_bytes_saved": self.estimated_bytes_saved
+    }
+
+class ResourceTotals:
+  def __init__(self):
+    self.pages = 0
+    self.requests = 0
+    self.blocked = 0
+    self.bytes_loaded = 0
+    self.estimated_bytes_saved = 0
+    self.total_load_time = 0.0
+
+  def add(self, stats: PageLoadStats) -> None:
+    self.pages += 1
+    self.requests += stats.requests
+    self.blocked += stats.blocked
+    self.bytes_loaded += stats.bytes_loaded
+    self.estimated_bytes_saved += stats.estimated_bytes_saved
+    self.total_load_time += stats.load_time or 0.0
+
+  def metrics(self) -> dict:
+    return {
+      "pages": self.pages,
+      "requests": self.requests,
+      "blocked": self.blocked,
+      "bytes_loaded": self.bytes_loaded,
+      "estimated_bytes_saved": self.estimated_bytes_saved,
+      "avg_load_time": self.total_load_time / self.pages if self.pages else 0.0
+    }
+
+RESOURCE_TOTALS = ResourceTotals()
+
+def resource_policy_metrics() -> dict:
+  return RESOURCE_TOTALS.metrics()
@@ -1,24 +1,255 @@
-from urllib.parse import urlparse
-from time import time
+import asyncio
+from difflib import SequenceMatcher
+from os import getenv
+from urllib.parse import urljoin, urlparse
 import re
 
-from playwright.async_api import async_playwright
-from langchain_core.tools import tool
+from scrapping_agent.browser_pool import BrowserLease, get_browser_pool
+from scrapping_agent.resource_policy import PageLoadStats, ResourcePolicy
+from utils.http import response_validators
+from utils.scheduler import SCHEDULER
+from utils.tracing import Span, traced
+from utils.utils import estimate_tokens
+
+TEXT_ELEMENTS_SELECTOR = "h1, h2, h3, h4, p, li, td, th, label"
+INTERACTION_ELEMENTS_SELECTOR = "a, button, input"
+PAGE_SUMMARY_TOKEN_BUDGET = int(getenv("PAGE_SUMMARY_TOKEN_BUDGET", "8000"))
+MAX_TABS = int(getenv("SCRAPPER_MAX_TABS", "10"))
+TABS_PER_DOMAIN = int(getenv("SCRAPPER_TABS_PER_DOMAIN", "3"))
+
+# Requests the images that failed to load again, in place, and waits for them (up to the timeout).
+RELOAD_BLOCKED_IMAGES_JS = """
+(timeout) => {
+  const images = Array.from(document.images).filter((img) => img.currentSrc && (!img.complete || img.naturalWidth === 0));
+  const loads = images.map((img) => new Promise((resolve) => {
+    img.addEventListener("load", resolve, { once: true });
+    img.addEventListener("error", resolve, { once: true });
+    const src = img.src;
+    img.src = "";
+    img.src = src;
+  }));
+  return Promise.race([Promise.all(loads), new Promise((resolve) => setTimeout(resolve, timeout))]);
+}
+"""
+FULL_RENDERING_TIMEOUT_MS = 5000
+
+# Mirrors Scrapper.__serialize_element, __isDuplicated and __stringfy_element
+# so the whole extraction runs inside the page in a single round trip.
+SERIALIZE_ELEMENTS_JS = """
+(elements, { trunc, limit, compact }) => {
+  const serialize = (el) => {
+    const tagName = el.tagName.toLowerCase();
+    const element = { Element: tagName };
+
+    const rawClassName = typeof el.className === "string" ? el.className : el.getAttribute("class") || "";
+    const className = rawClassName.trim();
+    if (className) {
+      element.Classes = className;
+    }
+
+    const text = (el.textContent || "").trim().replace(/\\s+/g, " ");
+    if (text) {
+      const chars = Array.from(text);
+      element.Text = trunc && chars.length > 50 ? chars.slice(0, 50).join("") + "..." : text;
+    }
+
+    if (tagName === "a") {
+      element.Href = el.getAttribute("href");
+    }
+
+    if (tagName === "input") {
+      element.Placeholder = el.getAttribute("placeholder") || "no placeholder";
+      element.Name = el.getAttribute("name") || "no name";
+    }
+
+    return element;
+  };
+
+  const stringify = (element) => Object.entries(element)
+    .map(([key, value]) => `${key}: ${value === null ? "None" : value}`)
+    .join(" ");
+
+  const formattedElements = [];
+  let lastElement = null;
+  let lastCount = 0;
+
+  for (const el of elements) {
+    const element = serialize(el);
+
+    if (compact && lastElement !== null
+      && lastElement.Element === element.Element
+      && lastElement.Classes === element.Classes) {
+      lastCount += 1;
+      formattedElements[formattedElements.length - 1] = stringify({ ...lastElement, Count: lastCount });
+    } else {
+      if (compact) {
+        lastElement = element;
+        lastCount = 1;
+      }
+      formattedElements.push(stringify(element));
+    }
+
+    if (formattedElements.length >= limit) {
+      break;
+    }
+  }
+
+  return formattedElements;
+}
+"""
+
+def format_elements(formatted_elements: list[str]) -> str:
+  if len(formatted_elements) == 0:
+    formatted_elements = ["No elements found"]
+
+  return "Extracted elements:\n-" + "\n- ".join(formatted_elements)
+
+def fit_to_budget(lines: list[str], max_tokens: int) -> list[str]:
+  """Keeps the first lines that fit in `max_tokens`, noting how many were left out."""
+  kept_lines = []
+  used_tokens = 0
+
+  for line in lines:
+    used_tokens += estimate_tokens(line) + 1
+    if used_tokens > max_tokens:
+      kept_lines.append(
+        f"... {len(lines) - len(kept_lines)} more elements omitted to fit the token budget, use extract_elements to read them"
+      )
+      break
+    kept_lines.append(line)
+
+  return kept_lines
+
+def split_budget(sections: list[list[str]], max_tokens: int) -> list[int]:
+  """Splits the budget between sections, giving what a small section doesn't use to the others."""
+  costs = [sum(estimate_tokens(line) + 1 for line in section) for section in sections]
+  budgets = [0] * len(sections)
+  remaining_budget = max_tokens
+  by_cost = sorted(range(len(sections)), key=lambda i: costs[i])
+
+  for position, i in enumerate(by_cost):
+    budgets[i] = min(costs[i], remaining_budget // (len(sections) - position))
+    remaining_budget -= budgets[i]
+
+  return budgets
+
+def diff_elements(previous: list[str], current: list[str]) -> tuple[list[str], int]:
+  """
+    Diffs two serialized element lists.
+    Returns:
+      tuple[list[str], int]: The added (+), removed (-) and changed (~) elements and
+        the number of unchanged ones.
+  """
+  changes = []
+  unchanged = 0
+  matcher = SequenceMatcher(a=previous, b=current, autojunk=False)
+
+  for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+    if tag == "equal":
+      unchanged += i2 - i1
+      continue
+
+    paired = min(i2 - i1, j2 - j1) if tag == "replace" else 0
+    changes += [f"~ {line}" for line in current[j1:j1 + paired]]
+    changes += [f"+ {line}" for line in current[j1 + paired:j2]]
+    changes += [f"- {line}" for line in previous[i1 + paired:i2]]
+
+  return changes, unchanged
 
 class Scrapper:
-  def __init__(self):
+  def __init__(
+    self,
+    diff_summaries: bool = True,
+    summary_token_budget: int = PAGE_SUMMARY_TOKEN_BUDGET,
+    resource_policy: ResourcePolicy = None
+  ):
     self.page = None
-    self.broser = None
-    self.playwright = None
+    self.context = None
+    self.lease: BrowserLease = None
     self.url = None
+    self.holds_browser_slot = False
+
+    self.diff_summaries = diff_summaries
+    self.summary_token_budget = summary_token_budget
+    self.summary_snapshot = None
+
+    self.resource_policy = resource_policy or ResourcePolicy.from_env()
+    self.full_rendering = False
+    self.page_loads: list[PageLoadStats] = []
+    self.loads_by_page: dict = {}
+    # `etag`, `last_modified` and `content_hash` of the page the scrapper was initialized on.
+    self.validators: dict | None = None
+
+    # Extra tabs opened by `open_tabs`, by url, and the urls that failed to open.
+    self.tabs: dict = {}
+    self.tab_errors: dict[str, str] = {}
   
+  @traced("scrapper")
   async def initialize(self, url: str, headless: bool = True) -> None:
-    self.playwright = await async_playwright().start()
-    self.browser = await self.playwright.chromium.launch(headless=headless)
-    self.page = await self.browser.new_page()
+    await SCHEDULER.acquire("browser")
+    self.holds_browser_slot = True
+    self.lease = await get_browser_pool(headless).acquire()
+    self.context = self.lease.context
+    self.page = self.lease.page
     self.url = url
-    await self.page.goto(url)
-    await self.page.wait_for_load_state()
+
+    await self.context.route("**/*", self.__route_request)
+    self.context.on("response", self.__record_response)
+
+    response = await self.__load(url)
+    self.validators = await self.__response_validators(response)
+
+  async def __load(self, url: str, page = None):
+    """Goes to the url, recording the requests and the load time of the page. Returns the document response."""
+    page = page or self.page
+    stats = PageLoadStats(url, fetcher="browser" if page is self.page else "tab")
+    self.page_loads.append(stats)
+    self.loads_by_page[page] = stats
+
+    with Span("Scrapper.load", "scrapper", url=url, fetcher=stats.fetcher) as load_span:
+      response = await page.goto(url)
+      await page.wait_for_load_state()
+      stats.finish()
+      load_span.set(requests=stats.requests, blocked=stats.blocked, bytes_loaded=stats.bytes_loaded)
+
+    return response
+
+  async def __response_validators(self, response) -> dict | None:
+    if response is None or not response.ok:
+      return None
+    try:
+      return response_validators(response.headers, await response.text())
+    except Exception:
+      return response_validators(response.headers)
+
+  def __stats_for(self, request) -> PageLoadStats | None:
+    try:
+      return self.loads_by_page.get(request.frame.page)
+    except Exception:
+      return None
+
+  async def __route_request(self, route) -> None:
+    request = route.request
+    stats = self.__stats_for(request)
+    if stats:
+      stats.record_request()
+
+    if self.full_rendering or not self.resource_policy.blocks(request.resource_type, request.url):
+      await route.continue_()
+      return
+
+    if stats:
+      stats.record_blocked(request.resource_type)
+    await route.abort("blockedbyclient")
+
+  def __record_response(self, response) -> None:
+    stats = self.__stats_for(response.request)
+    if stats:
+      stats.record_response(response.headers.get("content-length"))
+
+  def resource_stats(self) -> list[dict]:
+    """Per page load stats: requests, blocked requests, bytes loaded, estimated bytes saved and load time."""
+    return [stats.to_dict() for stats in self.page_loads]
     
   async def getSiteData(self):
     iconUrl = "https://www.google.com/s2/favicons?domain=" + urlparse(self.url).netloc
@@ -33,12 +264,30 @@ class Scrapper:
 
   
   async def close(self) -> None:
-    if self.browser:
-      await self.browser.close()
-    if self.playwright:
-      await self.playwright.stop()
+    self.tabs = {}
+    self.tab_errors = {}
+    self.loads_by_page = {}
 
-  async def extract_elements(self, el_selector: str, trunc: bool = True, limit: int = 50, compact: bool = False):
+    try:
+      if self.lease:
+        await self.lease.release()
+        self.lease = None
+        self.context = None
+        self.page = None
+    finally:
+      if self.holds_browser_slot:
+        SCHEDULER.release("browser")
+        self.holds_browser_slot = False
+
+  @traced("scrapper")
+  async def extract_elements(
+    self,
+    el_selector: str,
+    trunc: bool = True,
+    limit: int = 50,
+    compact: bool = False,
+    bulk: bool = True
+  ):
     """
       Extracts elements from the page based on the provided selector.
       Args:
@@ -46,34 +295,49 @@ class Scrapper:
         trunc (bool): Whether to truncate the text content. Default is True.
         limit (int): The maximum number of elements to extract. Default is 50.
         compact (bool): Whether to compact identical elements with a count. Default is False.
+        bulk (bool): Whether to serialize every element inside the page in a single
+          round trip instead of querying each element. Default is True.
       Returns:
         str: A formatted string with the extracted elements.
     """
     try:
-      elements = await self.page.query_selector_all(el_selector)
-      formatted_elements = []
-      last_element = {'el': None, 'count': 0}
-      
-      for el in elements:
-        element = await self.__serialize_element(el, trunc)
-        
-        if compact and self.__isDuplicated(last_element, element):
-          updated__last_element = last_element['el'].copy()
-          updated__last_element['Count'] = last_element['count']
-          formatted_elements[-1] = self.__stringfy_element(updated__last_element)
-        else:
-          formatted_elements.append(self.__stringfy_element(element))
-
-        if len(formatted_elements) >= limit:
-          break
-      
-      if len(formatted_elements) == 0:
-        formatted_elements.append("No elements found")
+      if bulk:
+        formatted_elements = await self.serialize_elements(el_selector, trunc, limit, compact)
+      else:
+        formatted_elements = await self.__serialize_elements(el_selector, trunc, limit, compact)
 
-      return "Extracted elements:\n-" + "\n- ".join(formatted_elements)
+      return format_elements(formatted_elements)
     except Exception as e:
       return f"Error running 'extract_elements'. Error: {str(e)}"
 
+  @traced("scrapper")
+  async def serialize_elements(self, el_selector: str, trunc: bool, limit: int, compact: bool) -> list[str]:
+    """Serializes every element matching the selector inside the page, in a single round trip."""
+    return await self.page.locator(el_selector).evaluate_all(
+      SERIALIZE_ELEMENTS_JS,
+      {"trunc": trunc, "limit": limit, "compact": compact}
+    )
+
+  async def __serialize_elements(self, el_selector: str, trunc: bool, limit: int, compact: bool):
+    elements = await self.page.query_selector_all(el_selector)
+    formatted_elements = []
+    last_element = {'el': None, 'count': 0}
+    
+    for el in elements:
+      element = await self.__serialize_element(el, trunc)
+      
+      if compact and self.__isDuplicated(last_element, element):
+        updated__last_element = last_element['el'].copy()
+        updated__last_element['Count'] = last_element['count']
+        formatted_elements[-1] = self.__stringfy_element(updated__last_element)
+      else:
+        formatted_elements.append(self.__stringfy_element(element))
+
+      if len(formatted_elements) >= limit:
+        break
+
+    return formatted_elements
+
   async def __serialize_element(self, el, trunc):
     tag_name = (await el.evaluate('el => el.tagName')).lower()
     
@@ -117,6 +381,7 @@ class Scrapper:
     last_element['count'] = 1
     return False
 
+  @traced("scrapper")
   async def interact_with_element(self, el_selector: str, interaction: str, text: str):
     """
       Interacts with an element on the page based on the provided selector.
@@ -148,46 +413,219 @@ class Scrapper:
     except Exception as e:
       return f"Error running 'extract_elements'. Error: {str(e)}"
   
-  async def print_page(self):
+  @traced("scrapper")
+  async def print_page(self, full_rendering: bool = False):
     """
-      Takes a screenshot of the current page and saves it to a file.
+      Takes a full page screenshot of the current page.
+      Args:
+        full_rendering (bool): Whether to stop blocking requests and load the images the
+          resource policy blocked before the screenshot. The page is not reloaded, so what
+          was clicked or filled stays on it. Default is False.
       Returns:
-        str: The file path of the saved screenshot.
+        bytes | str: The PNG bytes of the screenshot, or an error message.
     """
     try:
-      timestamp = str(round(time()))
-      fileName= f"./temp/print_{timestamp}.png"
-      await self.page.screenshot(path=fileName, full_page=True)
-      return fileName
+      stats = self.loads_by_page.get(self.page)
+      self.full_rendering = full_rendering
+      try:
+        if full_rendering and stats and stats.blocked > 0:
+          await self.page.evaluate(RELOAD_BLOCKED_IMAGES_JS, FULL_RENDERING_TIMEOUT_MS)
+
+        # CSS pixels: a high DPI screen would only add pixels the vision model never sees.
+        return await self.page.screenshot(full_page=True, scale="css")
+      finally:
+        self.full_rendering = False
     except Exception as e:
       return f"Error running 'print_page'. Error: {str(e)}"
   
-  async def page_summary(self):
+  @traced("scrapper")
+  async def page_summary(self, full: bool = False):
     """
       Summarizes the current page by extracting the URL, title, description, text elements
-      and interaction elements.
+      and interaction elements. When `diff_summaries` is on and the page was already
+      summarized, only the elements added, removed or changed since then are returned.
+      Args:
+        full (bool): Whether to return the whole page even if a diff is available. Default is False.
       Returns:
         str: A formatted string with the page summary.
     """
     try:
-      url = self.page.url
-      title = await self.page.title()
-      description = await self.page.evaluate("() => document.querySelector('meta[name=\"description\"]')?.getAttribute('content') || 'No description available'")
+      url, title, description = await self.page_info()
       
-      text_elements_tags = "h1, h2, h3, h4, p, li, td, th, label"
-      interaction_elements_tags = "a, button, input"
+      text_elements = await self.serialize_elements(TEXT_ELEMENTS_SELECTOR, True, 3000, True)
+      interaction_elements = await self.serialize_elements(INTERACTION_ELEMENTS_SELECTOR, True, 3000, True)
 
-      text_elements = await self.extract_elements(text_elements_tags, True, 3000, True)
-      interaction_elements = await self.extract_elements(interaction_elements_tags, True, 3000, True)
+      previous_snapshot = self.summary_snapshot
+      self.summary_snapshot = {"url": url, "text": text_elements, "interaction": interaction_elements}
 
-      return f"URL: {url}\n" \
+      header = f"URL: {url}\n" \
         + f"Title: {title}\n" \
-        + f"Description: {description}\n" \
-        + f"Text elements: \n{text_elements}\n" \
-        + f"Interaction elements: \n{interaction_elements}"
+        + f"Description: {description}\n"
+      budget = self.summary_token_budget - estimate_tokens(header)
+
+      full_summary = self.__full_summary(text_elements, interaction_elements, budget)
+
+      if full or not self.diff_summaries or previous_snapshot is None or previous_snapshot["url"] != url:
+        return header + full_summary
+
+      changes_summary = self.__changes_summary(previous_snapshot, text_elements, interaction_elements, budget)
+      return header + min(full_summary, changes_summary, key=len)
     except Exception as e:
       return f"Error running 'page_summary'. Error: {str(e)}"
-    
+
+  def forget_summary(self) -> None:
+    """Makes the next page_summary return the whole page instead of the changes."""
+    self.summary_snapshot = None
+
+  @traced("scrapper")
+  async def page_html(self) -> str:
+    return await self.page.content()
+
+  async def page_info(self) -> tuple[str, str, str]:
+    """URL, title and meta description of the current page."""
+    title = await self.page.title()
+    description = await self.page.evaluate("() => document.querySelector('meta[name=\"description\"]')?.getAttribute('content') || 'No description available'")
+    return self.page.url, title, description
+
+  def __full_summary(self, text_elements: list[str], interaction_elements: list[str], budget: int) -> str:
+    text_budget, interaction_budget = split_budget([text_elements, interaction_elements], budget)
+
+    return f"Text elements: \n{format_elements(fit_to_budget(text_elements, text_budget))}\n" \
+      + f"Interaction elements: \n{format_elements(fit_to_budget(interaction_elements, interaction_budget))}"
+
+  def __changes_summary(self, previous_snapshot: dict, text_elements: list[str], interaction_elements: list[str], budget: int) -> str:
+    text_changes, text_unchanged = diff_elements(previous_snapshot["text"], text_elements)
+    interaction_changes, interaction_unchanged = diff_elements(previous_snapshot["interaction"], interaction_elements)
+
+    if not text_changes and not interaction_changes:
+      return "No changes since the previous page_summary."
+
+    text_budget, interaction_budget = split_budget([text_changes, interaction_changes], budget)
+
+    return f"Changes since the previous page_summary ({text_unchanged + interaction_unchanged} unchanged elements omitted, " \
+      + "call page_summary with full=true to see the whole page). + added, - removed, ~ changed:\n" \
+      + "Text elements: \n" + ("\n".join(fit_to_budget(text_changes, text_budget)) or "No changes") + "\n" \
+      + "Interaction elements: \n" + ("\n".join(fit_to_budget(interaction_changes, interaction_budget)) or "No changes")
+
+  @traced("scrapper")
+  async def open_tabs(self, urls: list[str]) -> str:
+    """
+      Opens the urls in new tabs, concurrently, closing the tabs opened before.
+      At most TABS_PER_DOMAIN tabs of the same domain load at the same time.
+      Args:
+        urls (list[str]): The URLs to open. Only the first MAX_TABS are opened.
+      Returns:
+        str: The urls that were opened and the ones that failed.
+    """
+    await self.close_tabs()
+
+    urls = list(dict.fromkeys(urljoin(self._current_url(), url) for url in urls))
+    skipped = urls[MAX_TABS:]
+    urls = urls[:MAX_TABS]
+    domain_slots: dict[str, asyncio.Semaphore] = {}
+
+    async def open_tab(url: str):
+      slots = domain_slots.setdefault(urlparse(url).netloc, asyncio.Semaphore(TABS_PER_DOMAIN))
+      async with slots:
+        return await self._open_tab(url)
+
+    results = await asyncio.gather(*[open_tab(url) for url in urls], return_exceptions=True)
+
+    lines = []
+    for url, tab in zip(urls, results):
+      if isinstance(tab, Exception):
+        self.tab_errors[url] = f"Error opening tab. Error: {str(tab)}"
+        lines.append(f"- {url}: {self.tab_errors[url]}")
+      else:
+        self.tabs[url] = tab
+        lines.append(f"- {url}: opened")
+    lines += [f"- {url}: not opened, the limit is {MAX_TABS} tabs" for url in skipped]
+
+    return "Tabs:\n" + "\n".join(lines)
+
+  @traced("scrapper")
+  async def extract_from_tabs(self, el_selector: str, trunc: bool = True, limit: int = 50, compact: bool = False) -> str:
+    """
+      Runs `extract_elements` on every open tab in parallel.
+      Args:
+        el_selector (str): The selector to find elements.
+        trunc (bool): Whether to truncate the text content. Default is True.
+        limit (int): The maximum number of elements to extract per tab. Default is 50.
+        compact (bool): Whether to compact identical elements with a count. Default is False.
+      Returns:
+        str: The extracted elements of each tab, sharing the page summary token budget.
+    """
+    if not self.tabs and not self.tab_errors:
+      return "No tabs open. Use 'open_tabs' first."
+
+    results = await asyncio.gather(*[
+      self._serialize_tab(tab, el_selector, trunc, limit, compact)
+      for tab in self.tabs.values()
+    ], return_exceptions=True)
+    tab_budget = self.summary_token_budget // max(len(self.tabs), 1)
+
+    blocks = []
+    for url, formatted_elements in zip(self.tabs, results):
+      if isinstance(formatted_elements, Exception):
+        blocks.append(f"Tab: {url}\nError running 'extract_elements'. Error: {str(formatted_elements)}")
+      else:
+        blocks.append(f"Tab: {url}\n" + format_elements(fit_to_budget(formatted_elements, tab_budget)))
+    blocks += [f"Tab: {url}\n{error}" for url, error in self.tab_errors.items()]
+
+    return "\n\n".join(blocks)
+
+  async def close_tabs(self) -> str:
+    for tab in self.tabs.values():
+      try:
+        await self._close_tab(tab)
+      except Exception:
+        pass
+
+    closed = len(self.tabs)
+    self.tabs = {}
+    self.tab_errors = {}
+    return f"Closed {closed} tabs"
+
+  async def extract_from_urls(self, urls: list[str], el_selector: str, trunc: bool = True, limit: int = 50, compact: bool = False) -> str:
+    """Opens the urls in tabs, extracts the elements from all of them and closes the tabs, in one step."""
+    await self.open_tabs(urls)
+
+    try:
+      return await self.extract_from_tabs(el_selector, trunc, limit, compact)
+    finally:
+      await self.close_tabs()
+
+  def page_url(self) -> str:
+    """URL of the page the agent is on."""
+    return self._current_url()
+
+  def page_validators(self) -> dict | None:
+    """Validators of the response the scrapper was initialized with, to revalidate it later."""
+    return self.validators
+
+  def _current_url(self) -> str:
+    return self.page.url
+
+  async def _open_tab(self, url: str):
+    page = await self.context.new_page()
+    try:
+      await self.__load(url, page)
+    except Exception:
+      await page.close()
+      raise
+    return page
+
+  async def _serialize_tab(self, tab, el_selector: str, trunc: bool, limit: int, compact: bool) -> list[str]:
+    return await tab.locator(el_selector).evaluate_all(
+      SERIALIZE_ELEMENTS_JS,
+      {"trunc": trunc, "limit": limit, "compact": compact}
+    )
+
+  async def _close_tab(self, tab) -> None:
+    self.loads_by_page.pop(tab, None)
+    await tab.close()
+
+  @traced("scrapper")
   async def navigate(self, url: str):
     """
       Navigates to a new URL.
@@ -197,8 +635,7 @@ class Scrapper:
         str: A message indicating the result of the navigation.
     """
     try:
-      await self.page.goto(url)
-      await self.page.wait_for_load_state()
+      await self.__load(url)
       return f"Navigated to {url}"
     except Exception as e:
       return f"Error running 'navigate'. Error: {str(e)}"
\ No newline at end of file
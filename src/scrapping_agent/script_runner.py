@@ -0,0 +1,92 @@
+from urllib.parse import quote_plus
+
+from scrapping_agent.scrapper import Scrapper
+
+SCRIPT_ACTIONS = ("navigate", "fill", "click", "extract")
+
+class ScriptStepError(Exception):
+  def __init__(self, step_index: int, step: dict, reason: str):
+    super().__init__(f"Step {step_index} ({step.get('action')}) failed: {reason}")
+    self.step_index = step_index
+    self.step = step
+    self.reason = reason
+
+def is_replayable(script) -> bool:
+  """Whether the script follows the step format understood by ScrapScriptRunner."""
+  if not isinstance(script, dict) or not isinstance(script.get("steps"), list) or not script["steps"]:
+    return False
+
+  return all(
+    isinstance(step, dict) and step.get("action") in SCRIPT_ACTIONS
+    for step in script["steps"]
+  )
+
+def is_failed_result(result: str) -> bool:
+  return result.startswith("Error running") \
+    or result.startswith("Element with selector") \
+    or result.endswith("is not visible.") \
+    or result == "Unsupported interaction." \
+    or result.endswith("-No elements found")
+
+class ScrapScriptRunner:
+  """
+    Replays a saved scrap script directly against a Scrapper, without the LLM.
+    `{query}` placeholders in urls (url encoded) and texts are replaced by the query.
+  """
+  def __init__(self, scrapper: Scrapper):
+    self.scrapper = scrapper
+
+  async def run(self, script: dict, query: str) -> list[str]:
+    """
+      Runs every step of the script.
+      Returns:
+        list[str]: The output of each `extract` step.
+      Raises:
+        ScriptStepError: When a step fails or a selector no longer matches.
+    """
+    extracted = []
+
+    for i, step in enumerate(script["steps"]):
+      result = await self.run_step(step, query)
+
+      if is_failed_result(result):
+        raise ScriptStepError(i, step, result)
+
+      if step["action"] == "extract":
+        extracted.append(result)
+
+    if not extracted:
+      raise ScriptStepError(len(script["steps"]) - 1, script["steps"][-1], "The script has no extract step.")
+
+    return extracted
+
+  async def run_step(self, step: dict, query: str) -> str:
+    action = step["action"]
+
+    if action == "navigate":
+      return await self.scrapper.navigate(self._fill_placeholders(step["url"], quote_plus(query)))
+
+    if action == "fill":
+      result = await self.scrapper.interact_with_element(
+        step["selector"], "fill", self._fill_placeholders(step.get("text", "{query}"), query)
+      )
+      if step.get("submit") and not is_failed_result(result):
+        await self.scrapper.page.keyboard.press("Enter")
+        await self.scrapper.page.wait_for_load_state()
+      return result
+
+    if action == "click":
+      result = await self.scrapper.interact_with_element(step["selector"], "click", "")
+      if not is_failed_result(result):
+        await self.scrapper.page.wait_for_load_state()
+      return result
+
+    return await self.scrapper.extract_elements(
+      step["selector"],
+      step.get("trunc", False),
+      step.get("limit", 50),
+      step.get("compact", False)
+    )
+
+  def _fill_placeholders(self, value: str, query: str) -> str:
+    return value.replace("{query}", query)
@@ -0,0 +1,285 @@
+import json
+import re
+import unicodedata
+from os import getenv
+from urllib.parse import urljoin
+
+from selectolax.lexbor import LexborHTMLParser, LexborNode
+
+STRUCTURED_DATA_SHORTCUT = getenv("STRUCTURED_DATA_SHORTCUT", "1") == "1"
+# Share of the query terms a product must contain to be considered an answer.
+MIN_QUERY_MATCH = float(getenv("STRUCTURED_DATA_MIN_QUERY_MATCH", "0.6"))
+
+# Words of a shopping query that never show up in product names.
+QUERY_STOPWORDS = {
+  "a", "o", "as", "os", "de", "da", "do", "das", "dos", "e", "em", "no", "na", "nos", "nas",
+  "com", "sem", "para", "pra", "por", "ate", "um", "uma", "ou", "que", "mais", "menos",
+  "melhor", "melhores", "bom", "boa", "bons", "barato", "barata", "baratos", "custo", "beneficio",
+  "review", "reviews", "comparativo", "comparacao", "preco", "precos", "reais", "real", "r",
+  "comprar", "onde", "qual", "quais", "top", "novo", "nova", "promocao", "oferta", "ofertas", "vs"
+}
+
+PRODUCT_TYPES = {"product", "productgroup", "individualproduct", "productmodel"}
+
+def normalize_text(text: str) -> str:
+  text = unicodedata.normalize("NFKD", text.lower())
+  return "".join(c for c in text if not unicodedata.combining(c))
+
+def query_terms(query: str) -> list[str]:
+  words = re.findall(r"\w+", normalize_text(query))
+  return [w for w in words if w not in QUERY_STOPWORDS and not w.isdigit() and len(w) > 1]
+
+def term_matches(term: str, words: set[str]) -> bool:
+  """Loose match that ignores plurals ("teclados" matches "teclado")."""
+  stem = term.rstrip("s") if len(term) > 4 else term
+  return any(word == term or (len(stem) >= 4 and word.startswith(stem)) for word in words)
+
+def query_match(product: dict, query: str) -> float:
+  terms = query_terms(query)
+  if not terms:
+    return 1.0
+
+  text = " ".join(str(product.get(key) or "") for key in ("name", "brand", "model", "description"))
+  words = set(re.findall(r"\w+", normalize_text(text)))
+  return sum(term_matches(term, words) for term in terms) / len(terms)
+
+def parse_price(value) -> float | None:
+  if isinstance(value, (int, float)):
+    return float(value)
+  if not isinstance(value, str):
+    return None
+
+  value = re.sub(r"[^\d.,]", "", value).strip(".,")
+  if re.fullmatch(r"\d{1,3}(\.\d{3})+(,\d+)?", value) or ("," in value and value.rfind(",") > value.rfind(".")):
+    # Brazilian format: dots followed by three digits separate thousands, 1.299 and 1.234,56
+    value = value.replace(".", "").replace(",", ".")
+  else:
+    # Machine format (1234.56) or thousands commas (1,234.56)
+    value = value.replace(",", "")
+  try:
+    return float(value)
+  except ValueError:
+    return None
+
+def first(value):
+  if isinstance(value, list):
+    return value[0] if value else None
+  return value
+
+def text_of(value):
+  value = first(value)
+  if isinstance(value, dict):
+    return value.get("name") or value.get("url") or value.get("@id")
+  return value
+
+def schema_type(value) -> set[str]:
+  types = value if isinstance(value, list) else [value]
+  return {str(t).rsplit("/", 1)[-1].lower() for t in types if t}
+
+def normalize_availability(value) -> tuple[str | None, bool | None]:
+  if not value:
+    return None, None
+
+  availability = str(value).rsplit("/", 1)[-1]
+  lowered = availability.lower()
+
+  if lowered in ("instock", "in stock", "limitedavailability", "onlineonly", "presale", "preorder", "backorder"):
+    return availability, True
+  if lowered in ("outofstock", "out of stock", "soldout", "discontinued", "instoreonly", "oos"):
+    return availability, False
+  return availability, None
+
+def make_product(source: str, base_url: str, **fields) -> dict:
+  availability, in_stock = normalize_availability(fields.pop("availability", None))
+  url = fields.get("url")
+  image = fields.get("image")
+  review_count = parse_price(fields.get("review_count"))
+
+  return {
+    "name": fields.get("name"),
+    "brand": fields.get("brand"),
+    "model": fields.get("model"),
+    "sku": fields.get("sku"),
+    "description": fields.get("description"),
+    "image": urljoin(base_url, image) if isinstance(image, str) else None,
+    "url": urljoin(base_url, url) if isinstance(url, str) else base_url,
+    "price": parse_price(fields.get("price")),
+    "currency": fields.get("currency"),
+    "availability": availability,
+    "in_stock": in_stock,
+    "rating": parse_price(fields.get("rating")),
+    "review_count": int(review_count) if review_count is not None else None,
+    "source": source
+  }
+
+def iter_json_ld_nodes(data):
+  """Yields every object of a JSON-LD document, following @graph, lists and ItemList items."""
+  if isinstance(data, list):
+    for item in data:
+      yield from iter_json_ld_nodes(item)
+    return
+  if not isinstance(data, dict):
+    return
+
+  yield data
+
+  for key in ("@graph", "itemListElement", "item", "mainEntity", "hasVariant"):
+    if key in data:
+      yield from iter_json_ld_nodes(data[key])
+
+def product_from_json_ld(node: dict, base_url: str) -> dict:
+  offer = first(node.get("offers")) or {}
+  if isinstance(offer, dict) and schema_type(offer.get("@type")) & {"aggregateoffer"}:
+    price = offer.get("lowPrice") or offer.get("price")
+  else:
+    price = offer.get("price") if isinstance(offer, dict) else None
+    if price is None and isinstance(offer, dict):
+      price = (first(offer.get("priceSpecification")) or {}).get("price")
+
+  rating = node.get("aggregateRating") or {}
+
+  return make_product(
+    "json-ld",
+    base_url,
+    name=text_of(node.get("name")),
+    brand=text_of(node.get("brand")),
+    model=text_of(node.get("model")) or node.get("mpn"),
+    sku=node.get("sku") or node.get("gtin13") or node.get("gtin"),
+    description=node.get("description"),
+    image=text_of(node.get("image")),
+    url=node.get("url") or (offer.get("url") if isinstance(offer, dict) else None),
+    price=price,
+    currency=offer.get("priceCurrency") if isinstance(offer, dict) else None,
+    availability=offer.get("availability") if isinstance(offer, dict) else None,
+    rating=rating.get("ratingValue") if isinstance(rating, dict) else None,
+    review_count=(rating.get("reviewCount") or rating.get("ratingCount")) if isinstance(rating, dict) else None
+  )
+
+def extract_json_ld(tree: LexborHTMLParser, base_url: str) -> list[dict]:
+  products = []
+
+  for script in tree.css('script[type="application/ld+json"]'):
+    try:
+      data = json.loads(script.text(deep=True).strip().rstrip(";"))
+    except (json.JSONDecodeError, ValueError):
+      continue
+
+    for node in iter_json_ld_nodes(data):
+      if schema_type(node.get("@type")) & PRODUCT_TYPES:
+        products.append(product_from_json_ld(node, base_url))
+
+  return products
+
+def microdata_value(node: LexborNode) -> str | None:
+  attributes = node.attributes
+  for attribute in ("content", "href", "src", "value", "datetime"):
+    if attributes.get(attribute):
+      return attributes[attribute]
+  return re.sub(r"\s+", " ", node.text(deep=True)).strip() or None
+
+def microdata_props(scope: LexborNode) -> dict:
+  """itemprops of a scope, without descending into nested scopes."""
+  props = {}
+
+  for node in scope.css("[itemprop]"):
+    parent = node.parent
+    while parent is not None and parent.mem_id != scope.mem_id and "itemscope" not in parent.attributes:
+      parent = parent.parent
+    if parent is None or parent.mem_id != scope.mem_id:
+      continue
+
+    name = node.attributes.get("itemprop")
+    if name in props:
+      continue
+    props[name] = microdata_props(node) if "itemscope" in node.attributes else microdata_value(node)
+
+  return props
+
+def extract_microdata(tree: LexborHTMLParser, base_url: str) -> list[dict]:
+  products = []
+
+  for scope in tree.css("[itemscope][itemtype]"):
+    if not schema_type(scope.attributes.get("itemtype", "").split()) & PRODUCT_TYPES:
+      continue
+
+    props = microdata_props(scope)
+    offer = props.get("offers") if isinstance(props.get("offers"), dict) else props
+    rating = props.get("aggregateRating") if isinstance(props.get("aggregateRating"), dict) else {}
+    brand = props.get("brand")
+
+    products.append(make_product(
+      "microdata",
+      base_url,
+      name=props.get("name"),
+      brand=brand.get("name") if isinstance(brand, dict) else brand,
+      model=props.get("model") or props.get("mpn"),
+      sku=props.get("sku") or props.get("gtin13"),
+      description=props.get("description"),
+      image=props.get("image"),
+      url=props.get("url"),
+      price=offer.get("price") or offer.get("lowPrice"),
+      currency=offer.get("priceCurrency"),
+      availability=offer.get("availability"),
+      rating=rating.get("ratingValue"),
+      review_count=rating.get("reviewCount") or rating.get("ratingCount")
+    ))
+
+  return products
+
+def extract_opengraph(tree: LexborHTMLParser, base_url: str) -> list[dict]:
+  meta = {}
+  for node in tree.css("meta[property], meta[name]"):
+    key = node.attributes.get("property") or node.attributes.get("name")
+    if key and key not in meta and node.attributes.get("content"):
+      meta[key] = node.attributes["content"]
+
+  price = meta.get("product:price:amount") or meta.get("og:price:amount")
+  if meta.get("og:type", "").lower() != "product" and price is None:
+    return []
+
+  return [make_product(
+    "opengraph",
+    base_url,
+    name=meta.get("og:title"),
+    brand=meta.get("product:brand"),
+    description=meta.get("og:description"),
+    image=meta.get("og:image"),
+    url=meta.get("og:url"),
+    price=price,
+    currency=meta.get("product:price:currency") or meta.get("og:price:currency"),
+    availability=meta.get("product:availability") or meta.get("og:availability")
+  )]
+
+def extract_structured_products(html: str, base_url: str) -> list[dict]:
+  """
+    Normalized product records from the schema.org JSON-LD, microdata and
+    OpenGraph data of a page. Records without a name are dropped and a product
+    described by more than one source is kept once, preferring JSON-LD.
+  """
+  tree = LexborHTMLParser(html)
+  products = []
+  seen = set()
+
+  for extractor in (extract_json_ld, extract_microdata, extract_opengraph):
+    for product in extractor(tree, base_url):
+      key = normalize_text(product["name"] or "").strip()
+      if not key or key in seen:
+        continue
+      seen.add(key)
+      products.append(product)
+
+  return products
+
+def answering_products(products: list[dict], query: str, min_match: float = MIN_QUERY_MATCH) -> list[dict]:
+  """The priced products that match the query, best matches first."""
+  scored = [
+    (query_match(product, query), product)
+    for product in products
+    if product["price"] is not None
+  ]
+  return [product for score, product in sorted(scored, key=lambda sp: -sp[0]) if score >= min_match]
+
+def format_products(products: list[dict], url: str) -> str:
+  records = [{key: value for key, value in product.items() if value is not None} for product in products]
+  return f"Dados estruturados (schema.org) extraídos de {url}:\n" \
+    + "\n".join(json.dumps(record, ensure_ascii=False) for record in records)
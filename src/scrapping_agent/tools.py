@@ -1,26 +1,36 @@
-import os
 from urllib.parse import urlparse
 from typing import Any, Dict
 
 from scrapping_agent.scrap import ScrapScriptsManager
 from scrapping_agent.scrapper import Scrapper
 from langchain_core.language_models import BaseChatModel
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import tool
 
-from utils.utils import describe_web_page_print
+from utils.vision import describe_screenshot
 
-def make_scrapper_tools(scrapper: Scrapper, vision_model: BaseChatModel = None) -> list:
+def make_scrapper_tools(scrapper: Scrapper = None, vision_model: BaseChatModel = None) -> list:
   """
-  Create and return the scrapping tools.
+  Create and return the scrapping tools. The scrapper and vision model of each
+  call are taken from the run context of the graph config, so the same tools
+  can serve every ScrappingAgent run.
   Args:
-      scrapper: The Scrapper instance to use for web scraping.
-      vision_model: The vision model to use for image processing.
+      scrapper: The Scrapper to use when the run context doesn't provide one.
+      vision_model: The vision model to use when the run context doesn't provide one.
   Returns:
       A list of tools for web scraping and interaction.
   """
+  def from_run_context(config: RunnableConfig, name: str, default):
+    return config.get("configurable", {}).get("run", {}).get(name) or default
     
   @tool
-  async def extract_elements(el_selector: str, trunc: bool = True, limit: int = 50, compact: bool = False) -> str:
+  async def extract_elements(
+    el_selector: str,
+    config: RunnableConfig,
+    trunc: bool = True,
+    limit: int = 50,
+    compact: bool = False
+  ) -> str:
     """
     Extracts elements from the page based on the provided selector.
     Args:
@@ -31,10 +41,11 @@ def make_scrapper_tools(scrapper: Scrapper, vision_model: BaseChatModel = None)
     Returns:
         A formatted string with the extracted elements.
     """
-    return await scrapper.extract_elements(el_selector, trunc, limit, compact)
+    run_scrapper = from_run_context(config, "scrapper", scrapper)
+    return await run_scrapper.extract_elements(el_selector, trunc, limit, compact)
 
   @tool
-  async def interact_with_element(el_selector: str, interaction: str, text: str = "") -> str:
+  async def interact_with_element(el_selector: str, interaction: str, config: RunnableConfig, text: str = "") -> str:
     """
     Interacts with an element on the page based on the provided selector.
     Args:
@@ -44,36 +55,103 @@ def make_scrapper_tools(scrapper: Scrapper, vision_model: BaseChatModel = None)
     Returns:
         A message indicating the result of the interaction.
     """
-    return await scrapper.interact_with_element(el_selector, interaction, text)
+    run_scrapper = from_run_context(config, "scrapper", scrapper)
+    return await run_scrapper.interact_with_element(el_selector, interaction, text)
 
   @tool
-  async def print_page() -> str:
+  async def print_page(config: RunnableConfig, full_rendering: bool = False) -> str:
     """
     Takes a screenshot of the current page and returns a description of the page.
+    Args:
+        full_rendering: Whether to load the images blocked while browsing before the screenshot. Slower. Default is False.
     Returns:
         A description of the page.
     """
-    if vision_model is None:
+    run_scrapper = from_run_context(config, "scrapper", scrapper)
+    run_vision_model = from_run_context(config, "vision_model", vision_model)
+    if run_vision_model is None:
       return "You need to define a vision model before using this tool."
     
-    filename = await scrapper.print_page()
-    page_description = describe_web_page_print(vision_model, filename)
-    os.remove(filename)
-    
-    return page_description
+    screenshot = await run_scrapper.print_page(full_rendering)
+    if isinstance(screenshot, str):
+      return screenshot
+
+    return await describe_screenshot(run_vision_model, screenshot)
 
   @tool
-  async def page_summary() -> str:
+  async def page_summary(config: RunnableConfig, full: bool = False) -> str:
     """
     Summarizes the current page by extracting the URL, title, description, text elements
-    and interaction elements.
+    and interaction elements. Calling it again on the same URL returns only the elements
+    added (+), removed (-) or changed (~) since the previous call.
+    Args:
+        full: Whether to return the whole page instead of the changes. Default is False.
     Returns:
         A formatted string with the page summary.
     """
-    return await scrapper.page_summary()
+    run_scrapper = from_run_context(config, "scrapper", scrapper)
+    return await run_scrapper.page_summary(full)
+
+  @tool
+  async def extract_from_urls(
+    urls: list[str],
+    el_selector: str,
+    config: RunnableConfig,
+    trunc: bool = True,
+    limit: int = 50,
+    compact: bool = False
+  ) -> str:
+    """
+    Opens several URLs at once in parallel tabs (pagination, product detail pages...),
+    extracts the elements matching the selector from each one and closes the tabs.
+    Args:
+        urls: The URLs to open, absolute or relative to the current page.
+        el_selector: The selector to find elements in every page.
+        trunc: Whether to truncate the text content.
+        limit: The maximum number of elements to extract per page.
+        compact: Whether to compact identical elements with a count.
+    Returns:
+        The extracted elements of each URL.
+    """
+    run_scrapper = from_run_context(config, "scrapper", scrapper)
+    return await run_scrapper.extract_from_urls(urls, el_selector, trunc, limit, compact)
+
+  @tool
+  async def open_tabs(urls: list[str], config: RunnableConfig) -> str:
+    """
+    Opens several URLs at once in parallel tabs, closing the tabs opened before,
+    so 'extract_from_tabs' can be run on all of them with different selectors.
+    Args:
+        urls: The URLs to open, absolute or relative to the current page.
+    Returns:
+        The URLs that were opened and the ones that failed.
+    """
+    run_scrapper = from_run_context(config, "scrapper", scrapper)
+    return await run_scrapper.open_tabs(urls)
+
+  @tool
+  async def extract_from_tabs(
+    el_selector: str,
+    config: RunnableConfig,
+    trunc: bool = True,
+    limit: int = 50,
+    compact: bool = False
+  ) -> str:
+    """
+    Extracts the elements matching the selector from every tab opened with 'open_tabs', in parallel.
+    Args:
+        el_selector: The selector to find elements in every tab.
+        trunc: Whether to truncate the text content.
+        limit: The maximum number of elements to extract per tab.
+        compact: Whether to compact identical elements with a count.
+    Returns:
+        The extracted elements of each tab.
+    """
+    run_scrapper = from_run_context(config, "scrapper", scrapper)
+    return await run_scrapper.extract_from_tabs(el_selector, trunc, limit, compact)
 
   @tool
-  async def navigate(url: str) -> str:
+  async def navigate(url: str, config: RunnableConfig) -> str:
     """
     Navigates to a new URL.
     Args:
@@ -81,7 +159,8 @@ def make_scrapper_tools(scrapper: Scrapper, vision_model: BaseChatModel = None)
     Returns:
         A message indicating the result of the navigation.
     """
-    return await scrapper.navigate(url)
+    run_scrapper = from_run_context(config, "scrapper", scrapper)
+    return await run_scrapper.navigate(url)
 
   @tool
   async def end_navigation() -> str:
@@ -119,7 +198,8 @@ def make_scrapper_tools(scrapper: Scrapper, vision_model: BaseChatModel = None)
     """
       Saves a scrap script.
       Args:
-        scrap_script: The scrap script to save.
+        scrap_script: The scrap script to save, with the site url in "site" and a list of
+          "steps" (navigate, fill, click, extract) that can be replayed without the LLM.
       Returns:
         A message indicating the result of the save operation.
     """
@@ -136,6 +216,9 @@ def make_scrapper_tools(scrapper: Scrapper, vision_model: BaseChatModel = None)
     interact_with_element,
     page_summary, 
     navigate,
+    extract_from_urls,
+    open_tabs,
+    extract_from_tabs,
     get_scrap_script,
     save_scrap_script
   ]
@@ -2,20 +2,47 @@ import asyncio
 import time
 import json
 import os
+from contextlib import asynccontextmanager
 from uuid import uuid4
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from langchain_openai import ChatOpenAI
 
-from shopping_agent.agent import ShoppingAgent
-from utils.logger import Logger
+from scrapping_agent.agent import PROMPTS as SCRAPPING_PROMPTS
+from scrapping_agent.browser_pool import browser_pools_metrics, close_browser_pools
+from scrapping_agent.checkpoints import close_checkpointer
+from scrapping_agent.resource_policy import resource_policy_metrics
+from shopping_agent.agent import PROMPTS as SHOPPING_PROMPTS, get_shopping_agent
+from shopping_agent.search_providers import search_provider_metrics
+from utils.cache import caches_stats
+from utils.chat_history import ensure_index, get_log_path, stream_chat
+from utils.chat_store import make_chat_store
+from utils.http import close_http_client
+from utils.llm import close_llm_clients
+from utils.llm_cache import llm_cache_metrics
+from utils.logger import INTERNAL_KINDS, LOG_WRITER, Logger
+from utils.scheduler import BACKGROUND, INTERACTIVE, scheduler_metrics
+from utils.tracing import prometheus_metrics
 from utils.utils import make_log_event, make_sse_data
 from fastapi.staticfiles import StaticFiles
 
-app = FastAPI()
+CHAT_IDLE_TTL = float(os.getenv("CHAT_STORE_IDLE_TTL", str(7 * 24 * 60 * 60)))
+chat_store = make_chat_store()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+  await asyncio.to_thread(chat_store.evict, CHAT_IDLE_TTL)
+  await asyncio.to_thread(chat_store.rehydrate_all, chat_store.max_chats)
+  yield
+  await close_browser_pools()
+  await close_http_client()
+  await close_llm_clients()
+  await close_checkpointer()
+  LOG_WRITER.close()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
   CORSMiddleware,
@@ -24,65 +51,83 @@ app.add_middleware(
   allow_methods=["*"],
   allow_headers=["*"],
 )
-chats = {}
-
 class ChatRequest(BaseModel):
   query: str
   specifications: str = ""
+  background: bool = False
 
 @app.post("/api/chats")
 async def create_chat():
   chat_id = str(uuid4())
-  chats[chat_id] = ""
+  chat_store.evict(CHAT_IDLE_TTL)
+  chat_store.create(chat_id)
   return {"id": chat_id}
 
 @app.get("/api/chats")
-async def get_chats():
-  return chats
+async def get_chats(offset: int = Query(0, ge=0), limit: int | None = Query(None, ge=1)):
+  return {chat["id"]: chat["name"] for chat in chat_store.list(offset, limit)}
+
+@app.get("/api/stats")
+async def get_stats():
+  return {
+    "browser_pools": browser_pools_metrics(),
+    "page_resources": resource_policy_metrics(),
+    "caches": caches_stats(),
+    "scheduler": scheduler_metrics(),
+    "search": search_provider_metrics(),
+    "llm_cache": llm_cache_metrics(),
+    "prompts": {
+      "shopping_agent": SHOPPING_PROMPTS.versions(),
+      "scrapping_agent": SCRAPPING_PROMPTS.versions()
+    }
+  }
+
+@app.get("/api/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+  """Histogramas de duração dos spans e tokens dos LLMs no formato de texto do Prometheus"""
+  return PlainTextResponse(prometheus_metrics(), media_type="text/plain; version=0.0.4")
 
 @app.get("/api/chats/{chat_id}")
-async def get_chat(chat_id: str):
-  """Busca um chat por ID no arquivo de log correspondente"""
-  log_file_path = f"./logs/{chat_id}.json"
+async def get_chat(chat_id: str, offset: int = Query(0, ge=0), limit: int | None = Query(None, ge=1)):
+  """Busca uma página do histórico de um chat através do índice do arquivo de log"""
+  log_file_path = get_log_path(chat_id)
   
   if not os.path.exists(log_file_path):
     raise HTTPException(status_code=404, detail="Chat não encontrado")
   
-  messages = []
-  chat_name = chats.get(chat_id, "")
-  
   try:
-    with open(log_file_path, 'r', encoding='utf-8') as f:
-      for line in f:
-        try:
-          log_entry = json.loads(line.strip())
-          if log_entry.get("type") != "DEBUG":
-            messages.append(log_entry.get("content", {}))
-        except json.JSONDecodeError:
-          continue
-    
-    return {
-      "id": chat_id,
-      "name": chat_name,
-      "messages": messages
-    }
-    
+    await asyncio.to_thread(ensure_index, log_file_path)
+    chat = chat_store.get_or_rehydrate(chat_id)
   except Exception as e:
     raise HTTPException(status_code=500, detail=f"Erro ao ler arquivo de log: {str(e)}")
 
+  return StreamingResponse(
+    stream_chat(chat_id, chat["name"], offset, limit),
+    media_type="application/json"
+  )
+
+STREAM_END = object()
+
+async def watch_disconnect(http_request: Request, agent_task: asyncio.Task):
+  """Cancels the agent as soon as the client goes away, without polling."""
+  while not agent_task.done():
+    message = await http_request.receive()
+    if message["type"] == "http.disconnect":
+      agent_task.cancel()
+      return
+
 @app.post("/api/chats/{chat_id}")
 async def chat(chat_id: str, request: ChatRequest, http_request: Request):
-  if chat_id not in chats:
+  if chat_store.get_or_rehydrate(chat_id) is None:
     raise HTTPException(status_code=404, detail="Chat não encontrado")
   
-  chats[chat_id] = request.query
+  chat_store.set_name(chat_id, request.query)
 
   async def event_stream():
     start_time = time.time()
     
-    llm = ChatOpenAI(model="gpt-4.1-mini")
     logger = Logger(show_debug_logs=True, logger_id=chat_id)
-    agent = ShoppingAgent(llm, logger)
+    agent = get_shopping_agent()
     
     if request.specifications:
       logger.info(make_log_event(type="USER", content=request.specifications))
@@ -90,46 +135,48 @@ async def chat(chat_id: str, request: ChatRequest, http_request: Request):
       logger.info(make_log_event(type="USER", content=request.query))
 
     agent_task = asyncio.create_task(
-      agent.run(request.query, specifications=request.specifications, recursion_limit=100)
+      agent.run(
+        request.query,
+        specifications=request.specifications,
+        recursion_limit=100,
+        logger=logger,
+        priority=BACKGROUND if request.background else INTERACTIVE
+      )
     )
+    agent_task.add_done_callback(lambda _: logger.LOGS_QUEUE.put_nowait(STREAM_END))
+    disconnect_watcher = asyncio.create_task(watch_disconnect(http_request, agent_task))
     
     try:
-      while not agent_task.done():
-        if await http_request.is_disconnected():
-          agent_task.cancel()
-          yield make_sse_data(make_log_event(type="CANCELLED"))
-          return
-        
+      while True:
+        msg = await logger.LOGS_QUEUE.get()
+        if msg is STREAM_END:
+          break
+
         try:
-          if not logger.LOGS_QUEUE.empty():
-            msg = logger.LOGS_QUEUE.get_nowait()
-            try:
-              parsed_msg = json.loads(msg)
-              if parsed_msg.get("type") != "DEBUG":
-                parsed_msg["content"]["id"] = str(uuid4())
-                yield make_sse_data(parsed_msg["content"])
-            except json.JSONDecodeError:
-              yield f"data: {msg}\n\n"
-          else:
-            await asyncio.sleep(0.1)
+          parsed_msg = json.loads(msg)
+          if parsed_msg.get("type") not in INTERNAL_KINDS:
+            parsed_msg["content"]["id"] = str(uuid4())
+            yield make_sse_data(parsed_msg["content"])
+        except json.JSONDecodeError:
+          yield f"data: {msg}\n\n"
         except Exception:
-            if await http_request.is_disconnected():
-              agent_task.cancel()
-              return
-            await asyncio.sleep(0.1)
+          continue
 
-      if not agent_task.cancelled():
-        try:
-          result = await agent_task
-          result["id"] = str(uuid4())
-          logger.info(result)
-          end_time = time.time()
-          yield make_sse_data(result)
-          yield make_sse_data(make_log_event(type="END_TIME", content=end_time - start_time))
-        except asyncio.CancelledError:
-          yield make_sse_data(make_log_event(type="CANCELLED"))
-        except Exception as e:
-          yield make_sse_data(make_log_event(type="ERROR", content=str(e)))
+      if agent_task.cancelled():
+        yield make_sse_data(make_log_event(type="CANCELLED"))
+        return
+
+      try:
+        result = await agent_task
+        result["id"] = str(uuid4())
+        logger.info(result)
+        end_time = time.time()
+        yield make_sse_data(result)
+        yield make_sse_data(make_log_event(type="END_TIME", content=end_time - start_time))
+      except asyncio.CancelledError:
+        yield make_sse_data(make_log_event(type="CANCELLED"))
+      except Exception as e:
+        yield make_sse_data(make_log_event(type="ERROR", content=str(e)))
       
       yield make_sse_data(make_log_event(type="END"))
       
@@ -139,6 +186,8 @@ async def chat(chat_id: str, request: ChatRequest, http_request: Request):
     except Exception as e:
       agent_task.cancel()
       yield make_sse_data(make_log_event(type="ERROR", content=str(e)))
+    finally:
+      disconnect_watcher.cancel()
 
   return StreamingResponse(
     event_stream(), 
@@ -4,18 +4,25 @@ from typing import Annotated, Literal
 from typing_extensions import TypedDict
 
 from langchain_core.language_models import BaseChatModel
-from langchain_core.messages import HumanMessage, ToolMessage, BaseMessage
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langgraph.checkpoint.memory import MemorySaver
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
-from langgraph.types import interrupt, Command
+from langgraph.types import interrupt
 
 from shopping_agent.tools import make_researcher_tools
+from utils.compaction import make_compaction_node, tokens_saved
+from utils.llm import get_llm
+from utils.llm_cache import cached_tokens, invoke_llm
 from utils.logger import Logger
-from utils.utils import get_prompt
+from utils.prompts import make_prompt_registry
+from utils.scheduler import INTERACTIVE, job
+from utils.tracing import Span
+from utils.utils import get_run_context
 import asyncio
 from datetime import datetime
+from uuid import uuid4
 
 class State(TypedDict):
   messages: Annotated[list, add_messages]
@@ -23,25 +30,36 @@ class State(TypedDict):
   specifications: str
   research: list[dict]
 
+PROMPTS = make_prompt_registry(os.path.join(os.path.dirname(__file__), "prompts"))
+
 class ShoppingAgent:
+  """
+    The graph is compiled once per instance and holds no per-request state, so
+    one instance can serve concurrent chats. The logger and the current node of
+    each run travel in the run context of the graph config.
+  """
   def __init__(
     self,
     llm: BaseChatModel,
-    logger: Logger
+    logger: Logger = None
   ):
     self.llm = llm
     self.logger = logger
-    
-    self.graph = None
-    self.graph_config = None
-    self.current_node = None
 
-    self.researcher_tools = make_researcher_tools(self.logger)
+    self.researcher_tools = make_researcher_tools()
     self.tools_by_name = {tool.name: tool for tool in self.researcher_tools}
 
-  async def run(self, product_query: str, specifications="", recursion_limit: int = 100):
-    if not self.graph:
-      self.graph = self._build_graph()
+    self.graph = self._build_graph()
+
+  async def run(
+    self,
+    product_query: str,
+    specifications="",
+    recursion_limit: int = 100,
+    logger: Logger = None,
+    priority: int = INTERACTIVE
+  ):
+    run_context = {"logger": logger or self.logger, "current_node": None}
     
     current_date = datetime.now().strftime("%d/%m/%Y")
     state = State(
@@ -51,21 +69,36 @@ class ShoppingAgent:
       research=[],
     )
     
-    if not self.graph_config:
-      self.graph_config = {"configurable": {"thread_id": "1"}, "recursion_limit": recursion_limit}
+    config = {
+      "configurable": {"thread_id": str(uuid4()), "run": run_context},
+      "recursion_limit": recursion_limit
+    }
     
     events = self.graph.astream(
       state,
-      self.graph_config,
+      config,
       stream_mode="values"
     )
 
     last_message = ""
-    async for event in events:
-      if "messages" in event:
-        last_message = event["messages"][-1]
+    messages = []
+    # Browser, LLM and search slots taken by this run are queued under its chat.
+    with job(run_context["logger"].id, priority), Span("ShoppingAgent.run", "run", run_context["logger"]):
+      async for event in events:
+        if "messages" in event:
+          messages = event["messages"]
+          last_message = messages[-1]
+
+    total_tokens = sum(
+      (msg.usage_metadata or {}).get("total_tokens", 0)
+      for msg in messages if isinstance(msg, AIMessage)
+    )
+    run_context["logger"].debug(
+      f"Total tokens: {total_tokens} (~{tokens_saved(config)} saved by compaction, "
+      f"{cached_tokens(messages)} by the LLM cache)"
+    )
 
-    if self.current_node == "ASK_HUMAN" and not specifications:
+    if run_context["current_node"] == "ASK_HUMAN" and not specifications:
       question = last_message.content
       return { "type": "ASK_HUMAN", "content": question }
     
@@ -78,12 +111,14 @@ class ShoppingAgent:
     ask_human_node = self.make_ask_human_node()
     researcher_node = self.make_default_node("researcher", tools=self.researcher_tools)
     tools_node = self.make_tools_node()
+    compaction_node = make_compaction_node()
     analyst_node = self.make_analyst_node()
 
     graph_builder.add_node("receptionist", receptionist_node)
     graph_builder.add_node("ask_human", ask_human_node)
     graph_builder.add_node("researcher", researcher_node)
     graph_builder.add_node("tools", tools_node)
+    graph_builder.add_node("compaction", compaction_node)
     graph_builder.add_node("analyst", analyst_node)
 
     should_ask_human_condition = self.make_should_ask_human_condition()
@@ -93,36 +128,36 @@ class ShoppingAgent:
     graph_builder.add_conditional_edges("receptionist", should_ask_human_condition)
     graph_builder.add_edge("ask_human", END)
     graph_builder.add_conditional_edges("researcher", tools_condition)
-    graph_builder.add_edge("tools", "researcher")
+    graph_builder.add_edge("tools", "compaction")
+    graph_builder.add_edge("compaction", "researcher")
     graph_builder.add_edge("analyst",  END)
     
     return graph_builder.compile()
 
   def make_default_node(self, name: str, tools: list = []):
-    async def node(state: State):
-      self.current_node = name.upper()
+    llm = self.llm if len(tools) == 0 else self.llm.bind_tools(tools)
+
+    async def node(state: State, config: RunnableConfig):
+      run = get_run_context(config)
+      run["current_node"] = name.upper()
       prompt = self._get_prompt_template(name)
-      llm = self.llm.model_copy()
-      llm = llm if len(tools) == 0 else llm.bind_tools(tools)
-      message = await (prompt | llm).ainvoke(state["messages"])
-      self.logger.info({"type": "AGENT", "content": message.content})
+      with Span(name, "node", run["logger"]):
+        message = await invoke_llm(name, prompt, llm, state["messages"])
+      run["logger"].info({"type": "AGENT", "content": message.content, "prompt_version": PROMPTS.version(name)})
       return {"messages": [message]}
     
     return node
   
   def _get_prompt_template(self, role) -> ChatPromptTemplate:
-    """Return the prompt template for the receptionist role."""
-    prompt_path = os.path.join(os.path.dirname(__file__), "prompts", f"{role}.md")
-    return ChatPromptTemplate.from_messages([
-      ("system", get_prompt(prompt_path)),
-      MessagesPlaceholder("messages")
-    ])
+    """Return the compiled prompt template for the role."""
+    return PROMPTS.get(role)
   
   def make_ask_human_node(self):
-    async def ask_human_node(state: State):
-      self.current_node = "ASK_HUMAN"
+    async def ask_human_node(state: State, config: RunnableConfig):
+      run = get_run_context(config)
+      run["current_node"] = "ASK_HUMAN"
       human_response = interrupt("ASK_HUMAN")
-      self.logger.debug(f"ASK_HUMAN 👤-> {human_response}")
+      run["logger"].debug(f"ASK_HUMAN 👤-> {human_response}")
       return {
         "messages": [HumanMessage(human_response)],
         "specifications": human_response
@@ -131,44 +166,48 @@ class ShoppingAgent:
     return ask_human_node
   
   def make_analyst_node(self):
-    async def node(state: State):
-      self.current_node = "ANALYST"
+    async def node(state: State, config: RunnableConfig):
+      run = get_run_context(config)
+      run["current_node"] = "ANALYST"
       prompt = self._get_prompt_template("analyst")
-      llm = self.llm.model_copy()
 
       product = state["product"]
       specifications = state["specifications"]
       research = "\n\n".join([json.dumps(product) for product in state["research"]])
 
       analyst_input = f"# Produto\n{product}\n# Especificações:\n{specifications}\n# Pequisa:\n{research}"
-      self.logger.debug(f"\nANALYST_INPUT -> {analyst_input}")
+      run["logger"].debug(f"\nANALYST_INPUT -> {analyst_input}")
 
-      message = await (prompt | llm).ainvoke({"messages":[HumanMessage(analyst_input)]})
-      self.logger.info({"type": "AGENT", "content": message.content})
+      with Span("analyst", "node", run["logger"]):
+        message = await invoke_llm("analyst", prompt, self.llm, {"messages":[HumanMessage(analyst_input)]})
+      run["logger"].info({"type": "AGENT", "content": message.content, "prompt_version": PROMPTS.version("analyst")})
       return {"messages": [message]}
     
     return node
 
   def make_tools_node(self):
-    async def tools_node(state: State):
-      self.current_node = "TOOLS"
-      tool_msgs = await asyncio.gather(*[
-        self.handle_tool_call(tool_call, state) 
-        for tool_call in state["messages"][-1].tool_calls
-      ])
-      self.logger.debug(f"\nTOOLS 🛠️ -> {tool_msgs}")  
+    async def tools_node(state: State, config: RunnableConfig):
+      run = get_run_context(config)
+      run["current_node"] = "TOOLS"
+      with Span("tools", "node", run["logger"]):
+        tool_msgs = await asyncio.gather(*[
+          self.handle_tool_call(tool_call, state, config) 
+          for tool_call in state["messages"][-1].tool_calls
+        ])
+      run["logger"].debug(f"\nTOOLS 🛠️ -> {tool_msgs}")  
       return {"messages": tool_msgs}
     
     return tools_node
   
-  async def handle_tool_call(self, tool_call, state: State):
+  async def handle_tool_call(self, tool_call, state: State, config: RunnableConfig):
     tool_call_id, tool_name, tool_args = tool_call["id"], tool_call["name"], tool_call["args"]
     
     tool = self.tools_by_name[tool_name]
-    result = await tool.ainvoke(tool_args)
+    with Span(tool_name, "tool"):
+      result = await tool.ainvoke(tool_args, config)
     
     if tool_name == "save_relevant_data":
-      self.logger.info({"type": "PRODUCTS", "content": tool_args['data']})  
+      get_run_context(config)["logger"].info({"type": "PRODUCTS", "content": tool_args['data']})  
       state["research"].append(tool_args['data'])
 
     return ToolMessage(content=result, tool_call_id=tool_call_id)
@@ -181,14 +220,22 @@ class ShoppingAgent:
 
 
   def make_tools_condition(self):
-    def tools_condition(state: State) -> Literal["tools", "analyst"]:
+    def tools_condition(state: State, config: RunnableConfig) -> Literal["tools", "analyst"]:
       result = "analyst"
       last_message = state["messages"][-1]
 
       if hasattr(last_message, "tool_calls") and len(last_message.tool_calls) > 0:
         result = "tools"
-      self.logger.debug(f"TOOLS_CONDITION -> {result}")
+      get_run_context(config)["logger"].debug(f"TOOLS_CONDITION -> {result}")
 
       return result
     
     return tools_condition
+
+_shopping_agents: dict[str, ShoppingAgent] = {}
+
+def get_shopping_agent(model: str = "gpt-4.1-mini") -> ShoppingAgent:
+  """Return the process-wide ShoppingAgent for `model`, compiling its graph on first use."""
+  if model not in _shopping_agents:
+    _shopping_agents[model] = ShoppingAgent(get_llm(model))
+  return _shopping_agents[model]
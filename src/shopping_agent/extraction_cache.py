@@ -0,0 +1,104 @@
+import re
+import unicodedata
+from os import getenv
+from time import time
+
+from utils.cache import TTLCache, make_cache_key
+from utils.http import get_http_client, response_validators
+
+# Entries younger than FRESH_FOR are served as they are. Older entries, up to
+# MAX_STALE, are only served after the page is revalidated.
+FRESH_FOR = float(getenv("EXTRACTION_CACHE_FRESH_FOR", str(15 * 60)))
+MAX_STALE = float(getenv("EXTRACTION_CACHE_MAX_STALE", str(24 * 60 * 60)))
+
+extraction_cache = TTLCache(
+  "extraction",
+  max_entries=int(getenv("EXTRACTION_CACHE_SIZE", "256")),
+  ttl=MAX_STALE,
+  db_path=getenv("EXTRACTION_CACHE_DB") or None
+)
+
+def normalize_extraction_query(query: str) -> str:
+  """Lowercase, strip accents and punctuation and sort the words, so similar queries share entries."""
+  query = unicodedata.normalize("NFKD", query.lower())
+  query = "".join(c for c in query if not unicodedata.combining(c))
+  return " ".join(sorted(set(re.findall(r"\w+", query))))
+
+async def fetch_validators(url: str, etag: str = None, last_modified: str = None) -> dict:
+  """
+    Fetches the page, conditionally when validators are known.
+    Returns:
+      dict: `not_modified`, `etag`, `last_modified` and `content_hash` (None on 304).
+  """
+  headers = {}
+  if etag:
+    headers["If-None-Match"] = etag
+  if last_modified:
+    headers["If-Modified-Since"] = last_modified
+
+  response = await get_http_client().get(url, headers=headers)
+
+  if response.status_code == 304:
+    return {"not_modified": True, "etag": etag, "last_modified": last_modified, "content_hash": None}
+
+  response.raise_for_status()
+  return {"not_modified": False, **response_validators(response.headers, response.text)}
+
+async def head_validators(url: str) -> dict:
+  """`etag` and `last_modified` of the page from a HEAD request, without its content."""
+  response = await get_http_client().head(url)
+  response.raise_for_status()
+  return response_validators(response.headers)
+
+async def get_cached_extraction(url: str, query: str) -> dict | None:
+  """
+    Returns the cached entry for this url and query when it is fresh or was
+    successfully revalidated, otherwise None.
+  """
+  cache_key = make_cache_key(url, normalize_extraction_query(query))
+  entry = extraction_cache.get(cache_key)
+  if entry is None:
+    return None
+
+  if time() - entry["validated_at"] <= FRESH_FOR:
+    return {**entry, "revalidated": False}
+
+  try:
+    validators = await fetch_validators(url, entry.get("etag"), entry.get("last_modified"))
+  except Exception:
+    return None
+
+  unchanged = validators["not_modified"] \
+    or (entry.get("etag") is not None and validators["etag"] == entry["etag"]) \
+    or validators["content_hash"] == entry.get("content_hash")
+
+  if not unchanged:
+    extraction_cache.delete(cache_key)
+    return None
+
+  entry["validated_at"] = time()
+  extraction_cache.set(cache_key, entry, ttl=MAX_STALE - (entry["validated_at"] - entry["stored_at"]))
+  return {**entry, "revalidated": True}
+
+async def store_extraction(url: str, query: str, content: str, validators: dict = None) -> None:
+  """
+    Caches the extraction of a page. `validators` are the `etag`, `last_modified`
+    and `content_hash` of the response the scrapper loaded; without them the page
+    is only asked for its headers (HEAD), never downloaded again.
+  """
+  if validators is None:
+    try:
+      validators = await head_validators(url)
+    except Exception:
+      validators = {"etag": None, "last_modified": None, "content_hash": None}
+
+  now = time()
+  extraction_cache.set(make_cache_key(url, normalize_extraction_query(query)), {
+    "url": url,
+    "content": content,
+    "etag": validators.get("etag"),
+    "last_modified": validators.get("last_modified"),
+    "content_hash": validators.get("content_hash"),
+    "stored_at": now,
+    "validated_at": now
+  })
@@ -0,0 +1,146 @@
+import asyncio
+import json
+import random
+from abc import ABC, abstractmethod
+from os import getenv
+
+import httpx
+
+from utils.http import get_http_client
+
+CUSTOM_SEARCH_URL = "https://www.googleapis.com/customsearch/v1"
+
+SEARCH_MAX_RETRIES = int(getenv("SEARCH_MAX_RETRIES", "3"))
+# Backoff before retry n is uniform in [0, min(cap, base * 2**n)] seconds ("full jitter").
+SEARCH_BACKOFF_BASE = float(getenv("SEARCH_BACKOFF_BASE", "0.5"))
+SEARCH_BACKOFF_CAP = float(getenv("SEARCH_BACKOFF_CAP", "8"))
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+class SearchProvider(ABC):
+  """
+    A web search backend. `search` returns the results as
+    [{"title": ..., "link": ..., "snippet": ...}]. `name` is part of the
+    search cache key, so providers never share cached results.
+  """
+  name = "base"
+
+  @abstractmethod
+  async def search(self, query: str, params: dict) -> list[dict]:
+    ...
+
+  def metrics(self) -> dict:
+    return {}
+
+class GoogleSearchProvider(SearchProvider):
+  """Google Custom Search JSON API over the shared async HTTP client."""
+  name = "google"
+
+  def __init__(
+    self,
+    api_key: str | None = None,
+    cse_id: str | None = None,
+    max_retries: int = SEARCH_MAX_RETRIES,
+    backoff_base: float = SEARCH_BACKOFF_BASE,
+    backoff_cap: float = SEARCH_BACKOFF_CAP
+  ):
+    self.api_key = api_key or getenv("GOOGLE_API_KEY")
+    self.cse_id = cse_id or getenv("GOOGLE_CSE_ID")
+    self.max_retries = max_retries
+    self.backoff_base = backoff_base
+    self.backoff_cap = backoff_cap
+
+    self.requests = 0
+    self.retries = 0
+    self.failures = 0
+
+  def backoff(self, attempt: int, response: httpx.Response | None = None) -> float:
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after and retry_after.isdigit():
+      return min(float(retry_after), self.backoff_cap)
+    return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+  async def search(self, query: str, params: dict) -> list[dict]:
+    request_params = {"key": self.api_key, "cx": self.cse_id, "q": query, **params}
+
+    for attempt in range(self.max_retries + 1):
+      self.requests += 1
+      try:
+        response = await get_http_client().get(CUSTOM_SEARCH_URL, params=request_params)
+      except httpx.TransportError:
+        if attempt == self.max_retries:
+          self.failures += 1
+          raise
+        response = None
+      else:
+        if response.status_code not in RETRYABLE_STATUS or attempt == self.max_retries:
+          break
+
+      self.retries += 1
+      await asyncio.sleep(self.backoff(attempt, response))
+
+    if response.is_error:
+      self.failures += 1
+      response.raise_for_status()
+
+    return [
+      {
+        "title": item.get("title", ""),
+        "link": item.get("link", ""),
+        "snippet": item.get("snippet", "")
+      }
+      for item in response.json().get("items", [])
+    ]
+
+  def metrics(self) -> dict:
+    return {"requests": self.requests, "retries": self.retries, "failures": self.failures}
+
+class StubSearchProvider(SearchProvider):
+  """
+    Offline provider for tests and benchmarks. `results` is either a list
+    returned for every query or a {query: results} dict, with "*" as the
+    fallback for unknown queries.
+  """
+  name = "stub"
+
+  def __init__(self, results: list[dict] | dict[str, list[dict]]):
+    self.results = results
+    self.queries: list[str] = []
+
+  @classmethod
+  def from_file(cls, path: str) -> "StubSearchProvider":
+    with open(path, encoding="utf-8") as file:
+      return cls(json.load(file))
+
+  async def search(self, query: str, params: dict) -> list[dict]:
+    self.queries.append(query)
+    results = self.results if isinstance(self.results, list) \
+      else self.results.get(query, self.results.get("*", []))
+    return results[:params.get("num", len(results))]
+
+  def metrics(self) -> dict:
+    return {"queries": len(self.queries)}
+
+_provider: SearchProvider | None = None
+
+def get_search_provider() -> SearchProvider:
+  """
+    The process-wide search provider, created on first use from SEARCH_PROVIDER
+    ("google" or "stub", which reads its results from SEARCH_STUB_FILE).
+  """
+  global _provider
+  if _provider is None:
+    if getenv("SEARCH_PROVIDER", "google") == "stub":
+      _provider = StubSearchProvider.from_file(getenv("SEARCH_STUB_FILE"))
+    else:
+      _provider = GoogleSearchProvider()
+  return _provider
+
+def set_search_provider(provider: SearchProvider | None) -> None:
+  """Replaces the search provider (None goes back to the configured one)."""
+  global _provider
+  _provider = provider
+
+def search_provider_metrics() -> dict:
+  provider = get_search_provider()
+  return {"provider": provider.name, **provider.metrics()}
@@ -1,9 +1,11 @@
-import asyncio
-
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import tool
 
-from shopping_agent.web_search import extract_data, google_search
+from shopping_agent.web_search import extract_as_completed, google_search
 from utils.logger import Logger
+from utils.scheduler import SCHEDULER
+from utils.tracing import Span
+from utils.utils import get_run_context
 
 def make_receptionist_tools(logger: Logger) -> list:
   @tool
@@ -19,9 +21,9 @@ def make_receptionist_tools(logger: Logger) -> list:
 
   return [ask_more_details]
 
-def make_researcher_tools(logger: Logger) -> list:
+def make_researcher_tools() -> list:
   @tool
-  async def web_search(query: str) -> str:
+  async def web_search(query: str, config: RunnableConfig) -> str:
     """
     Search for information on the web.
     Args:
@@ -29,13 +31,15 @@ def make_researcher_tools(logger: Logger) -> list:
     Returns:
       A string containing the search results.
     """
-    
-    search_results = google_search(query, 3)
+    logger = get_run_context(config)["logger"]
+    async with SCHEDULER.slot("search"):
+      with Span("google_search", "search", query=query):
+        search_results = await google_search(query, 3)
 
     logger.info({"type": "SEARCH", "content": { "query": query, "sites": [search_result['link'] for search_result in search_results] }})
     
-    extraction_tasks = [extract_data(search_result, query, logger) for search_result in search_results]
-    results = await asyncio.gather(*extraction_tasks)
+    # Each extraction waits for a browser slot, so they are bounded by the scheduler.
+    results = await extract_as_completed(search_results, query, logger)
 
     link_n_data =[
       f"FROM: {google_result['link']}\nDATA: {result}"
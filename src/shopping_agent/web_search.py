@@ -1,50 +1,135 @@
+import asyncio
 from os import getenv
 from datetime import datetime
+from urllib.parse import urlparse
+from uuid import uuid4
 
-from langchain_openai import ChatOpenAI
-from googleapiclient.discovery import build
+from scrapping_agent.agent import make_scrapping_agent
+from shopping_agent.extraction_cache import get_cached_extraction, store_extraction
+from shopping_agent.search_providers import get_search_provider
+from utils.cache import TTLCache, make_cache_key
 
-from scrapping_agent.agent import ScrappingAgent
+# Seconds a search waits for its sites. Sites still running after that are
+# cancelled and the search returns what has finished.
+SITE_DEADLINE = float(getenv("WEB_SEARCH_SITE_DEADLINE", "180"))
 
-google_api_key = getenv("GOOGLE_API_KEY")
-google_cse_id = getenv("GOOGLE_CSE_ID")
+search_cache = TTLCache(
+  "google_search",
+  max_entries=int(getenv("SEARCH_CACHE_SIZE", "512")),
+  ttl=float(getenv("SEARCH_CACHE_TTL", str(6 * 60 * 60))),
+  db_path=getenv("SEARCH_CACHE_DB") or None
+)
 
-def google_search(query: str, num_results: int):
-  service = build("customsearch", "v1", developerKey=google_api_key)
+def get_site_info(google_result) -> dict:
+  link = google_result['link']
+  return {
+    "site": link,
+    "icon": "https://www.google.com/s2/favicons?domain=" + urlparse(link).netloc,
+    "title": google_result.get('title', "")
+  }
 
+def normalize_query(query: str) -> str:
+  return " ".join(query.lower().split())
+
+async def google_search(query: str, num_results: int):
   current_year = datetime.now().year
-  search_results = (
-    service.cse()
-    .list(
-      q=query, 
-      cx=google_cse_id,
-      num=num_results,
-      lr="lang_pt",
-      dateRestrict=f"y[{current_year}]",
-      excludeTerms="youtube tiktok"
-    )
-    .execute()
-  ).get('items', [])
-
-  return [
-    {
-      "title": sr.get("title", ""), 
-      "link": sr.get("link", ""),
-      "snippet": sr.get("snippet", "")
-    } 
-    for sr in search_results
-  ]
+  params = {
+    "num": num_results,
+    "lr": "lang_pt",
+    "dateRestrict": f"y[{current_year}]",
+    "excludeTerms": "youtube tiktok"
+  }
+
+  provider = get_search_provider()
+  cache_key = make_cache_key(provider.name, normalize_query(query), params)
+  cached_results = search_cache.get(cache_key)
+  if cached_results is not None:
+    return cached_results
+
+  results = await provider.search(query, params)
+
+  search_cache.set(cache_key, results)
+  return results
 
 async def extract_data(google_result, query, logger):
-  try:
-    llm = ChatOpenAI(model="o4-mini")
+  link = google_result['link']
+  cached = await get_cached_extraction(link, query)
 
-    agent = ScrappingAgent(llm, debug=False, logger=logger)
-    await agent.initialize(google_result['link'], headless=True)
+  if cached is not None:
+    logger.info({
+      "type": "CACHED_SITE",
+      "content": {
+        "id": str(uuid4()),
+        **get_site_info(google_result),
+        "cached_at": cached["stored_at"],
+        "revalidated": cached["revalidated"]
+      }
+    })
+    return cached["content"]
+
+  agent = make_scrapping_agent(debug=False, logger=logger)
+
+  try:
+    await agent.initialize(link, headless=True)
       
     result = await agent.run(query, all_results=True)
 
-    await agent.close()
+    await store_extraction(link, query, result["content"], agent.scrapper.page_validators())
     return result["content"]
-  except:
-    return f"Falha ao extrair dados do link {google_result['link']}"
+  except Exception:
+    return f"Falha ao extrair dados do link {link}"
+  finally:
+    await agent.close()
+
+async def extract_as_completed(search_results: list[dict], query: str, logger, deadline: float = SITE_DEADLINE) -> list[str]:
+  """
+    Extracts every search result concurrently, logging a SITE_RESULT event as
+    soon as each site finishes. Sites still running after `deadline` seconds
+    are cancelled, which closes their agents and frees their browsers.
+    Returns:
+      list[str]: One result per search result, in the search order.
+  """
+  tasks = {
+    asyncio.create_task(extract_data(search_result, query, logger)): i
+    for i, search_result in enumerate(search_results)
+  }
+  results = [None] * len(search_results)
+  pending = set(tasks)
+
+  loop = asyncio.get_running_loop()
+  ends_at = loop.time() + deadline
+
+  try:
+    while pending:
+      timeout = ends_at - loop.time()
+      if timeout <= 0:
+        break
+
+      done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+      for task in done:
+        i = tasks[task]
+        results[i] = task.result()
+        logger.info({
+          "type": "SITE_RESULT",
+          "content": {
+            "id": str(uuid4()),
+            **get_site_info(search_results[i]),
+            "status": "failed" if results[i].startswith("Falha ao extrair") else "done",
+            "result": results[i]
+          }
+        })
+  finally:
+    for task in pending:
+      task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+
+  for task in pending:
+    i = tasks[task]
+    results[i] = f"Tempo esgotado ao extrair dados do link {search_results[i]['link']}"
+    logger.info({
+      "type": "SITE_RESULT",
+      "content": {"id": str(uuid4()), **get_site_info(search_results[i]), "status": "timeout", "result": None}
+    })
+
+  return results
@@ -0,0 +1,142 @@
+import os
+import json
+import sqlite3
+import hashlib
+from collections import OrderedDict
+from threading import Lock
+from time import time
+
+CACHES: dict[str, "TTLCache"] = {}
+
+def make_cache_key(*parts) -> str:
+  """Build a stable key from JSON serializable parts."""
+  raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+  return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class TTLCache:
+  """
+    Two tier cache: an in-memory LRU in front of an optional SQLite table.
+    Values must be JSON serializable. Every instance is registered in CACHES
+    by name so its counters can be reported.
+  """
+  def __init__(
+    self,
+    name: str,
+    max_entries: int = 1024,
+    ttl: float = 3600,
+    db_path: str | None = None
+  ):
+    self.name = name
+    self.max_entries = max_entries
+    self.ttl = ttl
+    self.db_path = db_path
+
+    self._memory: OrderedDict[str, tuple[float, object]] = OrderedDict()
+    self._lock = Lock()
+    self._db = None
+
+    if db_path:
+      os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+      self._db = sqlite3.connect(db_path, check_same_thread=False)
+      self._db.execute(
+        "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, expires_at REAL, value TEXT)"
+      )
+      self._db.commit()
+
+    self.memory_hits = 0
+    self.disk_hits = 0
+    self.misses = 0
+    self.sets = 0
+    self.evictions = 0
+    self.expirations = 0
+
+    CACHES[name] = self
+
+  def get(self, key: str):
+    now = time()
+
+    with self._lock:
+      entry = self._memory.get(key)
+      if entry is not None:
+        expires_at, value = entry
+        if expires_at > now:
+          self._memory.move_to_end(key)
+          self.memory_hits += 1
+          return value
+        del self._memory[key]
+        self.expirations += 1
+
+      if self._db is not None:
+        row = self._db.execute(
+          "SELECT expires_at, value FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is not None:
+          expires_at, raw_value = row
+          if expires_at > now:
+            value = json.loads(raw_value)
+            self._remember(key, expires_at, value)
+            self.disk_hits += 1
+            return value
+          self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+          self._db.commit()
+          self.expirations += 1
+
+      self.misses += 1
+      return None
+
+  def set(self, key: str, value, ttl: float | None = None) -> None:
+    expires_at = time() + (self.ttl if ttl is None else ttl)
+
+    with self._lock:
+      self._remember(key, expires_at, value)
+      self.sets += 1
+
+      if self._db is not None:
+        self._db.execute(
+          "INSERT OR REPLACE INTO cache (key, expires_at, value) VALUES (?, ?, ?)",
+          (key, expires_at, json.dumps(value, ensure_ascii=False))
+        )
+        self._db.commit()
+
+  def delete(self, key: str) -> None:
+    with self._lock:
+      self._memory.pop(key, None)
+      if self._db is not None:
+        self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+        self._db.commit()
+
+  def clear(self) -> None:
+    with self._lock:
+      self._memory.clear()
+      if self._db is not None:
+        self._db.execute("DELETE FROM cache")
+        self._db.commit()
+
+  def stats(self) -> dict:
+    hits = self.memory_hits + self.disk_hits
+    lookups = hits + self.misses
+    return {
+      "name": self.name,
+      "entries": len(self._memory),
+      "max_entries": self.max_entries,
+      "ttl": self.ttl,
+      "persistent": self._db is not None,
+      "memory_hits": self.memory_hits,
+      "disk_hits": self.disk_hits,
+      "misses": self.misses,
+      "hit_rate": hits / lookups if lookups else 0.0,
+      "sets": self.sets,
+      "evictions": self.evictions,
+      "expirations": self.expirations
+    }
+
+  def _remember(self, key: str, expires_at: float, value) -> None:
+    self._memory[key] = (expires_at, value)
+    self._memory.move_to_end(key)
+
+    while len(self._memory) > self.max_entries:
+      self._memory.popitem(last=False)
+      self.evictions += 1
+
+def caches_stats() -> list[dict]:
+  return [cache.stats() for cache in CACHES.values()]
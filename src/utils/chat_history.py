@@ -0,0 +1,59 @@
+import os
+import json
+
+from utils.logger import INDEX_ENTRY, LOGS_DIR, get_index_path, rebuild_index
+
+def get_log_path(chat_id: str) -> str:
+  return os.path.join(LOGS_DIR, f"{chat_id}.json")
+
+def ensure_index(log_path: str) -> str:
+  index_path = get_index_path(log_path)
+  if not os.path.exists(index_path):
+    rebuild_index(log_path)
+  return index_path
+
+def count_messages(log_path: str) -> int:
+  """Number of chat records (not DEBUG or SPAN) in the chat log, read from its index size."""
+  return os.path.getsize(ensure_index(log_path)) // INDEX_ENTRY.size
+
+def iter_messages(log_path: str, offset: int = 0, limit: int | None = None):
+  """
+    Yields the content of the chat records in [offset, offset + limit),
+    seeking straight to them through the sidecar index.
+  """
+  index_path = ensure_index(log_path)
+
+  with open(index_path, "rb") as index_file:
+    index_file.seek(offset * INDEX_ENTRY.size)
+    raw_index = index_file.read() if limit is None else index_file.read(limit * INDEX_ENTRY.size)
+
+  usable_size = len(raw_index) - len(raw_index) % INDEX_ENTRY.size
+
+  with open(log_path, "rb") as log_file:
+    for record_offset, record_length in INDEX_ENTRY.iter_unpack(raw_index[:usable_size]):
+      log_file.seek(record_offset)
+      try:
+        yield json.loads(log_file.read(record_length)).get("content", {})
+      except json.JSONDecodeError:
+        continue
+
+def stream_chat(chat_id: str, name: str, offset: int = 0, limit: int | None = None):
+  """Yields a chat history page as JSON text chunks."""
+  log_path = get_log_path(chat_id)
+  total = count_messages(log_path)
+  end = total if limit is None else min(total, offset + limit)
+
+  header = {
+    "id": chat_id,
+    "name": name,
+    "offset": offset,
+    "limit": limit,
+    "total": total,
+    "next_offset": end if end < total else None
+  }
+  yield json.dumps(header, ensure_ascii=False)[:-1] + ', "messages": ['
+
+  for i, message in enumerate(iter_messages(log_path, offset, max(end - offset, 0))):
+    yield ("" if i == 0 else ", ") + json.dumps(message, ensure_ascii=False)
+
+  yield "]}"
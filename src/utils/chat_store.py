@@ -0,0 +1,188 @@
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from threading import Lock
+from time import time
+from uuid import UUID
+
+from utils.chat_history import get_log_path, iter_messages
+from utils.logger import LOGS_DIR
+
+def is_chat_log(file_name: str) -> bool:
+  """Chat logs are named after the chat id, a UUID; scrapper and benchmark logs are not."""
+  chat_id, extension = os.path.splitext(file_name)
+  try:
+    return extension == ".json" and str(UUID(chat_id)) == chat_id
+  except ValueError:
+    return False
+
+class ChatStore(ABC):
+  """
+    Registry of chat ids and names. Chats evicted from the store, or lost on a
+    restart, are rehydrated from their log file in `./logs`.
+  """
+  @abstractmethod
+  def create(self, chat_id: str, name: str = "", updated_at: float | None = None) -> dict:
+    ...
+
+  @abstractmethod
+  def get(self, chat_id: str) -> dict | None:
+    ...
+
+  @abstractmethod
+  def set_name(self, chat_id: str, name: str) -> None:
+    ...
+
+  @abstractmethod
+  def list(self, offset: int = 0, limit: int | None = None) -> list[dict]:
+    """Chats ordered from the most to the least recently used."""
+
+  @abstractmethod
+  def evict(self, idle_for: float) -> int:
+    """Removes chats not used in the last `idle_for` seconds. Returns how many were removed."""
+
+  def get_or_rehydrate(self, chat_id: str) -> dict | None:
+    return self.get(chat_id) or self.rehydrate(chat_id)
+
+  def rehydrate(self, chat_id: str) -> dict | None:
+    log_path = get_log_path(chat_id)
+    if not os.path.exists(log_path):
+      return None
+
+    name = ""
+    for message in iter_messages(log_path, 0, 20):
+      if isinstance(message, dict) and message.get("type") == "USER":
+        name = message.get("content", "")
+        break
+
+    return self.create(chat_id, name, updated_at=os.path.getmtime(log_path))
+
+  def rehydrate_all(self, max_chats: int | None = None) -> int:
+    """Registers the most recent chats found in `./logs`. Returns how many were added."""
+    log_files = [
+      f for f in os.listdir(LOGS_DIR)
+      if is_chat_log(f) and self.get(f[:-len(".json")]) is None
+    ]
+    log_files.sort(key=lambda f: os.path.getmtime(os.path.join(LOGS_DIR, f)), reverse=True)
+
+    added = 0
+    for log_file in log_files[:max_chats]:
+      try:
+        if self.rehydrate(log_file[:-len(".json")]):
+          added += 1
+      except Exception:
+        continue
+    return added
+
+class MemoryChatStore(ChatStore):
+  def __init__(self, max_chats: int = 1000):
+    self.max_chats = max_chats
+    self._chats: OrderedDict[str, dict] = OrderedDict()
+    self._lock = Lock()
+
+  def create(self, chat_id: str, name: str = "", updated_at: float | None = None) -> dict:
+    chat = {"id": chat_id, "name": name, "updated_at": updated_at or time()}
+    with self._lock:
+      self._chats[chat_id] = chat
+      self._chats.move_to_end(chat_id)
+      while len(self._chats) > self.max_chats:
+        self._chats.popitem(last=False)
+    return chat
+
+  def get(self, chat_id: str) -> dict | None:
+    with self._lock:
+      chat = self._chats.get(chat_id)
+      if chat is not None:
+        self._chats.move_to_end(chat_id)
+      return chat
+
+  def set_name(self, chat_id: str, name: str) -> None:
+    with self._lock:
+      chat = self._chats.get(chat_id)
+      if chat is None:
+        return
+      chat["name"] = name
+      chat["updated_at"] = time()
+      self._chats.move_to_end(chat_id)
+
+  def list(self, offset: int = 0, limit: int | None = None) -> list[dict]:
+    with self._lock:
+      chats = sorted(self._chats.values(), key=lambda c: c["updated_at"], reverse=True)
+    return chats[offset:None if limit is None else offset + limit]
+
+  def evict(self, idle_for: float) -> int:
+    threshold = time() - idle_for
+    with self._lock:
+      cold = [chat_id for chat_id, chat in self._chats.items() if chat["updated_at"] < threshold]
+      for chat_id in cold:
+        del self._chats[chat_id]
+    return len(cold)
+
+class SqliteChatStore(ChatStore):
+  """Chat registry shared by every worker that points at the same database file."""
+  def __init__(self, db_path: str, max_chats: int = 100000):
+    self.max_chats = max_chats
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=10)
+    self._db.execute("PRAGMA journal_mode=WAL")
+    self._db.execute(
+      "CREATE TABLE IF NOT EXISTS chats (id TEXT PRIMARY KEY, name TEXT, updated_at REAL)"
+    )
+    self._db.execute("CREATE INDEX IF NOT EXISTS chats_updated_at ON chats (updated_at)")
+    self._db.commit()
+    self._lock = Lock()
+
+  def create(self, chat_id: str, name: str = "", updated_at: float | None = None) -> dict:
+    chat = {"id": chat_id, "name": name, "updated_at": updated_at or time()}
+    with self._lock:
+      self._db.execute(
+        "INSERT OR REPLACE INTO chats (id, name, updated_at) VALUES (?, ?, ?)",
+        (chat["id"], chat["name"], chat["updated_at"])
+      )
+      self._db.execute(
+        "DELETE FROM chats WHERE id IN (SELECT id FROM chats ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+        (self.max_chats,)
+      )
+      self._db.commit()
+    return chat
+
+  def get(self, chat_id: str) -> dict | None:
+    with self._lock:
+      row = self._db.execute(
+        "SELECT id, name, updated_at FROM chats WHERE id = ?", (chat_id,)
+      ).fetchone()
+    return self._to_chat(row) if row else None
+
+  def set_name(self, chat_id: str, name: str) -> None:
+    with self._lock:
+      self._db.execute(
+        "UPDATE chats SET name = ?, updated_at = ? WHERE id = ?", (name, time(), chat_id)
+      )
+      self._db.commit()
+
+  def list(self, offset: int = 0, limit: int | None = None) -> list[dict]:
+    with self._lock:
+      rows = self._db.execute(
+        "SELECT id, name, updated_at FROM chats ORDER BY updated_at DESC LIMIT ? OFFSET ?",
+        (-1 if limit is None else limit, offset)
+      ).fetchall()
+    return [self._to_chat(row) for row in rows]
+
+  def evict(self, idle_for: float) -> int:
+    with self._lock:
+      cursor = self._db.execute("DELETE FROM chats WHERE updated_at < ?", (time() - idle_for,))
+      self._db.commit()
+    return cursor.rowcount
+
+  def _to_chat(self, row) -> dict:
+    return {"id": row[0], "name": row[1], "updated_at": row[2]}
+
+def make_chat_store() -> ChatStore:
+  """Builds the store selected by CHAT_STORE ("memory" or "sqlite")."""
+  max_chats = int(os.getenv("CHAT_STORE_MAX_CHATS", "1000"))
+
+  if os.getenv("CHAT_STORE", "memory") == "sqlite":
+    return SqliteChatStore(os.getenv("CHAT_STORE_PATH", "./data/chats.sqlite"), max_chats=max_chats)
+
+  return MemoryChatStore(max_chats=max_chats)
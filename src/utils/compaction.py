@@ -0,0 +1,110 @@
+from os import getenv
+
+from langchain_core.messages import BaseMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+
+from utils.utils import estimate_tokens, get_run_context
+
+# Tool outputs (page summaries, extracted pages) stay in the graph state and are
+# re-sent on every LLM call. Past CONTEXT_TOKEN_BUDGET the oldest ones are cut
+# down to an excerpt. 0 disables compaction.
+CONTEXT_TOKEN_BUDGET = int(getenv("CONTEXT_TOKEN_BUDGET", "24000"))
+CONTEXT_KEEP_TOOL_MESSAGES = int(getenv("CONTEXT_KEEP_TOOL_MESSAGES", "2"))
+CONTEXT_COMPACTED_TOOL_TOKENS = int(getenv("CONTEXT_COMPACTED_TOOL_TOKENS", "200"))
+
+# page_summary only returns the changes since its previous call, so once one of its
+# outputs is compacted the next call must return the whole page again.
+RERUN_HINTS = {"page_summary": "Call page_summary with full=true if you need it."}
+
+def message_tokens(message: BaseMessage) -> int:
+  content = message.content if isinstance(message.content, str) else str(message.content)
+  return estimate_tokens(content)
+
+def compact_tool_message(message: ToolMessage, excerpt_tokens: int) -> ToolMessage:
+  """
+    Replaces the content of a tool message by its first `excerpt_tokens` tokens.
+    The id and tool_call_id are kept, so the message replaces the original in the
+    state and stays paired with the tool call of the previous AI message.
+  """
+  original_tokens = message_tokens(message)
+  excerpt = message.content[:excerpt_tokens * 4]
+
+  return ToolMessage(
+    content=f"{excerpt}\n[... output compacted, {original_tokens - estimate_tokens(excerpt)} of {original_tokens} tokens omitted. {RERUN_HINTS.get(message.name, 'Call the tool again if you need it.')}]",
+    tool_call_id=message.tool_call_id,
+    name=message.name,
+    id=message.id,
+    response_metadata={**message.response_metadata, "compacted": True, "original_tokens": original_tokens}
+  )
+
+def compact_messages(
+  messages: list[BaseMessage],
+  max_tokens: int = CONTEXT_TOKEN_BUDGET,
+  keep_recent: int = CONTEXT_KEEP_TOOL_MESSAGES,
+  excerpt_tokens: int = CONTEXT_COMPACTED_TOOL_TOKENS
+) -> tuple[list[ToolMessage], int]:
+  """
+    Compacts the oldest tool messages, skipping the `keep_recent` latest ones,
+    until the conversation fits in `max_tokens`.
+    Returns:
+      tuple[list[ToolMessage], int]: The compacted messages, to be merged by id into
+        the state, and the number of tokens they no longer take.
+  """
+  total_tokens = sum(message_tokens(message) for message in messages)
+  if max_tokens <= 0 or total_tokens <= max_tokens:
+    return [], 0
+
+  tool_messages = [message for message in messages if isinstance(message, ToolMessage)]
+  candidates = tool_messages[:max(len(tool_messages) - keep_recent, 0)]
+
+  compacted = []
+  trimmed_tokens = 0
+
+  for message in candidates:
+    if total_tokens <= max_tokens:
+      break
+    if message.response_metadata.get("compacted") or not isinstance(message.content, str) or message.id is None:
+      continue
+    if message_tokens(message) <= excerpt_tokens:
+      continue
+
+    compacted_message = compact_tool_message(message, excerpt_tokens)
+    saved = message_tokens(message) - message_tokens(compacted_message)
+    compacted.append(compacted_message)
+    trimmed_tokens += saved
+    total_tokens -= saved
+
+  return compacted, trimmed_tokens
+
+def make_compaction_node(
+  max_tokens: int = CONTEXT_TOKEN_BUDGET,
+  keep_recent: int = CONTEXT_KEEP_TOOL_MESSAGES,
+  excerpt_tokens: int = CONTEXT_COMPACTED_TOOL_TOKENS
+):
+  """
+    Graph node that runs before an LLM node. It keeps a `compaction` entry in the
+    run context with the tokens currently trimmed from the state and the tokens
+    saved so far, i.e. trimmed tokens summed over every LLM call that followed.
+  """
+  async def compaction_node(state: dict, config: RunnableConfig):
+    run = get_run_context(config)
+    stats = run.setdefault("compaction", {"compacted_messages": 0, "trimmed_tokens": 0, "tokens_saved": 0})
+
+    compacted, trimmed_tokens = compact_messages(state["messages"], max_tokens, keep_recent, excerpt_tokens)
+
+    stats["compacted_messages"] += len(compacted)
+    stats["trimmed_tokens"] += trimmed_tokens
+    stats["tokens_saved"] += stats["trimmed_tokens"]
+
+    if any(message.name == "page_summary" for message in compacted) and run.get("scrapper"):
+      run["scrapper"].forget_summary()
+
+    if compacted:
+      run["logger"].debug(f"COMPACTION 🗜️ -> {len(compacted)} tool messages compacted, ~{trimmed_tokens} tokens trimmed")
+
+    return {"messages": compacted}
+
+  return compaction_node
+
+def tokens_saved(config: RunnableConfig) -> int:
+  return get_run_context(config).get("compaction", {}).get("tokens_saved", 0)
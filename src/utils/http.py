@@ -0,0 +1,44 @@
+import re
+import hashlib
+
+import httpx
+
+DEFAULT_HEADERS = {
+  "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/133.0 Safari/537.36",
+  "Accept-Language": "pt-BR,pt;q=0.9,en;q=0.8"
+}
+
+_client: httpx.AsyncClient | None = None
+
+def get_http_client() -> httpx.AsyncClient:
+  """Return the process-wide pooled HTTP client, creating it on first use."""
+  global _client
+  if _client is None or _client.is_closed:
+    _client = httpx.AsyncClient(
+      headers=DEFAULT_HEADERS,
+      follow_redirects=True,
+      timeout=httpx.Timeout(15.0, connect=5.0),
+      limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+    )
+  return _client
+
+async def close_http_client() -> None:
+  global _client
+  if _client is not None:
+    await _client.aclose()
+    _client = None
+
+def hash_page_content(html: str) -> str:
+  """Hash the visible text of a page, ignoring scripts, styles and markup."""
+  text = re.sub(r"<(script|style|noscript)\b.*?</\1>", " ", html, flags=re.S | re.I)
+  text = re.sub(r"<[^>]+>", " ", text)
+  text = " ".join(text.split())
+  return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def response_validators(headers, html: str = None) -> dict:
+  """`etag`, `last_modified` and `content_hash` (None without the body) of a page response."""
+  return {
+    "etag": headers.get("etag"),
+    "last_modified": headers.get("last-modified"),
+    "content_hash": hash_page_content(html) if html is not None else None
+  }
@@ -0,0 +1,38 @@
+from os import getenv
+
+import httpx
+from langchain_core.language_models import BaseChatModel
+from langchain_openai import ChatOpenAI
+
+_http_client: httpx.AsyncClient | None = None
+_llms: dict[str, BaseChatModel] = {}
+
+def get_llm_http_client() -> httpx.AsyncClient:
+  """Connection pool shared by every LLM client of the process."""
+  global _http_client
+  if _http_client is None or _http_client.is_closed:
+    _http_client = httpx.AsyncClient(
+      timeout=httpx.Timeout(600.0, connect=10.0),
+      limits=httpx.Limits(
+        max_connections=int(getenv("LLM_MAX_CONNECTIONS", "100")),
+        max_keepalive_connections=int(getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+      )
+    )
+  return _http_client
+
+def get_llm(model: str) -> BaseChatModel:
+  """Return the process-wide chat model client for `model`, creating it on first use."""
+  if model not in _llms:
+    _llms[model] = ChatOpenAI(model=model, http_async_client=get_llm_http_client())
+  return _llms[model]
+
+def register_llm(model: str, llm: BaseChatModel) -> None:
+  """Serve `llm` for `model` instead of an OpenAI client (offline benchmarks)."""
+  _llms[model] = llm
+
+async def close_llm_clients() -> None:
+  global _http_client
+  _llms.clear()
+  if _http_client is not None:
+    await _http_client.aclose()
+    _http_client = None
@@ -0,0 +1,150 @@
+from os import getenv
+from threading import Lock
+from uuid import uuid4
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.prompts import ChatPromptTemplate
+
+from utils.cache import TTLCache, make_cache_key
+from utils.scheduler import SCHEDULER
+from utils.tracing import Span
+
+# Opt-in: identical prompt + messages to the same model and tools get the recorded answer.
+LLM_CACHE = getenv("LLM_CACHE", "0") == "1"
+LLM_CACHE_TTL = float(getenv("LLM_CACHE_TTL", "3600"))
+
+def parse_node_ttls(value: str) -> dict[str, float]:
+  """"receptionist=86400,researcher=0" -> {"receptionist": 86400.0, "researcher": 0.0}"""
+  ttls = {}
+  for item in value.split(","):
+    node, _, ttl = item.partition("=")
+    if node.strip() and ttl.strip():
+      ttls[node.strip()] = float(ttl)
+  return ttls
+
+# Seconds an answer is reused, per node; 0 bypasses the cache. The researcher is
+# bypassed by default: its answers decide which searches run.
+NODE_TTLS = parse_node_ttls(getenv(
+  "LLM_CACHE_NODE_TTLS",
+  "receptionist=86400,analyst=3600,navigator=3600,researcher=0"
+))
+
+llm_cache = TTLCache(
+  "llm_responses",
+  max_entries=int(getenv("LLM_CACHE_SIZE", "1024")),
+  ttl=LLM_CACHE_TTL,
+  db_path=getenv("LLM_CACHE_DB") or None
+)
+
+_lock = Lock()
+_node_stats: dict[str, dict] = {}
+
+def node_ttl(node: str) -> float:
+  if not LLM_CACHE:
+    return 0
+  return NODE_TTLS.get(node, LLM_CACHE_TTL)
+
+def model_key(llm) -> dict:
+  """Model name and bound tools (and other bound kwargs) of a chat model or a `bind_tools` binding."""
+  bound = getattr(llm, "bound", llm)
+  return {
+    "model": getattr(bound, "model_name", None) or getattr(bound, "model", None) or type(bound).__name__,
+    "kwargs": getattr(llm, "kwargs", {})
+  }
+
+def message_key(message: BaseMessage) -> dict:
+  """What of a message reaches the model. Ids, tool call ids and metadata differ between identical runs."""
+  key = {"type": message.type, "content": message.content}
+  if getattr(message, "name", None):
+    key["name"] = message.name
+  if isinstance(message, AIMessage) and message.tool_calls:
+    key["tool_calls"] = [{"name": tc["name"], "args": tc["args"]} for tc in message.tool_calls]
+  return key
+
+def dump_message(message: AIMessage) -> dict:
+  return {
+    "content": message.content,
+    "tool_calls": [{"name": tc["name"], "args": tc["args"]} for tc in message.tool_calls],
+    "total_tokens": (message.usage_metadata or {}).get("total_tokens", 0)
+  }
+
+def replay_message(value: dict) -> AIMessage:
+  """
+    The recorded answer with the same content and tool calls. Tool call ids are
+    new, so an answer replayed twice in a conversation doesn't repeat ids, and the
+    usage is zero since no tokens were spent.
+  """
+  return AIMessage(
+    content=value["content"],
+    tool_calls=[
+      {"id": f"call_{uuid4().hex[:24]}", "name": tc["name"], "args": tc["args"]}
+      for tc in value["tool_calls"]
+    ],
+    usage_metadata={"input_tokens": 0, "output_tokens": 0, "total_tokens": 0},
+    response_metadata={"llm_cache": "hit", "saved_tokens": value["total_tokens"]}
+  )
+
+def is_cacheable(message: AIMessage) -> bool:
+  return bool(message.content or message.tool_calls) and not message.invalid_tool_calls
+
+def record(node: str, hit: bool, saved_tokens: int = 0) -> None:
+  with _lock:
+    stats = _node_stats.setdefault(node, {"hits": 0, "misses": 0, "saved_tokens": 0})
+    stats["hits" if hit else "misses"] += 1
+    stats["saved_tokens"] += saved_tokens
+
+async def invoke_llm(node: str, prompt: ChatPromptTemplate, llm: BaseChatModel, prompt_input) -> AIMessage:
+  """
+    Runs `prompt | llm` for a graph node inside an LLM scheduler slot and span.
+    When the cache is on for the node, an identical call of that node (same model,
+    bound tools and rendered messages) is answered from the cache without taking a slot.
+  """
+  ttl = node_ttl(node)
+  if ttl <= 0:
+    async with SCHEDULER.slot("llm"):
+      with Span(f"{node}.llm", "llm") as llm_span:
+        message = await (prompt | llm).ainvoke(prompt_input)
+        llm_span.add_usage(message.usage_metadata)
+    return message
+
+  prompt_value = await prompt.ainvoke(prompt_input)
+  # The node is part of the key so an answer is only reused within its own node's TTL.
+  key = make_cache_key(node, model_key(llm), [message_key(m) for m in prompt_value.to_messages()])
+
+  cached = llm_cache.get(key)
+  if cached is not None:
+    with Span(f"{node}.llm", "llm_cache", saved_tokens=cached["total_tokens"]):
+      record(node, hit=True, saved_tokens=cached["total_tokens"])
+      return replay_message(cached)
+
+  async with SCHEDULER.slot("llm"):
+    with Span(f"{node}.llm", "llm") as llm_span:
+      message = await llm.ainvoke(prompt_value)
+      llm_span.add_usage(message.usage_metadata)
+
+  record(node, hit=False)
+  if is_cacheable(message):
+    llm_cache.set(key, dump_message(message), ttl=ttl)
+  return message
+
+def llm_cache_metrics() -> dict:
+  with _lock:
+    nodes = {node: dict(stats) for node, stats in _node_stats.items()}
+
+  hits = sum(stats["hits"] for stats in nodes.values())
+  lookups = hits + sum(stats["misses"] for stats in nodes.values())
+  return {
+    "enabled": LLM_CACHE,
+    "node_ttls": NODE_TTLS,
+    "hit_rate": hits / lookups if lookups else 0.0,
+    "saved_tokens": sum(stats["saved_tokens"] for stats in nodes.values()),
+    "nodes": nodes
+  }
+
+def cached_tokens(messages: list) -> int:
+  """Tokens the answers replayed from the cache in `messages` had cost."""
+  return sum(
+    (getattr(message, "response_metadata", None) or {}).get("saved_tokens", 0)
+    for message in messages if isinstance(message, AIMessage)
+  )
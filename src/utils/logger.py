@@ -1,35 +1,204 @@
 import os
+import asyncio
+import atexit
 from datetime import datetime
 from uuid import uuid4
 import json
-from queue import Queue
+import struct
+from queue import Queue, Empty
+from threading import Lock, Thread
+from time import monotonic
 
 LOGS_DIR = "./logs"
 os.makedirs(LOGS_DIR, exist_ok=True)
 
+# Sidecar index entry: byte offset and length of a chat record in the log file.
+INDEX_ENTRY = struct.Struct("<QI")
+
+# Record kinds that are not part of the chat: they are neither indexed nor streamed to the client.
+INTERNAL_KINDS = ("DEBUG", "SPAN")
+
+# fsync the log file after each append, so logged records survive a machine crash.
+LOG_FSYNC = os.getenv("LOG_FSYNC", "0") == "1"
+
+def get_index_path(log_path: str) -> str:
+  return os.path.splitext(log_path)[0] + ".idx"
+
+def rebuild_index(path: str) -> None:
+  """Rebuilds the sidecar index of a log file written before indexes existed."""
+  index_entries = []
+  offset = 0
+
+  with open(path, "rb") as log_file:
+    for line in log_file:
+      try:
+        if json.loads(line).get("type") not in INTERNAL_KINDS:
+          index_entries.append(INDEX_ENTRY.pack(offset, len(line)))
+      except (json.JSONDecodeError, UnicodeDecodeError, AttributeError):
+        pass
+      offset += len(line)
+
+  index_path = get_index_path(path)
+  with open(index_path + ".tmp", "wb") as index_file:
+    index_file.write(b"".join(index_entries))
+  os.replace(index_path + ".tmp", index_path)
+
+def dump_line(line: str | dict) -> str:
+  """A record as a JSON line. Values that aren't JSON serializable are written as their str()."""
+  return line if isinstance(line, str) else json.dumps(line, default=str)
+
+def append_records(path: str, records: list[tuple[str, bool]]) -> None:
+  """
+    Appends JSON lines to a log file and the offsets of the `indexed` ones to
+    its sidecar index, so history pages can be read without parsing the file.
+    Both files are fsynced when LOG_FSYNC is on.
+  """
+  index_entries = []
+
+  with open(path, "ab") as log_file:
+    offset = log_file.tell()
+    if offset > 0 and not os.path.exists(get_index_path(path)):
+      rebuild_index(path)
+
+    chunks = []
+    for line, indexed in records:
+      data = (line + "\n").encode("utf-8")
+      if indexed:
+        index_entries.append(INDEX_ENTRY.pack(offset, len(data)))
+      chunks.append(data)
+      offset += len(data)
+    log_file.write(b"".join(chunks))
+    if LOG_FSYNC:
+      log_file.flush()
+      os.fsync(log_file.fileno())
+
+  if index_entries:
+    with open(get_index_path(path), "ab") as index_file:
+      index_file.write(b"".join(index_entries))
+      if LOG_FSYNC:
+        index_file.flush()
+        os.fsync(index_file.fileno())
+
+class LogWriter:
+  """
+    Appends log lines from a background thread, so logging never blocks the
+    event loop. Lines are batched and written when `max_batch` lines are
+    queued or `flush_interval` seconds have passed, and at interpreter exit.
+    Records queued as dicts are serialized to JSON in the thread too, so they
+    must not be changed after being written.
+  """
+  _STOP = object()
+
+  def __init__(self, flush_interval: float = 0.2, max_batch: int = 500):
+    self.flush_interval = flush_interval
+    self.max_batch = max_batch
+    self._queue = Queue()
+    self._thread = None
+    self._lock = Lock()
+
+  def write(self, path: str, lines: list[str | dict], indexed: bool) -> None:
+    self._ensure_started()
+    self._queue.put((path, lines, indexed))
+
+  def flush(self) -> None:
+    """Block until every queued line is on disk."""
+    if self._thread is not None:
+      self._queue.join()
+
+  def close(self) -> None:
+    with self._lock:
+      if self._thread is None:
+        return
+      self._queue.put(self._STOP)
+      self._thread.join()
+      self._thread = None
+
+  def _ensure_started(self) -> None:
+    if self._thread is not None:
+      return
+    with self._lock:
+      if self._thread is None:
+        self._thread = Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+  def _run(self) -> None:
+    while True:
+      item = self._queue.get()
+      batch = [item]
+      deadline = monotonic() + self.flush_interval
+
+      while item is not self._STOP and len(batch) < self.max_batch:
+        timeout = deadline - monotonic()
+        if timeout <= 0:
+          break
+        try:
+          item = self._queue.get(timeout=timeout)
+        except Empty:
+          break
+        batch.append(item)
+
+      self._write_batch([entry for entry in batch if entry is not self._STOP])
+
+      for _ in batch:
+        self._queue.task_done()
+
+      if item is self._STOP:
+        return
+
+  def _write_batch(self, batch: list[tuple[str, list[str | dict], bool]]) -> None:
+    by_path: dict[str, list[tuple[str, bool]]] = {}
+    for path, lines, indexed in batch:
+      by_path.setdefault(path, []).extend(
+        (dump_line(line), indexed) for line in lines
+      )
+
+    for path, records in by_path.items():
+      try:
+        append_records(path, records)
+      except OSError:
+        pass
+
+LOG_WRITER = LogWriter(
+  flush_interval=float(os.getenv("LOG_FLUSH_INTERVAL", "0.2")),
+  max_batch=int(os.getenv("LOG_MAX_BATCH", "500"))
+)
+atexit.register(LOG_WRITER.close)
+
 class Logger:
   def __init__(
     self, 
     file_name: str = "", 
     show_debug_logs: bool = False,
     format_logs: bool = True,
-    logger_id: str = str(uuid4())
+    logger_id: str = str(uuid4()),
+    buffered: bool = True
   ):
-    self.LOGS_QUEUE = Queue()
+    self.LOGS_QUEUE = asyncio.Queue()
+    self.loop = None
     self.id = logger_id
     self.file_name = file_name + f"{logger_id}.json"
     self.show_debug_logs = show_debug_logs
     self.format_logs = format_logs
+    self.buffered = buffered
   
   def info(self, *msgs: str | dict):
-    self.display(*msgs, kind="INFO")
-    self.append_to_log_file(*msgs, kind="INFO")
+    # The client receives the same lines that are written, so they are serialized once.
+    serialized_msgs = [self.serialize_message(msg, "INFO") for msg in msgs]
+    for msg, ser_msg in zip(msgs, serialized_msgs):
+      self.publish(ser_msg if self.format_logs else f"[INFO] {msg!r}")
+    self.write_lines(serialized_msgs, kind="INFO")
   
   def debug(self, *msgs: str | dict):
     if self.show_debug_logs:
       self.display(*msgs, kind="DEBUG")
     self.append_to_log_file(*msgs, kind="DEBUG")
 
+  def span(self, record: dict):
+    """A finished timing span (see utils.tracing), shown along with the debug logs."""
+    if self.show_debug_logs:
+      self.display(record, kind="SPAN")
+    self.append_to_log_file(record, kind="SPAN")
+
   def get_log_file(self) -> str | dict:
     return self.file_name
   
@@ -37,19 +206,43 @@ class Logger:
     for msg in msgs:
       ser_msg = self.serialize_message(msg, kind)
       
-      self.LOGS_QUEUE.put(
-        ser_msg if self.format_logs else f"[{kind}] {msg!r}"
-      )
+      self.publish(ser_msg if self.format_logs else f"[{kind}] {msg!r}")
+
+  def publish(self, msg: str):
+    """Push a message to LOGS_QUEUE, waking up whoever awaits it. Safe to call from other threads."""
+    try:
+      self.loop = asyncio.get_running_loop()
+    except RuntimeError:
+      if self.loop is not None and self.loop.is_running():
+        self.loop.call_soon_threadsafe(self.LOGS_QUEUE.put_nowait, msg)
+        return
+
+    self.LOGS_QUEUE.put_nowait(msg)
 
   def append_to_log_file(self, *msgs: str | dict, kind: str):
-    with open(os.path.join(LOGS_DIR, self.file_name), "a") as log_file:
-      serialized_msgs = [self.serialize_message(msg, kind) for msg in msgs]
-      log_file.write("\n".join(serialized_msgs) + "\n")
+    # Buffered records are serialized by the writer thread, off the event loop.
+    self.write_lines([self.make_record(msg, kind) for msg in msgs], kind)
 
-  def serialize_message(self, msg: str | dict, kind: str) -> str:
-    return json.dumps({
+  def write_lines(self, lines: list[str | dict], kind: str):
+    path = os.path.join(LOGS_DIR, self.file_name)
+    indexed = kind not in INTERNAL_KINDS
+
+    if self.buffered:
+      LOG_WRITER.write(path, lines, indexed)
+      return
+
+    append_records(path, [(dump_line(line), indexed) for line in lines])
+
+  def flush(self):
+    LOG_WRITER.flush()
+
+  def make_record(self, msg: str | dict, kind: str) -> dict:
+    return {
       "time": datetime.now().strftime('%Y-%m-%d_%H-%M-%S'),
       "id": self.id,
       "type": kind,
       "content": msg
-    })
\ No newline at end of file
+    }
+
+  def serialize_message(self, msg: str | dict, kind: str) -> str:
+    return json.dumps(self.make_record(msg, kind))
\ No newline at end of file
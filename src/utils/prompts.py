@@ -0,0 +1,59 @@
+import os
+import hashlib
+
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+
+from utils.utils import get_prompt
+
+class PromptRegistry:
+  """
+    Loads and compiles every `<role>.md` prompt of a directory once. With
+    `hot_reload` (dev mode) a prompt is recompiled when its file changes.
+    Each prompt has a version hash so logs can tell which prompt produced an output.
+  """
+  def __init__(self, prompts_dir: str, hot_reload: bool = False):
+    self.prompts_dir = prompts_dir
+    self.hot_reload = hot_reload
+    self._prompts: dict[str, dict] = {}
+
+    for file_name in os.listdir(prompts_dir):
+      if file_name.endswith(".md"):
+        self._load(file_name[:-len(".md")])
+
+  def get(self, role: str) -> ChatPromptTemplate:
+    return self._get_entry(role)["template"]
+
+  def version(self, role: str) -> str:
+    return self._get_entry(role)["version"]
+
+  def versions(self) -> dict[str, str]:
+    return {role: self.version(role) for role in list(self._prompts)}
+
+  def _get_entry(self, role: str) -> dict:
+    entry = self._prompts.get(role)
+
+    if entry is None or (self.hot_reload and os.path.getmtime(self._path(role)) != entry["mtime"]):
+      entry = self._load(role)
+
+    return entry
+
+  def _load(self, role: str) -> dict:
+    path = self._path(role)
+    mtime = os.path.getmtime(path)
+    content = get_prompt(path)
+
+    self._prompts[role] = {
+      "mtime": mtime,
+      "version": hashlib.sha256(content.encode("utf-8")).hexdigest()[:12],
+      "template": ChatPromptTemplate.from_messages([
+        ("system", content),
+        MessagesPlaceholder("messages")
+      ])
+    }
+    return self._prompts[role]
+
+  def _path(self, role: str) -> str:
+    return os.path.join(self.prompts_dir, f"{role}.md")
+
+def make_prompt_registry(prompts_dir: str) -> PromptRegistry:
+  return PromptRegistry(prompts_dir, hot_reload=os.getenv("PROMPTS_HOT_RELOAD", "") == "1")
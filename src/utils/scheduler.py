@@ -0,0 +1,164 @@
+import asyncio
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from os import getenv
+from time import monotonic
+
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+# (owner, priority) of the work running in the current task. Tasks created by
+# gather/create_task inherit it, so every browser, LLM and search slot taken on
+# behalf of a chat is queued under that chat.
+_current_job: ContextVar[tuple[str, int]] = ContextVar("scheduler_job", default=("default", BACKGROUND))
+
+@contextmanager
+def job(owner: str, priority: int = INTERACTIVE):
+  """Runs the enclosed work on behalf of `owner` (usually a chat id)."""
+  token = _current_job.set((owner, priority))
+  try:
+    yield
+  finally:
+    _current_job.reset(token)
+
+def current_job() -> tuple[str, int]:
+  return _current_job.get()
+
+class FairLimiter:
+  """
+    Semaphore that hands free slots to waiters by priority first and then round
+    robin between owners, so one chat with many pending calls can't starve the
+    others.
+  """
+  def __init__(self, name: str, capacity: int):
+    self.name = name
+    self.capacity = capacity
+    self.in_use = 0
+
+    self._waiters: dict[int, OrderedDict[str, deque[asyncio.Future]]] = {}
+
+    self.acquired = 0
+    self.waited = 0
+    self.total_wait = 0.0
+    self.max_wait = 0.0
+
+  async def acquire(self, owner: str, priority: int = BACKGROUND) -> None:
+    if self.in_use < self.capacity and not self.queued():
+      self.in_use += 1
+      self.acquired += 1
+      return
+
+    waiter = asyncio.get_running_loop().create_future()
+    self._waiters.setdefault(priority, OrderedDict()).setdefault(owner, deque()).append(waiter)
+    start = monotonic()
+
+    try:
+      await waiter
+    except asyncio.CancelledError:
+      if waiter.done() and not waiter.cancelled():
+        # The slot was handed over right before the cancellation, pass it on.
+        self.release()
+      else:
+        self._remove(priority, owner, waiter)
+      raise
+
+    wait = monotonic() - start
+    self.acquired += 1
+    self.waited += 1
+    self.total_wait += wait
+    self.max_wait = max(self.max_wait, wait)
+
+  def release(self) -> None:
+    waiter = self._next_waiter()
+    if waiter is not None:
+      # The slot goes straight to the waiter, `in_use` doesn't change.
+      waiter.set_result(None)
+      return
+
+    self.in_use = max(self.in_use - 1, 0)
+
+  def queued(self, priority: int | None = None) -> int:
+    levels = self._waiters.values() if priority is None else [self._waiters.get(priority, {})]
+    return sum(len(waiters) for owners in levels for waiters in owners.values())
+
+  def metrics(self) -> dict:
+    return {
+      "name": self.name,
+      "capacity": self.capacity,
+      "in_use": self.in_use,
+      "queued": self.queued(),
+      "queued_by_priority": {name: self.queued(priority) for priority, name in PRIORITY_NAMES.items()},
+      "owners_waiting": len({owner for owners in self._waiters.values() for owner in owners}),
+      "acquired": self.acquired,
+      "waited": self.waited,
+      "avg_wait": self.total_wait / self.waited if self.waited else 0.0,
+      "max_wait": self.max_wait
+    }
+
+  def _next_waiter(self) -> asyncio.Future | None:
+    for priority in sorted(self._waiters):
+      owners = self._waiters[priority]
+      while owners:
+        owner, waiters = next(iter(owners.items()))
+        waiter = waiters.popleft()
+
+        if waiters:
+          owners.move_to_end(owner)
+        else:
+          del owners[owner]
+
+        if not waiter.done():
+          return waiter
+    return None
+
+  def _remove(self, priority: int, owner: str, waiter: asyncio.Future) -> None:
+    waiters = self._waiters.get(priority, {}).get(owner)
+    if waiters is None or waiter not in waiters:
+      return
+
+    waiters.remove(waiter)
+    if not waiters:
+      del self._waiters[priority][owner]
+
+class Scheduler:
+  """One FairLimiter per shared resource: browser sessions, LLM requests and search API calls."""
+  def __init__(self, browser_slots: int, llm_slots: int, search_slots: int):
+    self.limiters = {
+      "browser": FairLimiter("browser", browser_slots),
+      "llm": FairLimiter("llm", llm_slots),
+      "search": FairLimiter("search", search_slots)
+    }
+
+  async def acquire(self, resource: str) -> None:
+    owner, priority = current_job()
+    await self.limiters[resource].acquire(owner, priority)
+
+  def release(self, resource: str) -> None:
+    self.limiters[resource].release()
+
+  @asynccontextmanager
+  async def slot(self, resource: str):
+    await self.acquire(resource)
+    try:
+      yield
+    finally:
+      self.release(resource)
+
+  def metrics(self) -> dict:
+    return {name: limiter.metrics() for name, limiter in self.limiters.items()}
+
+# Browser slots default to the browser pool capacity, so sessions queue here,
+# fairly, instead of inside the pool.
+SCHEDULER = Scheduler(
+  browser_slots=int(getenv(
+    "SCHEDULER_BROWSER_SLOTS",
+    str(int(getenv("BROWSER_POOL_SIZE", "2")) * int(getenv("BROWSER_POOL_CONTEXTS_PER_BROWSER", "3")))
+  )),
+  llm_slots=int(getenv("SCHEDULER_LLM_SLOTS", "16")),
+  search_slots=int(getenv("SCHEDULER_SEARCH_SLOTS", "4"))
+)
+
+def scheduler_metrics() -> dict:
+  return SCHEDULER.metrics()
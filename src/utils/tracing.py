@@ -0,0 +1,163 @@
+import asyncio
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import wraps
+from os import getenv
+from threading import Lock
+from time import perf_counter, time
+from uuid import uuid4
+
+# Spans are always aggregated into the histograms; TRACING_LOG_SPANS=0 stops writing them to the chat logs.
+LOG_SPANS = getenv("TRACING_LOG_SPANS", "1") == "1"
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_current_span: ContextVar["Span | None"] = ContextVar("current_span", default=None)
+
+class Histogram:
+  """Cumulative Prometheus histogram with one series per label set."""
+  def __init__(self, name: str, help: str, label_names: tuple[str, ...], buckets: tuple[float, ...]):
+    self.name = name
+    self.help = help
+    self.label_names = label_names
+    self.buckets = buckets
+    self._series: dict[tuple, list] = {}
+    self._lock = Lock()
+
+  def observe(self, labels: tuple, value: float) -> None:
+    with self._lock:
+      series = self._series.setdefault(labels, [[0] * (len(self.buckets) + 1), 0.0, 0])
+      series[0][bisect_left(self.buckets, value)] += 1
+      series[1] += value
+      series[2] += 1
+
+  def render(self) -> list[str]:
+    lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+
+    with self._lock:
+      for labels, (counts, total, count) in sorted(self._series.items()):
+        label_text = format_labels(self.label_names, labels)
+        cumulative = 0
+        for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+          cumulative += bucket_count
+          lines.append(f"{self.name}_bucket{{{label_text},le=\"{bound}\"}} {cumulative}")
+        lines.append(f"{self.name}_sum{{{label_text}}} {total}")
+        lines.append(f"{self.name}_count{{{label_text}}} {count}")
+
+    return lines
+
+class Counter:
+  def __init__(self, name: str, help: str, label_names: tuple[str, ...]):
+    self.name = name
+    self.help = help
+    self.label_names = label_names
+    self._values: dict[tuple, float] = {}
+    self._lock = Lock()
+
+  def inc(self, labels: tuple, value: float = 1) -> None:
+    with self._lock:
+      self._values[labels] = self._values.get(labels, 0) + value
+
+  def render(self) -> list[str]:
+    lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+    with self._lock:
+      for labels, value in sorted(self._values.items()):
+        lines.append(f"{self.name}{{{format_labels(self.label_names, labels)}}} {value}")
+    return lines
+
+def format_labels(names: tuple[str, ...], values: tuple) -> str:
+  def escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+  return ",".join(f"{name}=\"{escape(value)}\"" for name, value in zip(names, values))
+
+SPAN_DURATIONS = Histogram(
+  "aishopping_span_duration_seconds",
+  "Duration of agent nodes, tools, LLM calls and scrapper operations.",
+  ("kind", "name", "status"),
+  DURATION_BUCKETS
+)
+LLM_TOKENS = Counter("aishopping_llm_tokens_total", "Tokens used by LLM calls.", ("name", "type"))
+
+class Span:
+  """
+    A timed operation. Spans opened while another is open, in the same task or
+    in tasks it creates, are its children and share its trace and logger. On
+    exit the duration goes to SPAN_DURATIONS and, if there is a logger, the span
+    is written to the chat log as a SPAN record.
+  """
+  def __init__(self, name: str, kind: str, logger=None, **attributes):
+    parent = _current_span.get()
+
+    self.id = uuid4().hex[:16]
+    self.parent_id = parent.id if parent else None
+    self.trace_id = parent.trace_id if parent else self.id
+    self.logger = logger or (parent.logger if parent else None)
+    self.name = name
+    self.kind = kind
+    self.attributes = attributes
+    self.status = "ok"
+    self.start_time = None
+    self.duration = None
+
+  def set(self, **attributes) -> None:
+    self.attributes.update(attributes)
+
+  def add_usage(self, usage: dict | None) -> None:
+    """Records the token usage of an LLM response (its `usage_metadata`)."""
+    usage = usage or {}
+    for token_type in ("input_tokens", "output_tokens", "total_tokens"):
+      self.attributes[token_type] = usage.get(token_type, 0)
+    LLM_TOKENS.inc((self.name, "input"), usage.get("input_tokens", 0))
+    LLM_TOKENS.inc((self.name, "output"), usage.get("output_tokens", 0))
+
+  def __enter__(self) -> "Span":
+    self.start_time = time()
+    self._started = perf_counter()
+    self._token = _current_span.set(self)
+    return self
+
+  def __exit__(self, exc_type, exc, traceback) -> None:
+    self.duration = perf_counter() - self._started
+    _current_span.reset(self._token)
+
+    if exc_type is not None:
+      self.status = "cancelled" if issubclass(exc_type, asyncio.CancelledError) else "error"
+
+    SPAN_DURATIONS.observe((self.kind, self.name, self.status), self.duration)
+    if LOG_SPANS and self.logger is not None:
+      self.logger.span(self.to_dict())
+
+  def to_dict(self) -> dict:
+    return {
+      "id": self.id,
+      "trace_id": self.trace_id,
+      "parent_id": self.parent_id,
+      "name": self.name,
+      "kind": self.kind,
+      "start_time": self.start_time,
+      "duration": self.duration,
+      "status": self.status,
+      "attributes": self.attributes
+    }
+
+def traced(kind: str, name: str = None):
+  """
+    Runs every call of the decorated coroutine function inside a span. Methods
+    are named after the class of the instance, so a subclass calling `super()`
+    still shows up under its own name.
+  """
+  def decorator(fn):
+    is_method = "." in fn.__qualname__ and "<locals>" not in fn.__qualname__
+
+    @wraps(fn)
+    async def wrapper(*args, **kwargs):
+      span_name = name or (f"{type(args[0]).__name__}.{fn.__name__}" if is_method else fn.__qualname__)
+      with Span(span_name, kind):
+        return await fn(*args, **kwargs)
+
+    return wrapper
+
+  return decorator
+
+def prometheus_metrics() -> str:
+  return "\n".join(SPAN_DURATIONS.render() + LLM_TOKENS.render()) + "\n"
@@ -0,0 +1,139 @@
+import asyncio
+import base64
+import io
+from collections import OrderedDict
+from os import getenv
+from threading import Lock
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import HumanMessage
+from PIL import Image
+
+from utils.cache import TTLCache, make_cache_key
+from utils.scheduler import SCHEDULER
+from utils.tracing import Span
+
+# Screenshots are resized to this width and cut at this height before being sent.
+VISION_MAX_WIDTH = int(getenv("VISION_MAX_WIDTH", "1280"))
+VISION_MAX_HEIGHT = int(getenv("VISION_MAX_HEIGHT", "4096"))
+VISION_JPEG_QUALITY = int(getenv("VISION_JPEG_QUALITY", "75"))
+# Screenshots whose perceptual hashes differ in up to this many of their 256 bits
+# share a description, so a carousel, a timer or an ad doesn't trigger a new one.
+VISION_HASH_MAX_DISTANCE = int(getenv("VISION_HASH_MAX_DISTANCE", "8"))
+
+DESCRIBE_PROMPT = "Provide a comprehensive and detailed description of this webpage screenshot.\n\nProvide a structured response with sections and bullet points about the page title and purpose, main navigation elments, primary content, interactive elements, current state, possible actions, page structure, unique identifiers.\n\nScreenshot analysis:\n"
+
+description_cache = TTLCache(
+  "vision_descriptions",
+  max_entries=int(getenv("VISION_CACHE_SIZE", "256")),
+  ttl=float(getenv("VISION_CACHE_TTL", str(60 * 60))),
+  db_path=getenv("VISION_CACHE_DB") or None
+)
+
+# Hashes of the described screenshots, by model, for the nearest-hash lookup.
+_described_hashes: OrderedDict[tuple[str, str], None] = OrderedDict()
+_hashes_lock = Lock()
+
+def perceptual_hash(image: Image.Image, hash_size: int = 16) -> str:
+  """
+    Difference hash (dHash) of the image: the image is shrunk to a
+    `hash_size + 1` x `hash_size` grayscale grid and each bit says whether a cell
+    is brighter than its right neighbour. Similar images give hashes with a
+    small Hamming distance.
+  """
+  small = image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS)
+  pixels = small.tobytes()
+
+  bits = 0
+  for row in range(hash_size):
+    for col in range(hash_size):
+      offset = row * (hash_size + 1) + col
+      bits = (bits << 1) | (pixels[offset] > pixels[offset + 1])
+  return f"{bits:0{hash_size * hash_size // 4}x}"
+
+def hamming_distance(hash_a: str, hash_b: str) -> int:
+  return (int(hash_a, 16) ^ int(hash_b, 16)).bit_count()
+
+def nearest_described_hash(model: str, image_hash: str, max_distance: int = VISION_HASH_MAX_DISTANCE) -> str | None:
+  """The hash of an already described screenshot closest to `image_hash`, if within `max_distance` bits."""
+  with _hashes_lock:
+    candidates = [
+      (hamming_distance(image_hash, described_hash), described_hash)
+      for described_model, described_hash in _described_hashes
+      if described_model == model
+    ]
+  distance, nearest = min(candidates, default=(None, None))
+  return nearest if distance is not None and distance <= max_distance else None
+
+def remember_described_hash(model: str, image_hash: str) -> None:
+  with _hashes_lock:
+    _described_hashes[(model, image_hash)] = None
+    _described_hashes.move_to_end((model, image_hash))
+    while len(_described_hashes) > description_cache.max_entries:
+      _described_hashes.popitem(last=False)
+
+def prepare_screenshot(
+  screenshot: bytes,
+  max_width: int = VISION_MAX_WIDTH,
+  max_height: int = VISION_MAX_HEIGHT,
+  quality: int = VISION_JPEG_QUALITY
+) -> tuple[bytes, str]:
+  """
+    Downscales the screenshot to `max_width`, cuts it at `max_height` (the top
+    of a long page is what the agent is looking at) and recompresses it as JPEG.
+    Returns:
+      tuple[bytes, str]: The JPEG bytes and the perceptual hash of the image.
+  """
+  image = Image.open(io.BytesIO(screenshot)).convert("RGB")
+
+  scale = min(1, max_width / image.width)
+  # Cut first so only the part that is sent gets resized.
+  if image.height * scale > max_height:
+    image = image.crop((0, 0, image.width, round(max_height / scale)))
+  if scale < 1:
+    image = image.resize(
+      (max_width, round(image.height * scale)),
+      Image.Resampling.LANCZOS,
+      reducing_gap=3.0
+    )
+
+  output = io.BytesIO()
+  image.save(output, format="JPEG", quality=quality, optimize=True)
+
+  return output.getvalue(), perceptual_hash(image)
+
+async def describe_screenshot(vision_llm: BaseChatModel, screenshot: bytes) -> str:
+  """
+    Describes a page screenshot with the vision model. A screenshot whose
+    perceptual hash is close to one already described gets that description.
+  """
+  try:
+    image, image_hash = await asyncio.to_thread(prepare_screenshot, screenshot)
+
+    model = getattr(vision_llm, "model_name", None) or type(vision_llm).__name__
+    # The exact hash is still looked up when the index is empty, e.g. from the SQLite tier after a restart.
+    described_hash = nearest_described_hash(model, image_hash) or image_hash
+    cached_description = description_cache.get(make_cache_key(model, described_hash))
+    if cached_description is not None:
+      return cached_description
+
+    message = HumanMessage(
+      content=[
+        {"type": "text", "text": DESCRIBE_PROMPT},
+        {
+          "type": "image_url",
+          "image_url": {"url": f"data:image/jpeg;base64,{base64.b64encode(image).decode('utf-8')}"}
+        }
+      ]
+    )
+    async with SCHEDULER.slot("llm"):
+      with Span("vision.llm", "llm") as llm_span:
+        response = await vision_llm.ainvoke([message])
+        llm_span.add_usage(response.usage_metadata)
+    description = response.content
+
+    description_cache.set(make_cache_key(model, image_hash), description)
+    remember_described_hash(model, image_hash)
+    return description
+  except Exception as e:
+    return f"Error tryning to describe the page print. Error: {str(e)}"
@@ -0,0 +1,54 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+import utils.cache
+from benchmarks.fixture_server import serve_fixture_shop
+
+class Clock:
+  """Stands in for time.time; tests move it forward by changing `now`."""
+  def __init__(self):
+    self.now = 1_000_000.0
+
+  def __call__(self) -> float:
+    return self.now
+
+def chromium_available() -> bool:
+  try:
+    from playwright.sync_api import sync_playwright
+    with sync_playwright() as playwright:
+      return os.path.exists(playwright.chromium.executable_path)
+  except Exception:
+    return False
+
+def pytest_configure(config):
+  config.addinivalue_line("markers", "browser: needs Playwright's Chromium, skipped when it isn't installed")
+
+def pytest_collection_modifyitems(config, items):
+  browser_items = [item for item in items if "browser" in item.keywords]
+  if browser_items and not chromium_available():
+    skip = pytest.mark.skip(reason="Playwright's Chromium is not installed")
+    for item in browser_items:
+      item.add_marker(skip)
+
+@pytest.fixture(scope="session")
+def fixture_shop_url():
+  """Base URL of the benchmark fixture shop (20 products) served over HTTP."""
+  with serve_fixture_shop(20) as base_url:
+    yield base_url
+
+@pytest.fixture(autouse=True)
+def logs_in_tmp(tmp_path, monkeypatch):
+  """Loggers write their files under ./logs; keep them out of the repository."""
+  monkeypatch.chdir(tmp_path)
+
+@pytest.fixture
+def clock(monkeypatch):
+  """A Clock driving the expiry of every TTLCache."""
+  clock = Clock()
+  monkeypatch.setattr(utils.cache, "time", clock)
+  return clock
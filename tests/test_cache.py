@@ -0,0 +1,82 @@
+import asyncio
+
+from shopping_agent import web_search
+from utils.cache import CACHES, TTLCache, make_cache_key
+
+def test_cache_key_ignores_dict_order():
+  assert make_cache_key("q", {"num": 10, "lr": "pt"}) == make_cache_key("q", {"lr": "pt", "num": 10})
+  assert make_cache_key("q", {"num": 10}) != make_cache_key("q", {"num": 5})
+
+def test_entries_expire_after_the_ttl(clock):
+  cache = TTLCache("test_ttl", ttl=60)
+  cache.set("a", 1)
+  cache.set("b", 2, ttl=10)
+
+  clock.now += 10
+  assert cache.get("a") == 1
+  assert cache.get("b") is None
+
+  clock.now += 50
+  assert cache.get("a") is None
+  assert cache.stats()["expirations"] == 2
+
+def test_least_recently_used_entry_is_evicted(clock):
+  cache = TTLCache("test_lru", max_entries=2)
+  cache.set("a", 1)
+  cache.set("b", 2)
+  cache.get("a")
+  cache.set("c", 3)
+
+  assert cache.get("b") is None
+  assert cache.get("a") == 1
+  assert cache.get("c") == 3
+  assert cache.stats()["evictions"] == 1
+
+def test_sqlite_tier_survives_a_new_instance(tmp_path, clock):
+  db_path = str(tmp_path / "cache.sqlite")
+  TTLCache("test_sqlite", ttl=60, db_path=db_path).set("a", {"results": [1, 2]})
+
+  cache = TTLCache("test_sqlite", ttl=60, db_path=db_path)
+  assert cache.get("a") == {"results": [1, 2]}
+  assert cache.get("a") == {"results": [1, 2]}
+  assert (cache.stats()["disk_hits"], cache.stats()["memory_hits"]) == (1, 1)
+
+  clock.now += 61
+  assert TTLCache("test_sqlite", ttl=60, db_path=db_path).get("a") is None
+
+def test_stats_report_the_hit_rate(clock):
+  cache = TTLCache("test_stats")
+  cache.set("a", 1)
+  cache.get("a")
+  cache.get("missing")
+
+  stats = cache.stats()
+  assert (stats["memory_hits"], stats["misses"], stats["sets"]) == (1, 1, 1)
+  assert stats["hit_rate"] == 0.5
+  assert CACHES["test_stats"] is cache
+
+class FakeProvider:
+  name = "fake"
+
+  def __init__(self):
+    self.queries = []
+
+  async def search(self, query: str, params: dict) -> list[dict]:
+    self.queries.append(query)
+    return [{"link": "https://loja.example/teclado", "title": query}]
+
+def test_google_search_reuses_results_of_the_same_normalized_query(monkeypatch, clock):
+  provider = FakeProvider()
+  monkeypatch.setattr(web_search, "get_search_provider", lambda: provider)
+  monkeypatch.setattr(web_search, "search_cache", TTLCache("test_search", ttl=60))
+
+  first = asyncio.run(web_search.google_search("Teclado  Mecânico", 10))
+  assert asyncio.run(web_search.google_search("teclado mecânico", 10)) == first
+  assert len(provider.queries) == 1
+
+  asyncio.run(web_search.google_search("teclado mecânico", 5))
+  assert len(provider.queries) == 2
+
+  clock.now += 61
+  asyncio.run(web_search.google_search("teclado mecânico", 10))
+  assert len(provider.queries) == 3
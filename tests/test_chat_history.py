@@ -0,0 +1,59 @@
+import json
+import os
+
+from utils.chat_history import count_messages, iter_messages, stream_chat
+from utils.logger import append_records, get_index_path, rebuild_index
+
+def write_chat(path: str, n_messages: int) -> None:
+  """A chat log with a DEBUG record after every message, the way the agents log."""
+  records = []
+  for i in range(n_messages):
+    records.append((json.dumps({"type": "AGENT", "content": {"type": "AGENT", "content": f"message {i}"}}), True))
+    records.append((json.dumps({"type": "DEBUG", "content": f"debug {i}"}), False))
+  append_records(path, records)
+
+def contents(messages) -> list[str]:
+  return [message["content"] for message in messages]
+
+def test_pages_skip_internal_records(tmp_path):
+  log_path = str(tmp_path / "chat.json")
+  write_chat(log_path, 25)
+
+  assert count_messages(log_path) == 25
+  assert contents(iter_messages(log_path, 0, 10)) == [f"message {i}" for i in range(10)]
+  assert contents(iter_messages(log_path, 20, 10)) == [f"message {i}" for i in range(20, 25)]
+  assert contents(iter_messages(log_path, 30, 10)) == []
+
+def test_index_is_rebuilt_for_logs_without_one(tmp_path):
+  log_path = str(tmp_path / "chat.json")
+  write_chat(log_path, 5)
+  with open(get_index_path(log_path), "rb") as index_file:
+    written_index = index_file.read()
+
+  os.remove(get_index_path(log_path))
+  assert contents(iter_messages(log_path, 3)) == ["message 3", "message 4"]
+
+  rebuild_index(log_path)
+  with open(get_index_path(log_path), "rb") as index_file:
+    assert index_file.read() == written_index
+
+def test_appending_to_a_log_without_index_keeps_earlier_records(tmp_path):
+  log_path = str(tmp_path / "chat.json")
+  write_chat(log_path, 3)
+  os.remove(get_index_path(log_path))
+
+  write_chat(log_path, 2)
+
+  assert contents(iter_messages(log_path)) == ["message 0", "message 1", "message 2", "message 0", "message 1"]
+
+def test_stream_chat_returns_a_page_with_its_next_offset(tmp_path):
+  os.makedirs("logs")
+  write_chat(os.path.join("logs", "chat-1.json"), 12)
+
+  page = json.loads("".join(stream_chat("chat-1", "Mouse", offset=5, limit=5)))
+  last_page = json.loads("".join(stream_chat("chat-1", "Mouse", offset=10, limit=5)))
+
+  assert (page["total"], page["next_offset"]) == (12, 10)
+  assert contents(page["messages"]) == [f"message {i}" for i in range(5, 10)]
+  assert last_page["next_offset"] is None
+  assert contents(last_page["messages"]) == ["message 10", "message 11"]
@@ -0,0 +1,37 @@
+import json
+import os
+from uuid import uuid4
+
+import pytest
+
+from utils.chat_store import MemoryChatStore, SqliteChatStore, is_chat_log
+
+def write_log(file_name: str, records: list[dict]) -> None:
+  with open(os.path.join("logs", file_name), "w", encoding="utf-8") as log_file:
+    log_file.writelines(json.dumps(record) + "\n" for record in records)
+
+@pytest.fixture
+def store(request, tmp_path):
+  if request.param == "sqlite":
+    return SqliteChatStore(str(tmp_path / "chats.sqlite"))
+  return MemoryChatStore()
+
+def test_is_chat_log():
+  chat_id = str(uuid4())
+
+  assert is_chat_log(f"{chat_id}.json")
+  assert not is_chat_log(f"{chat_id}.idx")
+  assert not is_chat_log(f"www.loja.com.br_scrap{chat_id}.json")
+  assert not is_chat_log("benchmark-e2e.json")
+
+@pytest.mark.parametrize("store", ["memory", "sqlite"], indirect=True)
+def test_rehydrate_all_registers_only_chat_logs(store):
+  os.makedirs("logs")
+  chat_id = str(uuid4())
+  write_log(f"{chat_id}.json", [{"type": "USER", "content": {"type": "USER", "content": "mouse sem fio"}}])
+  write_log(f"www.loja.com.br_scrap{uuid4()}.json", [{"type": "SITE", "content": {"site": "https://www.loja.com.br"}}])
+  write_log("benchmark-e2e.json", [{"type": "DEBUG", "content": "..."}])
+
+  assert store.rehydrate_all() == 1
+  assert [chat["id"] for chat in store.list()] == [chat_id]
+  assert store.get(chat_id)["name"] == "mouse sem fio"
@@ -0,0 +1,70 @@
+import asyncio
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from scrapping_agent.http_scrapper import HttpScrapper
+from utils.compaction import compact_messages, make_compaction_node
+from utils.http import close_http_client
+
+class FakeLogger:
+  def debug(self, *args, **kwargs):
+    pass
+
+class FakeScrapper:
+  def __init__(self):
+    self.forgotten = 0
+
+  def forget_summary(self):
+    self.forgotten += 1
+
+def tool_exchange(name: str, content: str, index: int) -> list:
+  call_id = f"call_{index}"
+  return [
+    AIMessage(content="", tool_calls=[{"id": call_id, "name": name, "args": {}}]),
+    ToolMessage(content=content, tool_call_id=call_id, name=name, id=f"tool_{index}")
+  ]
+
+def conversation(*names: str) -> list:
+  messages = [HumanMessage("Site: https://loja.exemplo\nQuery: mouse")]
+  for index, name in enumerate(names):
+    messages += tool_exchange(name, "Element: p Text: produto " * 400, index)
+  return messages
+
+def test_compacts_oldest_tool_outputs_until_under_budget():
+  messages = conversation("extract_elements", "page_summary", "page_summary")
+
+  compacted, trimmed_tokens = compact_messages(messages, max_tokens=5000, keep_recent=1, excerpt_tokens=50)
+
+  assert [message.id for message in compacted] == ["tool_0", "tool_1"]
+  assert trimmed_tokens > 0
+  assert compacted[0].content.endswith("Call the tool again if you need it.]")
+  assert compacted[1].content.endswith("Call page_summary with full=true if you need it.]")
+
+def test_compacting_a_page_summary_resets_the_summary_snapshot():
+  scrapper = FakeScrapper()
+  config = {"configurable": {"run": {"logger": FakeLogger(), "scrapper": scrapper}}}
+
+  node = make_compaction_node(max_tokens=5000, keep_recent=1, excerpt_tokens=50)
+  asyncio.run(node({"messages": conversation("extract_elements", "extract_elements")}, config))
+  assert scrapper.forgotten == 0
+
+  asyncio.run(node({"messages": conversation("page_summary", "extract_elements")}, config))
+  assert scrapper.forgotten == 1
+
+def test_page_summary_is_full_again_after_forget_summary(fixture_shop_url):
+  async def run():
+    scrapper = HttpScrapper()
+    await scrapper.initialize(fixture_shop_url + "/")
+    try:
+      first = await scrapper.page_summary()
+      repeated = await scrapper.page_summary()
+      scrapper.forget_summary()
+      return first, repeated, await scrapper.page_summary()
+    finally:
+      await scrapper.close()
+      await close_http_client()
+
+  first, repeated, after_forget = asyncio.run(run())
+
+  assert "No changes since the previous page_summary." in repeated
+  assert after_forget == first
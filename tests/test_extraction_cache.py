@@ -0,0 +1,135 @@
+import asyncio
+
+import httpx
+import pytest
+
+from scrapping_agent.http_scrapper import TieredScrapper
+from shopping_agent import extraction_cache
+from shopping_agent.extraction_cache import (
+  FRESH_FOR, MAX_STALE, extraction_cache as cache, get_cached_extraction, store_extraction
+)
+from utils.http import close_http_client, get_http_client, hash_page_content
+
+URL = "https://loja.example/teclado"
+PAGE = "<html><body><h1>Teclado</h1><p>R$ 199,90</p></body></html>"
+
+class FakeSite:
+  """Answers every request with `status`, `headers` and `html`, recording the requests."""
+  def __init__(self, status: int = 200, headers: dict = None, html: str = PAGE):
+    self.status = status
+    self.headers = headers or {}
+    self.html = html
+    self.requests: list[httpx.Request] = []
+
+  def __call__(self, request: httpx.Request) -> httpx.Response:
+    self.requests.append(request)
+    return httpx.Response(self.status, headers=self.headers, text=self.html)
+
+@pytest.fixture
+def site(monkeypatch, clock):
+  monkeypatch.setattr(extraction_cache, "time", clock)
+  site = FakeSite()
+  client = httpx.AsyncClient(transport=httpx.MockTransport(site))
+  monkeypatch.setattr(extraction_cache, "get_http_client", lambda: client)
+  cache.clear()
+  yield site
+  cache.clear()
+
+def store(validators: dict = None, query: str = "teclado mecânico"):
+  asyncio.run(store_extraction(URL, query, "Teclado: R$ 199,90", validators))
+
+def lookup(query: str = "teclado mecânico"):
+  return asyncio.run(get_cached_extraction(URL, query))
+
+def test_store_uses_the_scrapper_validators_without_a_request(site, clock):
+  store({"etag": '"v1"', "last_modified": None, "content_hash": hash_page_content(PAGE)})
+
+  assert site.requests == []
+  assert lookup()["etag"] == '"v1"'
+
+def test_store_without_validators_only_asks_for_the_headers(site, clock):
+  site.headers = {"ETag": '"v1"', "Last-Modified": "Mon, 12 Oct 2026 10:00:00 GMT"}
+  store()
+
+  assert [request.method for request in site.requests] == ["HEAD"]
+  entry = lookup()
+  assert entry["etag"] == '"v1"'
+  assert entry["last_modified"] == "Mon, 12 Oct 2026 10:00:00 GMT"
+  assert entry["content_hash"] is None
+
+def test_similar_queries_share_the_entry(site, clock):
+  store({"etag": '"v1"'}, query="Teclado Mecânico!")
+
+  assert lookup("mecanico teclado")["content"] == "Teclado: R$ 199,90"
+
+def test_fresh_entry_is_served_without_revalidating(site, clock):
+  store({"etag": '"v1"'})
+  clock.now += FRESH_FOR
+
+  entry = lookup()
+  assert entry["revalidated"] is False
+  assert site.requests == []
+
+def test_stale_entry_is_revalidated_with_a_conditional_request(site, clock):
+  store({"etag": '"v1"', "last_modified": "Mon, 12 Oct 2026 10:00:00 GMT"})
+  clock.now += FRESH_FOR + 1
+  site.status = 304
+
+  entry = lookup()
+  assert entry["revalidated"] is True
+  assert entry["validated_at"] == clock.now
+  assert site.requests[0].headers["If-None-Match"] == '"v1"'
+  assert site.requests[0].headers["If-Modified-Since"] == "Mon, 12 Oct 2026 10:00:00 GMT"
+
+  # Revalidating made it fresh again.
+  assert lookup()["revalidated"] is False
+  assert len(site.requests) == 1
+
+def test_stale_entry_without_validators_is_revalidated_by_content(site, clock):
+  store({"content_hash": hash_page_content(PAGE)})
+  clock.now += FRESH_FOR + 1
+  # Same visible text, different markup and scripts.
+  site.html = "<html><head><script>var t = 1</script></head><body><h1>Teclado</h1>\n<p>R$ 199,90</p></body></html>"
+
+  assert lookup()["revalidated"] is True
+
+def test_changed_page_drops_the_entry(site, clock):
+  store({"etag": '"v1"', "content_hash": hash_page_content(PAGE)})
+  clock.now += FRESH_FOR + 1
+  site.headers = {"ETag": '"v2"'}
+  site.html = PAGE.replace("199,90", "149,90")
+
+  assert lookup() is None
+  site.status = 304
+  assert lookup() is None
+  assert len(site.requests) == 1
+
+def test_failed_revalidation_is_a_miss(site, clock):
+  store({"etag": '"v1"'})
+  clock.now += FRESH_FOR + 1
+  site.status = 500
+
+  assert lookup() is None
+
+def test_entry_expires_after_max_stale(site, clock):
+  store({"etag": '"v1"'})
+  clock.now += MAX_STALE + 1
+
+  assert lookup() is None
+  assert site.requests == []
+
+def test_http_scrapper_validators_match_a_fresh_fetch(fixture_shop_url):
+  async def run():
+    scrapper = TieredScrapper()
+    try:
+      await scrapper.initialize(fixture_shop_url + "/")
+      validators = scrapper.page_validators()
+      response = await get_http_client().get(fixture_shop_url + "/")
+    finally:
+      await scrapper.close()
+      await close_http_client()
+    return validators, response
+
+  validators, response = asyncio.run(run())
+  assert validators["content_hash"] == hash_page_content(response.text)
+  assert validators["last_modified"] == response.headers.get("last-modified")
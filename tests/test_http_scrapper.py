@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+from selectolax.lexbor import LexborHTMLParser
+
+from scrapping_agent.browser_pool import close_browser_pools
+from scrapping_agent.http_scrapper import HttpScrapper, serialize_tree
+from scrapping_agent.scrapper import INTERACTION_ELEMENTS_SELECTOR, Scrapper, TEXT_ELEMENTS_SELECTOR
+from utils.http import close_http_client
+
+def test_serialize_tree_returns_matches_in_document_order():
+  # lexbor returns `li a` matches after the `a` ones, and the first link twice.
+  tree = LexborHTMLParser(
+    '<p>One</p><ul><li><a href="/a">Link</a></li></ul><span>Two</span><a href="/b">Other</a>'
+  )
+
+  assert serialize_tree(tree, "a, span, li a", trunc=True, limit=50, compact=False) == [
+    "Element: a Text: Link Href: /a",
+    "Element: span Text: Two",
+    "Element: a Text: Other Href: /b"
+  ]
+
+def test_serialize_tree_counts_runs_in_document_order():
+  tree = LexborHTMLParser("<h1>Title</h1><ul><li>A</li><li>B</li></ul><p>End</p><ul><li>C</li></ul>")
+
+  assert serialize_tree(tree, "li, p, h1", trunc=True, limit=50, compact=True) == [
+    "Element: h1 Text: Title",
+    "Element: li Text: A Count: 2",
+    "Element: p Text: End",
+    "Element: li Text: C"
+  ]
+
+async def scrape(make_scrapper, url: str) -> dict:
+  scrapper = make_scrapper()
+  await scrapper.initialize(url)
+  try:
+    return {
+      "page_summary": await scrapper.page_summary(full=True),
+      "text_elements": await scrapper.extract_elements(TEXT_ELEMENTS_SELECTOR, True, 500, True),
+      "interaction_elements": await scrapper.extract_elements(INTERACTION_ELEMENTS_SELECTOR, True, 500, False)
+    }
+  finally:
+    await scrapper.close()
+
+@pytest.mark.browser
+@pytest.mark.parametrize("path", ["/", "/produto/produto-1"])
+def test_http_path_matches_browser_path(fixture_shop_url, path):
+  async def run():
+    try:
+      return await scrape(HttpScrapper, fixture_shop_url + path), await scrape(Scrapper, fixture_shop_url + path)
+    finally:
+      await close_browser_pools()
+      await close_http_client()
+
+  http_output, browser_output = asyncio.run(run())
+
+  assert http_output == browser_output
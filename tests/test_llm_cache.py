@@ -0,0 +1,175 @@
+import asyncio
+
+import pytest
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from pydantic import Field
+
+from utils import llm_cache
+from utils.llm_cache import (
+  cached_tokens, invoke_llm, llm_cache_metrics, message_key, model_key, parse_node_ttls
+)
+
+SEARCH_TOOL = {"type": "function", "function": {"name": "web_search", "parameters": {"type": "object"}}}
+
+class FakeChatModel(BaseChatModel):
+  """Answers with `responses` in turn and counts the calls that reached it."""
+  model_name: str = "fake-model"
+  responses: list = Field(default_factory=list)
+  calls: int = 0
+
+  @property
+  def _llm_type(self) -> str:
+    return "fake"
+
+  def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+    self.calls += 1
+    message = self.responses[(self.calls - 1) % len(self.responses)]
+    return ChatResult(generations=[ChatGeneration(message=message)])
+
+def answer(content: str = "", tool_calls: list = None, total_tokens: int = 100) -> AIMessage:
+  return AIMessage(
+    content=content,
+    tool_calls=tool_calls or [],
+    usage_metadata={"input_tokens": total_tokens - 10, "output_tokens": 10, "total_tokens": total_tokens}
+  )
+
+def prompt(system: str = "Você é um assistente de compras.") -> ChatPromptTemplate:
+  return ChatPromptTemplate.from_messages([("system", system), MessagesPlaceholder("messages")])
+
+@pytest.fixture
+def cache_on(monkeypatch, clock):
+  monkeypatch.setattr(llm_cache, "LLM_CACHE", True)
+  monkeypatch.setattr(llm_cache, "NODE_TTLS", {"receptionist": 86400, "analyst": 3600, "researcher": 0})
+  monkeypatch.setattr(llm_cache, "_node_stats", {})
+  llm_cache.llm_cache.clear()
+  yield clock
+  llm_cache.llm_cache.clear()
+
+def invoke(node: str, llm, messages: list, template: ChatPromptTemplate = None) -> AIMessage:
+  return asyncio.run(invoke_llm(node, template or prompt(), llm, {"messages": messages}))
+
+def test_parse_node_ttls():
+  assert parse_node_ttls("receptionist=86400, researcher=0,,bad") == {"receptionist": 86400.0, "researcher": 0.0}
+
+def test_model_key_covers_the_model_and_the_bound_tools():
+  model = FakeChatModel()
+
+  assert model_key(model) == model_key(FakeChatModel())
+  assert model_key(model) != model_key(FakeChatModel(model_name="other-model"))
+  assert model_key(model.bind(tools=[SEARCH_TOOL])) == model_key(FakeChatModel().bind(tools=[SEARCH_TOOL]))
+  assert model_key(model.bind(tools=[SEARCH_TOOL])) != model_key(model)
+
+def test_message_key_ignores_ids():
+  first = AIMessage(content="", id="run-1", tool_calls=[{"id": "call_1", "name": "web_search", "args": {"query": "mouse"}}])
+  second = AIMessage(content="", id="run-2", tool_calls=[{"id": "call_2", "name": "web_search", "args": {"query": "mouse"}}])
+  other_args = AIMessage(content="", tool_calls=[{"id": "call_1", "name": "web_search", "args": {"query": "teclado"}}])
+
+  assert message_key(first) == message_key(second)
+  assert message_key(first) != message_key(other_args)
+  assert message_key(ToolMessage("ok", tool_call_id="call_1")) == message_key(ToolMessage("ok", tool_call_id="call_2"))
+
+def test_identical_calls_are_answered_from_the_cache(cache_on):
+  llm = FakeChatModel(responses=[answer("Olá! O que você procura?")])
+
+  first = invoke("receptionist", llm, [HumanMessage("oi", id="1")])
+  second = invoke("receptionist", llm, [HumanMessage("oi", id="2")])
+
+  assert llm.calls == 1
+  assert second.content == first.content
+  assert second.response_metadata["llm_cache"] == "hit"
+
+def test_prompt_messages_model_and_tools_are_part_of_the_key(cache_on):
+  llm = FakeChatModel(responses=[answer("resposta")])
+  messages = [HumanMessage("oi")]
+
+  invoke("receptionist", llm, messages)
+  invoke("receptionist", llm, messages, prompt("Você é um analista."))
+  invoke("receptionist", llm, [HumanMessage("olá")])
+  invoke("receptionist", llm.bind(tools=[SEARCH_TOOL]), messages)
+  other_model = FakeChatModel(model_name="other-model", responses=[answer("resposta")])
+  invoke("receptionist", other_model, messages)
+
+  assert (llm.calls, other_model.calls) == (4, 1)
+
+def test_replayed_tool_calls_match_with_new_ids(cache_on):
+  tool_calls = [
+    {"id": "call_a", "name": "web_search", "args": {"query": "mouse sem fio", "num_results": 5}},
+    {"id": "call_b", "name": "save_relevant_data", "args": {"data": "Mouse X: R$ 99,90"}}
+  ]
+  llm = FakeChatModel(responses=[answer("", tool_calls, total_tokens=250)])
+
+  recorded = invoke("analyst", llm, [HumanMessage("mouse")])
+  first = invoke("analyst", llm, [HumanMessage("mouse")])
+  second = invoke("analyst", llm, [HumanMessage("mouse")])
+
+  assert llm.calls == 1
+  for replayed in (first, second):
+    assert [(tc["name"], tc["args"]) for tc in replayed.tool_calls] == [(tc["name"], tc["args"]) for tc in recorded.tool_calls]
+    assert replayed.usage_metadata["total_tokens"] == 0
+    assert replayed.response_metadata["saved_tokens"] == 250
+  ids = {tc["id"] for message in (recorded, first, second) for tc in message.tool_calls}
+  assert len(ids) == 6
+
+def test_answers_expire_with_the_node_ttl(cache_on):
+  llm = FakeChatModel(responses=[answer("resposta")])
+  messages = [HumanMessage("oi")]
+
+  invoke("analyst", llm, messages)
+  invoke("receptionist", llm, messages)
+  cache_on.now += 3601
+  invoke("analyst", llm, messages)
+  invoke("receptionist", llm, messages)
+
+  # The analyst answer expired after an hour, the receptionist one is kept for a day.
+  assert llm.calls == 3
+
+def test_nodes_with_ttl_zero_bypass_the_cache(cache_on):
+  llm = FakeChatModel(responses=[answer("resposta")])
+
+  invoke("researcher", llm, [HumanMessage("oi")])
+  invoke("researcher", llm, [HumanMessage("oi")])
+
+  assert llm.calls == 2
+  assert "researcher" not in llm_cache_metrics()["nodes"]
+
+def test_cache_off_bypasses_every_node(cache_on, monkeypatch):
+  monkeypatch.setattr(llm_cache, "LLM_CACHE", False)
+  llm = FakeChatModel(responses=[answer("resposta")])
+
+  invoke("receptionist", llm, [HumanMessage("oi")])
+  invoke("receptionist", llm, [HumanMessage("oi")])
+
+  assert llm.calls == 2
+
+def test_empty_and_invalid_answers_are_not_cached(cache_on):
+  invalid = AIMessage(content="", invalid_tool_calls=[{"id": "call_1", "name": "web_search", "args": "{", "error": "bad json"}])
+  llm = FakeChatModel(responses=[AIMessage(content=""), invalid])
+
+  invoke("analyst", llm, [HumanMessage("oi")])
+  invoke("analyst", llm, [HumanMessage("oi")])
+  invoke("analyst", llm, [HumanMessage("oi")])
+
+  assert llm.calls == 3
+
+def test_metrics_report_hits_and_saved_tokens(cache_on):
+  llm = FakeChatModel(responses=[answer("resposta", total_tokens=120)])
+
+  messages = [
+    invoke("receptionist", llm, [HumanMessage("oi")]),
+    invoke("receptionist", llm, [HumanMessage("oi")]),
+    invoke("receptionist", llm, [HumanMessage("oi")]),
+    invoke("analyst", llm, [HumanMessage("oi")])
+  ]
+
+  metrics = llm_cache_metrics()
+  assert metrics["enabled"] is True
+  assert metrics["nodes"] == {
+    "receptionist": {"hits": 2, "misses": 1, "saved_tokens": 240},
+    "analyst": {"hits": 0, "misses": 1, "saved_tokens": 0}
+  }
+  assert metrics["hit_rate"] == 0.5
+  assert metrics["saved_tokens"] == 240
+  assert cached_tokens(messages + [HumanMessage("oi")]) == 240
@@ -0,0 +1,51 @@
+import asyncio
+import json
+import os
+from datetime import date
+
+from utils.chat_history import iter_messages
+from utils.logger import LOGS_DIR, Logger
+
+def read_records(logger: Logger) -> list[dict]:
+  logger.flush()
+  with open(os.path.join(LOGS_DIR, logger.get_log_file())) as log_file:
+    return [json.loads(line) for line in log_file]
+
+def log_chat(logger: Logger) -> None:
+  logger.info({"type": "AGENT", "content": "Olá"})
+  logger.debug("TOOLS 🛠️ -> page_summary")
+  logger.span({"name": "navigator.llm", "duration_ms": 12.5})
+
+def test_buffered_and_sync_logs_write_the_same_records():
+  os.makedirs(LOGS_DIR, exist_ok=True)
+  buffered = Logger(logger_id="buffered", buffered=True)
+  sync = Logger(logger_id="sync", buffered=False)
+  log_chat(buffered)
+  log_chat(sync)
+
+  def without_time_and_id(records):
+    return [{key: value for key, value in record.items() if key not in ("time", "id")} for record in records]
+
+  buffered_records = read_records(buffered)
+  assert without_time_and_id(buffered_records) == without_time_and_id(read_records(sync))
+  assert [record["type"] for record in buffered_records] == ["INFO", "DEBUG", "SPAN"]
+  assert list(iter_messages(os.path.join(LOGS_DIR, buffered.get_log_file()))) == [{"type": "AGENT", "content": "Olá"}]
+
+def test_info_streams_the_written_line():
+  os.makedirs(LOGS_DIR, exist_ok=True)
+  logger = Logger(logger_id="stream")
+
+  async def run():
+    logger.info({"type": "AGENT", "content": "Olá"})
+    return await logger.LOGS_QUEUE.get()
+
+  streamed = asyncio.run(run())
+  assert json.loads(streamed) == read_records(logger)[0]
+
+def test_records_that_are_not_json_are_written_as_text():
+  os.makedirs(LOGS_DIR, exist_ok=True)
+  logger = Logger(logger_id="not-json")
+  logger.debug({"day": date(2026, 10, 18)})
+  logger.debug("still logging")
+
+  assert [record["content"] for record in read_records(logger)] == [{"day": "2026-10-18"}, "still logging"]
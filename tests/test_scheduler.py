@@ -0,0 +1,171 @@
+import asyncio
+
+from utils.scheduler import BACKGROUND, INTERACTIVE, FairLimiter, Scheduler, current_job, job
+
+async def settle():
+  """Lets every ready task run until it blocks again."""
+  for _ in range(5):
+    await asyncio.sleep(0)
+
+async def queue_waiters(limiter: FairLimiter, waiters: list[tuple[str, int]], granted: list[str]) -> list[asyncio.Task]:
+  """Queues one acquire per (owner, priority), in order, recording the owners as they get a slot."""
+  async def wait(owner: str, priority: int):
+    await limiter.acquire(owner, priority)
+    granted.append(owner)
+
+  tasks = []
+  for owner, priority in waiters:
+    tasks.append(asyncio.create_task(wait(owner, priority)))
+    await settle()
+  return tasks
+
+async def grant_all(limiter: FairLimiter, tasks: list[asyncio.Task]) -> None:
+  for _ in tasks:
+    limiter.release()
+    await settle()
+  await asyncio.gather(*tasks, return_exceptions=True)
+
+def test_free_slots_are_taken_without_waiting():
+  async def run():
+    limiter = FairLimiter("test", 2)
+    await limiter.acquire("a")
+    await limiter.acquire("b")
+    return limiter.metrics()
+
+  metrics = asyncio.run(run())
+  assert (metrics["in_use"], metrics["acquired"], metrics["waited"]) == (2, 2, 0)
+
+def test_owners_take_turns():
+  async def run():
+    limiter = FairLimiter("test", 1)
+    await limiter.acquire("holder")
+    granted = []
+    tasks = await queue_waiters(limiter, [("a", BACKGROUND)] * 3 + [("b", BACKGROUND), ("c", BACKGROUND)], granted)
+    await grant_all(limiter, tasks)
+    return granted
+
+  assert asyncio.run(run()) == ["a", "b", "c", "a", "a"]
+
+def test_interactive_work_goes_before_background_work():
+  async def run():
+    limiter = FairLimiter("test", 1)
+    await limiter.acquire("holder")
+    granted = []
+    tasks = await queue_waiters(
+      limiter, [("scrape", BACKGROUND), ("scrape", BACKGROUND), ("chat", INTERACTIVE)], granted
+    )
+    await grant_all(limiter, tasks)
+    return granted
+
+  assert asyncio.run(run()) == ["chat", "scrape", "scrape"]
+
+def test_new_work_queues_behind_waiters():
+  async def run():
+    limiter = FairLimiter("test", 1)
+    await limiter.acquire("holder")
+    granted = []
+    tasks = await queue_waiters(limiter, [("a", BACKGROUND)], granted)
+
+    # A slot freed while someone waits goes to the waiter, not to a newcomer.
+    limiter.release()
+    tasks += await queue_waiters(limiter, [("b", BACKGROUND)], granted)
+    await settle()
+    granted_before_release = list(granted)
+
+    await grant_all(limiter, tasks[1:])
+    return granted_before_release, granted
+
+  assert asyncio.run(run()) == (["a"], ["a", "b"])
+
+def test_cancelled_waiter_leaves_the_queue():
+  async def run():
+    limiter = FairLimiter("test", 1)
+    await limiter.acquire("holder")
+    granted = []
+    cancelled, waiting = await queue_waiters(limiter, [("a", BACKGROUND), ("b", BACKGROUND)], granted)
+
+    cancelled.cancel()
+    await settle()
+    queued_after_cancel = limiter.queued()
+
+    limiter.release()
+    await settle()
+    limiter.release()
+    await settle()
+    return queued_after_cancel, granted, limiter.in_use, limiter.queued()
+
+  assert asyncio.run(run()) == (1, ["b"], 0, 0)
+
+def test_slot_handed_to_a_cancelled_waiter_is_passed_on():
+  async def run():
+    limiter = FairLimiter("test", 1)
+    await limiter.acquire("holder")
+    granted = []
+    cancelled, waiting = await queue_waiters(limiter, [("a", BACKGROUND), ("b", BACKGROUND)], granted)
+
+    # The slot goes to "a", which is cancelled before it gets to run.
+    limiter.release()
+    cancelled.cancel()
+    await settle()
+    in_use_after_handover = limiter.in_use
+
+    limiter.release()
+    await settle()
+    return cancelled.cancelled(), granted, in_use_after_handover, limiter.in_use
+
+  assert asyncio.run(run()) == (True, ["b"], 1, 0)
+
+def test_metrics_report_queue_depth_and_waits():
+  async def run():
+    limiter = FairLimiter("test", 1)
+    await limiter.acquire("holder")
+    granted = []
+    tasks = await queue_waiters(
+      limiter, [("a", INTERACTIVE), ("b", BACKGROUND), ("b", BACKGROUND)], granted
+    )
+    queued = limiter.metrics()
+
+    await asyncio.sleep(0.02)
+    await grant_all(limiter, tasks)
+    return queued, limiter.metrics()
+
+  queued, done = asyncio.run(run())
+  assert queued["queued"] == 3
+  assert queued["queued_by_priority"] == {"interactive": 1, "background": 2}
+  assert queued["owners_waiting"] == 2
+
+  assert (done["queued"], done["acquired"], done["waited"]) == (0, 4, 3)
+  assert done["max_wait"] >= 0.02
+  assert 0 < done["avg_wait"] <= done["max_wait"]
+
+def test_scheduler_queues_work_under_the_current_job():
+  async def run():
+    scheduler = Scheduler(browser_slots=1, llm_slots=1, search_slots=1)
+    limiter = scheduler.limiters["llm"]
+    granted = []
+
+    async def call_llm():
+      async with scheduler.slot("llm"):
+        granted.append(current_job()[0])
+        await settle()
+
+    await limiter.acquire("holder")
+    tasks = []
+    for owner in ("chat-1", "chat-1", "chat-2"):
+      with job(owner, INTERACTIVE):
+        tasks.append(asyncio.create_task(call_llm()))
+    await settle()
+    owners_waiting = limiter.metrics()["owners_waiting"]
+
+    limiter.release()
+    await asyncio.gather(*tasks)
+    return owners_waiting, granted, limiter.in_use
+
+  assert asyncio.run(run()) == (2, ["chat-1", "chat-2", "chat-1"], 0)
+
+def test_job_restores_the_previous_job():
+  with job("chat-1", INTERACTIVE):
+    with job("chat-2", BACKGROUND):
+      assert current_job() == ("chat-2", BACKGROUND)
+    assert current_job() == ("chat-1", INTERACTIVE)
+  assert current_job() == ("default", BACKGROUND)
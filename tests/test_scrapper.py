@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from benchmarks.fixture_shop import catalog_page
+from scrapping_agent.browser_pool import close_browser_pools
+from scrapping_agent.scrapper import INTERACTION_ELEMENTS_SELECTOR, Scrapper, TEXT_ELEMENTS_SELECTOR
+
+EDGE_CASES_PAGE = """
+<h1 class="  title  main ">  Teclado
+  Mecânico  </h1>
+<p>Um texto bem longo que passa dos cinquenta caracteres para ser truncado no meio</p>
+<ul><li>Igual</li><li>Igual</li><li>Igual</li><li>Outro</li><li>Igual</li></ul>
+<a>Sem href</a><a href="/a"></a>
+<input><input name="q" placeholder="Buscar"><button class="btn"> Comprar </button>
+"""
+
+@pytest.mark.browser
+def test_print_page_full_rendering_keeps_the_page_state(fixture_shop_url):
+  async def run():
+    scrapper = Scrapper()
+    await scrapper.initialize(fixture_shop_url + "/")
+    try:
+      await scrapper.interact_with_element("input#q", "fill", "mouse")
+      loads = len(scrapper.page_loads)
+
+      screenshot = await scrapper.print_page(full_rendering=True)
+
+      return screenshot, loads, len(scrapper.page_loads), await scrapper.page.input_value("input#q")
+    finally:
+      await scrapper.close()
+      await close_browser_pools()
+
+  screenshot, loads_before, loads_after, search_text = asyncio.run(run())
+
+  assert isinstance(screenshot, bytes)
+  assert loads_after == loads_before
+  assert search_text == "mouse"
+
+@pytest.mark.browser
+def test_bulk_serialization_matches_the_per_element_path():
+  cases = [
+    (selector, trunc, limit, compact)
+    for selector in (TEXT_ELEMENTS_SELECTOR, INTERACTION_ELEMENTS_SELECTOR, "li, h1")
+    for trunc in (True, False)
+    for limit in (3, 500)
+    for compact in (True, False)
+  ]
+
+  async def run():
+    scrapper = Scrapper()
+    await scrapper.initialize("about:blank")
+    outputs = []
+    try:
+      for page in (catalog_page(30), EDGE_CASES_PAGE):
+        await scrapper.page.set_content(page)
+        for selector, trunc, limit, compact in cases:
+          outputs.append((
+            (selector, trunc, limit, compact),
+            await scrapper.extract_elements(selector, trunc, limit, compact, bulk=True),
+            await scrapper.extract_elements(selector, trunc, limit, compact, bulk=False)
+          ))
+      return outputs
+    finally:
+      await scrapper.close()
+      await close_browser_pools()
+
+  for case, bulk_output, per_element_output in asyncio.run(run()):
+    assert bulk_output == per_element_output, case
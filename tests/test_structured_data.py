@@ -0,0 +1,150 @@
+import json
+
+import pytest
+
+from scrapping_agent.structured_data import (
+  answering_products, extract_structured_products, parse_price
+)
+
+BASE_URL = "https://loja.example/produto/teclado"
+
+@pytest.mark.parametrize("value, price", [
+  ("R$ 1.299", 1299.0),
+  ("R$ 12.345.678", 12345678.0),
+  ("R$ 1.234,56", 1234.56),
+  ("R$ 12.345.678,90", 12345678.9),
+  ("199,90", 199.9),
+  ("R$ 99", 99.0),
+  ("1299.90", 1299.9),
+  ("1,299.90", 1299.9),
+  ("4.5", 4.5),
+  ("R$ 1.299,00.", 1299.0),
+  (1299, 1299.0),
+  (199.9, 199.9),
+  ("", None),
+  ("sob consulta", None),
+  (None, None)
+])
+def test_parse_price(value, price):
+  assert parse_price(value) == price
+
+def page(head: str = "", body: str = "") -> str:
+  return f"<html><head>{head}</head><body>{body}</body></html>"
+
+def json_ld(data) -> str:
+  return f'<script type="application/ld+json">{json.dumps(data)}</script>'
+
+def test_json_ld_product():
+  html = page(head=json_ld({
+    "@context": "https://schema.org",
+    "@graph": [
+      {"@type": "WebPage", "name": "Loja"},
+      {
+        "@type": "Product",
+        "name": "Teclado Mecânico K1",
+        "brand": {"@type": "Brand", "name": "Keychron"},
+        "sku": "K1-BR",
+        "image": ["/img/k1.jpg"],
+        "offers": {
+          "@type": "Offer",
+          "price": "1299.90",
+          "priceCurrency": "BRL",
+          "availability": "https://schema.org/InStock"
+        },
+        "aggregateRating": {"ratingValue": "4.7", "reviewCount": "1.234"}
+      }
+    ]
+  }))
+
+  [product] = extract_structured_products(html, BASE_URL)
+  assert product["name"] == "Teclado Mecânico K1"
+  assert product["brand"] == "Keychron"
+  assert product["sku"] == "K1-BR"
+  assert product["image"] == "https://loja.example/img/k1.jpg"
+  assert product["url"] == BASE_URL
+  assert (product["price"], product["currency"]) == (1299.9, "BRL")
+  assert (product["availability"], product["in_stock"]) == ("InStock", True)
+  assert (product["rating"], product["review_count"]) == (4.7, 1234)
+  assert product["source"] == "json-ld"
+
+def test_json_ld_aggregate_offer_uses_the_lowest_price():
+  html = page(head=json_ld({
+    "@type": "Product",
+    "name": "Mouse Gamer",
+    "offers": {"@type": "AggregateOffer", "lowPrice": 149.9, "highPrice": 199.9, "priceCurrency": "BRL"}
+  }))
+
+  [product] = extract_structured_products(html, BASE_URL)
+  assert product["price"] == 149.9
+
+def test_invalid_json_ld_is_skipped():
+  html = page(head='<script type="application/ld+json">{"@type": "Product",</script>')
+
+  assert extract_structured_products(html, BASE_URL) == []
+
+def test_microdata_product():
+  html = page(body="""
+    <div itemscope itemtype="https://schema.org/Product">
+      <h1 itemprop="name">Monitor 27" UltraWide</h1>
+      <span itemprop="brand" itemscope itemtype="https://schema.org/Brand">
+        <span itemprop="name">LG</span>
+      </span>
+      <a itemprop="url" href="/produto/monitor">ver</a>
+      <div itemprop="offers" itemscope itemtype="https://schema.org/Offer">
+        <span itemprop="price">R$ 1.299</span>
+        <meta itemprop="priceCurrency" content="BRL">
+        <link itemprop="availability" href="https://schema.org/OutOfStock">
+      </div>
+    </div>
+  """)
+
+  [product] = extract_structured_products(html, BASE_URL)
+  assert product["name"] == 'Monitor 27" UltraWide'
+  assert product["brand"] == "LG"
+  assert product["url"] == "https://loja.example/produto/monitor"
+  assert (product["price"], product["currency"]) == (1299.0, "BRL")
+  assert (product["availability"], product["in_stock"]) == ("OutOfStock", False)
+  assert product["source"] == "microdata"
+
+def test_opengraph_product():
+  html = page(head="""
+    <meta property="og:type" content="product">
+    <meta property="og:title" content="Cadeira Gamer Pro">
+    <meta property="og:image" content="/img/cadeira.jpg">
+    <meta property="product:price:amount" content="R$ 12.345.678,90">
+    <meta property="product:price:currency" content="BRL">
+    <meta property="product:availability" content="in stock">
+  """)
+
+  [product] = extract_structured_products(html, BASE_URL)
+  assert product["name"] == "Cadeira Gamer Pro"
+  assert product["image"] == "https://loja.example/img/cadeira.jpg"
+  assert product["price"] == 12345678.9
+  assert product["in_stock"] is True
+  assert product["source"] == "opengraph"
+
+def test_non_product_opengraph_is_ignored():
+  html = page(head='<meta property="og:type" content="website"><meta property="og:title" content="Loja">')
+
+  assert extract_structured_products(html, BASE_URL) == []
+
+def test_a_product_in_several_sources_is_kept_once_from_json_ld():
+  html = page(
+    head=json_ld({"@type": "Product", "name": "Teclado K1", "offers": {"price": "199.90"}})
+      + '<meta property="og:type" content="product"><meta property="og:title" content="teclado k1">'
+      + '<meta property="product:price:amount" content="189,90">',
+    body='<div itemscope itemtype="https://schema.org/Product"><span itemprop="name">Teclado K1</span></div>'
+  )
+
+  [product] = extract_structured_products(html, BASE_URL)
+  assert (product["source"], product["price"]) == ("json-ld", 199.9)
+
+def test_answering_products_need_a_price_and_the_query_terms():
+  products = extract_structured_products(page(head=json_ld([
+    {"@type": "Product", "name": "Teclado Mecânico K1", "offers": {"price": "199.90"}},
+    {"@type": "Product", "name": "Teclado Mecânico K2"},
+    {"@type": "Product", "name": "Mouse Sem Fio", "offers": {"price": "99.90"}}
+  ])), BASE_URL)
+
+  answers = answering_products(products, "melhor preço de teclados mecanicos")
+  assert [product["name"] for product in answers] == ["Teclado Mecânico K1"]
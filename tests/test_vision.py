@@ -0,0 +1,70 @@
+import asyncio
+import io
+
+from langchain_core.messages import AIMessage
+from PIL import Image, ImageDraw
+
+from utils.vision import (
+  VISION_HASH_MAX_DISTANCE, description_cache, describe_screenshot, hamming_distance, prepare_screenshot
+)
+
+class FakeVisionModel:
+  model_name = "fake-vision"
+
+  def __init__(self):
+    self.calls = 0
+
+  async def ainvoke(self, messages):
+    self.calls += 1
+    return AIMessage(content=f"description {self.calls}", usage_metadata={"input_tokens": 1, "output_tokens": 1, "total_tokens": 2})
+
+def screenshot(timer: str = "00:10", ad: str = "red", layout: str = "list") -> bytes:
+  image = Image.new("RGB", (1600, 3000), "white")
+  draw = ImageDraw.Draw(image)
+  if layout == "list":
+    draw.rectangle((100, 100, 1500, 600), fill="navy")
+    for i in range(6):
+      draw.rectangle((100, 800 + i * 350, 700, 1050 + i * 350), fill="gray")
+  else:
+    draw.rectangle((100, 100, 700, 2800), fill="darkgreen")
+    for i in range(6):
+      draw.rectangle((800, 300 + i * 400, 1500, 600 + i * 400), fill="orange")
+  draw.text((900, 200), timer, fill="white", font_size=40)
+  draw.rectangle((1200, 2700, 1500, 2900), fill=ad)
+  output = io.BytesIO()
+  image.save(output, format="PNG")
+  return output.getvalue()
+
+def test_prepare_screenshot_downscales_and_cuts_long_pages():
+  jpeg, _ = prepare_screenshot(screenshot(), max_width=800, max_height=1000)
+
+  image = Image.open(io.BytesIO(jpeg))
+  assert image.format == "JPEG"
+  assert image.size == (800, 1000)
+
+def test_perceptual_hash_tolerates_small_changes():
+  _, image_hash = prepare_screenshot(screenshot())
+  _, same_hash = prepare_screenshot(screenshot())
+  _, other_timer_hash = prepare_screenshot(screenshot(timer="00:09"))
+  _, other_ad_hash = prepare_screenshot(screenshot(ad="blue"))
+  _, other_layout_hash = prepare_screenshot(screenshot(layout="grid"))
+
+  assert len(image_hash) == 64
+  assert image_hash == same_hash
+  assert hamming_distance(image_hash, other_timer_hash) <= VISION_HASH_MAX_DISTANCE
+  assert hamming_distance(image_hash, other_ad_hash) <= VISION_HASH_MAX_DISTANCE
+  assert hamming_distance(image_hash, other_layout_hash) > VISION_HASH_MAX_DISTANCE
+
+def test_describe_screenshot_describes_each_page_state_once():
+  description_cache.clear()
+  vision_model = FakeVisionModel()
+
+  async def run():
+    return [
+      await describe_screenshot(vision_model, screenshot()),
+      await describe_screenshot(vision_model, screenshot(timer="00:09", ad="blue")),
+      await describe_screenshot(vision_model, screenshot(layout="grid"))
+    ]
+
+  assert asyncio.run(run()) == ["description 1", "description 1", "description 2"]
+  assert vision_model.calls == 2